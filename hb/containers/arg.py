@@ -44,6 +44,8 @@ from resources.global_var import DEFAULT_UPDATE_ARGS
 from resources.global_var import CURRENT_UPDATE_ARGS
 from resources.global_var import DEFAULT_PUSH_ARGS
 from resources.global_var import CURRENT_PUSH_ARGS
+from resources.global_var import DEFAULT_DAEMON_ARGS
+from resources.global_var import CURRENT_DAEMON_ARGS
 from resources.global_var import ARGS_DIR
 from exceptions.ohos_exception import OHOSException
 from util.log_util import LogUtil
@@ -66,6 +68,7 @@ class ModuleType(Enum):
     PUBLISH = 8
     UPDATE = 9
     PUSH = 10
+    DAEMON = 11
 
 
 class ArgType():
@@ -322,6 +325,8 @@ class Arg():
             args_file_path = CURRENT_UPDATE_ARGS
         elif module_type == ModuleType.PUSH:
             args_file_path = CURRENT_PUSH_ARGS
+        elif module_type == ModuleType.DAEMON:
+            args_file_path = CURRENT_DAEMON_ARGS
         else:
             raise OHOSException(
                 'You are trying to write args file, but there is no corresponding module "{}" args file'
@@ -368,6 +373,9 @@ class Arg():
         elif module_type == ModuleType.PUSH:
             args_file_path = CURRENT_PUSH_ARGS
             default_file_path = DEFAULT_PUSH_ARGS
+        elif module_type == ModuleType.DAEMON:
+            args_file_path = CURRENT_DAEMON_ARGS
+            default_file_path = DEFAULT_DAEMON_ARGS
         else:
             raise OHOSException(
                 'You are trying to read args file, but there is no corresponding module "{}" args file'
@@ -400,6 +408,8 @@ class Arg():
             args_file_path = CURRENT_INDEP_BUILD_ARGS
         elif module_type == ModuleType.PUSH:
             args_file_path = CURRENT_PUSH_ARGS
+        elif module_type == ModuleType.DAEMON:
+            args_file_path = CURRENT_DAEMON_ARGS
         if os.path.exists(args_file_path):
             os.remove(args_file_path)
         
\ No newline at end of file
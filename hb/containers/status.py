@@ -19,6 +19,7 @@
 import os
 import traceback
 import sys
+import functools
 from exceptions.ohos_exception import OHOSException
 from util.log_util import LogUtil
 from util.io_util import IoUtil
@@ -42,6 +43,7 @@ def throw_exception(func):
         ...
 
     """
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
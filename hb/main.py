@@ -17,11 +17,13 @@
 #
 
 
+from __future__ import annotations
+
 import os
 import sys
 import subprocess
 import json
-import time
+from typing import TYPE_CHECKING
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))  # ohos/build/hb dir
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # ohos/build dir
@@ -34,54 +36,27 @@ from resources.global_var import ARGS_DIR
 from resources.global_var import CURRENT_OHOS_ROOT
 from exceptions.ohos_exception import OHOSException
 
-from services.preloader import OHOSPreloader
-from services.loader import OHOSLoader
-from services.gn import Gn
-from services.ninja import Ninja
-from services.hpm import Hpm
-from services.hdc import Hdc
-
-from resolver.build_args_resolver import BuildArgsResolver
-from resolver.set_args_resolver import SetArgsResolver
-from resolver.clean_args_resolver import CleanArgsResolver
-from resolver.env_args_resolver import EnvArgsResolver
-from resolver.tool_args_resolver import ToolArgsResolver
-from resolver.indep_build_args_resolver import IndepBuildArgsResolver
-from resolver.install_args_resolver import InstallArgsResolver
-from resolver.package_args_resolver import PackageArgsResolver
-from resolver.publish_args_resolver import PublishArgsResolver
-from resolver.update_args_resolver import UpdateArgsResolver
-from resolver.push_args_resolver import PushArgsResolver
-
-from modules.interface.module_interface import ModuleInterface
-from modules.interface.build_module_interface import BuildModuleInterface
-from modules.interface.set_module_interface import SetModuleInterface
-from modules.interface.env_module_interface import EnvModuleInterface
-from modules.interface.clean_module_interface import CleanModuleInterface
-from modules.interface.tool_module_interface import ToolModuleInterface
-from modules.interface.indep_build_module_interface import IndepBuildModuleInterface
-from modules.interface.install_module_interface import InstallModuleInterface
-from modules.interface.package_module_interface import PackageModuleInterface
-from modules.interface.publish_module_interface import PublishModuleInterface
-from modules.interface.update_module_interface import UpdateModuleInterface
-from modules.interface.push_module_interface import PushModuleInterface
-
-from modules.ohos_build_module import OHOSBuildModule
-from modules.ohos_set_module import OHOSSetModule
-from modules.ohos_clean_module import OHOSCleanModule
-from modules.ohos_env_module import OHOSEnvModule
-from modules.ohos_tool_module import OHOSToolModule
-from modules.ohos_indep_build_module import OHOSIndepBuildModule
-from modules.ohos_install_module import OHOSInstallModule
-from modules.ohos_package_module import OHOSPackageModule
-from modules.ohos_publish_module import OHOSPublishModule
-from modules.ohos_update_module import OHOSUpdateModule
-from modules.ohos_push_module import OHOSPushModule
+if TYPE_CHECKING:
+    from modules.interface.build_module_interface import BuildModuleInterface
+    from modules.interface.set_module_interface import SetModuleInterface
+    from modules.interface.env_module_interface import EnvModuleInterface
+    from modules.interface.clean_module_interface import CleanModuleInterface
+    from modules.interface.tool_module_interface import ToolModuleInterface
+    from modules.interface.indep_build_module_interface import IndepBuildModuleInterface
+    from modules.interface.install_module_interface import InstallModuleInterface
+    from modules.interface.package_module_interface import PackageModuleInterface
+    from modules.interface.publish_module_interface import PublishModuleInterface
+    from modules.interface.update_module_interface import UpdateModuleInterface
+    from modules.interface.push_module_interface import PushModuleInterface
+    from modules.interface.daemon_module_interface import DaemonModuleInterface
 
 from helper.separator import Separator
 from util.log_util import LogUtil
 from util.system_util import SystemUtil
 
+# services, resolvers and modules are imported by the initializer of each
+# subcommand, so 'hb env' or 'hb set' don't pay for loading the build stack
+
 
 class Main():
     @staticmethod
@@ -100,11 +75,12 @@ class Main():
             'package': main._init_package_module,
             'publish': main._init_publish_module,
             'update': main._init_update_module,
-            'push': main._push_module
+            'push': main._push_module,
+            'daemon': main._init_daemon_module
         }
 
         module_type = sys.argv[1]
-        if module_type == 'help':
+        if module_type in ['help', '-h', '--help']:
             for all_module_type in ModuleType:
                 LogUtil.hb_info(Separator.long_line)
                 LogUtil.hb_info(Arg.get_help(all_module_type))
@@ -136,9 +112,18 @@ class Main():
         os.environ['PATH'] = prebuilts_cache_path + os.pathsep + nodejs_bin_path + os.pathsep + os.environ['PATH']
 
     def _init_build_module(self) -> BuildModuleInterface:
+        from services.preloader import OHOSPreloader
+        from services.loader import OHOSLoader
+        from services.gn import Gn
+        from services.ninja import Ninja
+        from resolver.build_args_resolver import BuildArgsResolver
+        from modules.ohos_build_module import OHOSBuildModule
+
         args_dict = Arg.parse_all_args(ModuleType.BUILD)
 
         if args_dict.get("product_name").arg_value != '':
+            from resolver.set_args_resolver import SetArgsResolver
+            from modules.ohos_set_module import OHOSSetModule
             set_args_dict = Arg.parse_all_args(ModuleType.SET)
             set_args_resolver = SetArgsResolver(set_args_dict)
             ohos_set_module = OHOSSetModule(set_args_dict, set_args_resolver, "")
@@ -157,10 +142,13 @@ class Main():
         sys.exit()
 
     def _init_set_module(self) -> SetModuleInterface:
+        from services.menu import Menu
+        from resolver.set_args_resolver import SetArgsResolver
+        from modules.ohos_set_module import OHOSSetModule
+
         Arg.clean_args_file()
         args_dict = Arg.parse_all_args(ModuleType.SET)
         set_args_resolver = SetArgsResolver(args_dict)
-        from services.menu import Menu
         menu = Menu()
         return OHOSSetModule(args_dict, set_args_resolver, menu)
 
@@ -172,16 +160,26 @@ class Main():
             key_path = os.path.join(os.path.expanduser("~"), '.hpm', 'key', 'publicKey_' + sys.argv[3] + '.pem')
             print(f'Please add the content of {key_path} to https://repo.harmonyos.com/#/cn/profile/sshkeys')
             sys.exit()
+        from resolver.env_args_resolver import EnvArgsResolver
+        from modules.ohos_env_module import OHOSEnvModule
+
         args_dict = Arg.parse_all_args(ModuleType.ENV)
         env_args_resolver = EnvArgsResolver(args_dict)
         return OHOSEnvModule(args_dict, env_args_resolver)
 
     def _init_clean_module(self) -> CleanModuleInterface:
+        from resolver.clean_args_resolver import CleanArgsResolver
+        from modules.ohos_clean_module import OHOSCleanModule
+
         args_dict = Arg.parse_all_args(ModuleType.CLEAN)
         clean_args_resolever = CleanArgsResolver(args_dict)
         return OHOSCleanModule(args_dict, clean_args_resolever)
 
     def _init_tool_module(self) -> ToolModuleInterface:
+        from services.gn import Gn
+        from resolver.tool_args_resolver import ToolArgsResolver
+        from modules.ohos_tool_module import OHOSToolModule
+
         Arg.clean_args_file()
         args_dict = Arg.parse_all_args(ModuleType.TOOL)
         generate_ninja = Gn()
@@ -196,6 +194,10 @@ class Main():
         if not os.path.exists(os.path.join(cwd, 'build', 'indep_configs', 'build_indep.sh')):
             print("ERROR: you are running hb build command in wrong dir!")
             sys.exit()
+        from services.hpm import Hpm
+        from resolver.indep_build_args_resolver import IndepBuildArgsResolver
+        from modules.ohos_indep_build_module import OHOSIndepBuildModule
+
         self._set_path()
         Arg.clean_args_file_by_type(ModuleType.INDEP_BUILD)
         args_dict = Arg.parse_all_args(ModuleType.INDEP_BUILD)
@@ -213,6 +215,10 @@ class Main():
         return env_args_dict.get("indep_build").get("argDefault")
 
     def _init_install_module(self) -> InstallModuleInterface:
+        from services.hpm import Hpm
+        from resolver.install_args_resolver import InstallArgsResolver
+        from modules.ohos_install_module import OHOSInstallModule
+
         self._set_path()
         Arg.clean_args_file_by_type(ModuleType.INSTALL)
         args_dict = Arg.parse_all_args(ModuleType.INSTALL)
@@ -221,6 +227,10 @@ class Main():
         return OHOSInstallModule(args_dict, install_args_resolver, hpm)
 
     def _init_package_module(self) -> PackageModuleInterface:
+        from services.hpm import Hpm
+        from resolver.package_args_resolver import PackageArgsResolver
+        from modules.ohos_package_module import OHOSPackageModule
+
         self._set_path()
         Arg.clean_args_file_by_type(ModuleType.PACKAGE)
         args_dict = Arg.parse_all_args(ModuleType.PACKAGE)
@@ -229,6 +239,10 @@ class Main():
         return OHOSPackageModule(args_dict, package_args_resolver, hpm)
 
     def _init_publish_module(self) -> PublishModuleInterface:
+        from services.hpm import Hpm
+        from resolver.publish_args_resolver import PublishArgsResolver
+        from modules.ohos_publish_module import OHOSPublishModule
+
         self._set_path()
         args_dict = Arg.parse_all_args(ModuleType.PUBLISH)
         hpm = Hpm()
@@ -236,6 +250,10 @@ class Main():
         return OHOSPublishModule(args_dict, publish_args_resolver, hpm)
 
     def _init_update_module(self) -> UpdateModuleInterface:
+        from services.hpm import Hpm
+        from resolver.update_args_resolver import UpdateArgsResolver
+        from modules.ohos_update_module import OHOSUpdateModule
+
         self._set_path()
         Arg.clean_args_file_by_type(ModuleType.UPDATE)
         args_dict = Arg.parse_all_args(ModuleType.UPDATE)
@@ -244,11 +262,26 @@ class Main():
         return OHOSUpdateModule(args_dict, update_args_resolver, hpm)
 
     def _init_push_module(self) -> PushModuleInterface:
+        from services.hdc import Hdc
+        from resolver.push_args_resolver import PushArgsResolver
+        from modules.ohos_push_module import OHOSPushModule
+
         args_dict = Arg.parse_all_args(ModuleType.PUSH)
         hdc = Hdc()
         update_args_resolver = PushArgsResolver(args_dict)
         return OHOSPushModule(args_dict, update_args_resolver, hdc)
 
+    def _init_daemon_module(self) -> DaemonModuleInterface:
+        from services.daemon import Daemon
+        from resolver.daemon_args_resolver import DaemonArgsResolver
+        from modules.ohos_daemon_module import OHOSDaemonModule
+
+        Arg.clean_args_file_by_type(ModuleType.DAEMON)
+        args_dict = Arg.parse_all_args(ModuleType.DAEMON)
+        daemon = Daemon()
+        daemon_args_resolver = DaemonArgsResolver(args_dict)
+        return OHOSDaemonModule(args_dict, daemon_args_resolver, daemon)
+
     def _push_module(self):
         if sys.argv[2] in ['-h', '-help', 'h', 'help']:
             print('Please use the command "hb push" like this: hb push component_name -t device_num')
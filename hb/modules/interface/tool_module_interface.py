@@ -52,6 +52,10 @@ class ToolModuleInterface(ModuleInterface):
     def clean_targets(self):
         pass
 
+    @abstractmethod
+    def perf_diff(self):
+        pass
+
     def run(self):
         if self.args_dict['ls'].arg_value:
             self.list_targets()
@@ -65,5 +69,7 @@ class ToolModuleInterface(ModuleInterface):
             self.format_targets()
         elif self.args_dict['clean'].arg_value:
             self.clean_targets()
+        elif self.args_dict['perf_diff'].arg_value:
+            self.perf_diff()
         else:
             Arg.get_help(ModuleType.TOOL)
@@ -16,6 +16,7 @@
 # limitations under the License.
 #
 
+import os
 
 from modules.interface.build_module_interface import BuildModuleInterface
 from resolver.interface.args_resolver_interface import ArgsResolverInterface
@@ -29,6 +30,9 @@ from util.system_util import SystemUtil
 from util.log_util import LogUtil
 from containers.status import throw_exception
 from util.monitor import Monitor
+from util.trace_util import TraceUtil
+from services.daemon import Daemon
+from resources.config import Config
 
 
 class OHOSBuildModule(BuildModuleInterface):
@@ -47,6 +51,9 @@ class OHOSBuildModule(BuildModuleInterface):
                          loader, target_generator, target_compiler)
         OHOSBuildModule._instance = self
         self._start_time = SystemUtil.get_current_time()
+        self._daemon = Daemon()
+        self._use_daemon = False
+        self._monitor = Monitor()
 
     @property
     def build_time(self):
@@ -62,7 +69,7 @@ class OHOSBuildModule(BuildModuleInterface):
 
     @throw_exception
     def run(self):
-        monitor = Monitor()
+        monitor = self._monitor
         try:
             super().run()
         except OHOSException as exception:
@@ -72,42 +79,83 @@ class OHOSBuildModule(BuildModuleInterface):
             monitor.run()
             LogUtil.hb_info('{} build success'.format(
                 self.args_dict.get('product_name').arg_value))
+        finally:
+            self._save_trace()
 
+    @staticmethod
+    def _save_trace():
+        out_path = Config().out_path
+        if not TraceUtil.is_enabled() or not out_path:
+            return
+        # A failed trace must not hide the result of the build.
+        try:
+            TraceUtil.save(os.path.join(out_path, 'hb_build.trace.gz'))
+        except Exception as exception:
+            LogUtil.hb_warning('Failed to save build trace: {}'.format(exception))
+
+    @TraceUtil.span('prebuild', 'phase')
     def _prebuild(self):
         self._run_phase(BuildPhase.PRE_BUILD)
 
+    @TraceUtil.span('preload', 'phase')
     def _preload(self):
         self._run_phase(BuildPhase.PRE_LOAD)
         if self.args_dict.get('fast_rebuild', None) and not self.args_dict.get('fast_rebuild').arg_value:
-            self.preloader.run()
+            # A running 'hb daemon' preloads together with the load phase
+            self._use_daemon = self._daemon.is_available()
+            if not self._use_daemon:
+                self.preloader.run()
 
+    @TraceUtil.span('load', 'phase')
     def _load(self):
         self._run_phase(BuildPhase.LOAD)
         if self.args_dict.get('fast_rebuild', None) and not self.args_dict.get('fast_rebuild').arg_value:
+            if self._use_daemon and self._daemon.load(self.loader.args_dict):
+                return
+            if self._use_daemon:
+                self._use_daemon = False
+                self.preloader.run()
             self.loader.run()
 
+    @TraceUtil.span('preTargetGenerate', 'phase')
     def _pre_target_generate(self):
         self._run_phase(BuildPhase.PRE_TARGET_GENERATE)
 
+    @TraceUtil.span('targetGenerate', 'phase')
     def _target_generate(self):
         self._run_phase(BuildPhase.TARGET_GENERATE)
         if not self.args_dict.get("build_only_load").arg_value and not self.args_dict.get("fast_rebuild").arg_value:
+            if self._use_daemon and self._daemon.is_gn_up_to_date(self.loader.args_dict, self.target_generator):
+                LogUtil.hb_info('hb daemon: gn args and build config unchanged, skip gn gen')
+                return
             self.target_generator.run()
+            if self._use_daemon:
+                self._daemon.record_gn(self.loader.args_dict, self.target_generator)
 
+    @TraceUtil.span('postTargetGenerate', 'phase')
     def _post_target_generate(self):
         self._run_phase(BuildPhase.POST_TARGET_GENERATE)
 
+    @TraceUtil.span('preTargetCompilation', 'phase')
     def _pre_target_compilation(self):
         self._run_phase(BuildPhase.PRE_TARGET_COMPILATION)
 
+    @TraceUtil.span('targetCompilation', 'phase')
     def _target_compilation(self):
         self._run_phase(BuildPhase.TARGET_COMPILATION)
         if not self.args_dict.get("build_only_load").arg_value and not self.args_dict.get("build_only_gn").arg_value:
-            self.target_compiler.run()
-
+            # record cpu, memory and per-action peak rss next to build.log
+            self._monitor.start_sampler(Config().out_path)
+            try:
+                self.target_compiler.run()
+            finally:
+                self._monitor.stop_sampler()
+
+    @TraceUtil.span('postTargetCompilation', 'phase')
     def _post_target_compilation(self):
         self._run_phase(BuildPhase.POST_TARGET_COMPILATION)
 
+    @TraceUtil.span('postbuild', 'phase')
     def _post_build(self):
         self._run_phase(BuildPhase.POST_BUILD)
 
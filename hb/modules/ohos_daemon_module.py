@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from modules.interface.daemon_module_interface import DaemonModuleInterface
+from resolver.interface.args_resolver_interface import ArgsResolverInterface
+from services.interface.service_interface import ServiceInterface
+from exceptions.ohos_exception import OHOSException
+
+
+class OHOSDaemonModule(DaemonModuleInterface):
+
+    _instance = None
+
+    def __init__(self, args_dict: dict, args_resolver: ArgsResolverInterface, daemon: ServiceInterface):
+        super().__init__(args_dict, args_resolver)
+        self._daemon = daemon
+        OHOSDaemonModule._instance = self
+
+    @property
+    def daemon(self):
+        return self._daemon
+
+    @staticmethod
+    def get_instance():
+        if OHOSDaemonModule._instance is not None:
+            return OHOSDaemonModule._instance
+        else:
+            raise OHOSException(
+                'OHOSDaemonModule has not been instantiated', '0000')
+
+    def start_daemon(self):
+        self.args_resolver.resolve_arg(self.args_dict['start'], self)
+
+    def stop_daemon(self):
+        self.args_resolver.resolve_arg(self.args_dict['stop'], self)
+
+    def stat_daemon(self):
+        self.args_resolver.resolve_arg(self.args_dict['stat'], self)
+
+    def serve_daemon(self):
+        self.args_resolver.resolve_arg(self.args_dict['serve'], self)
@@ -60,3 +60,6 @@ class OHOSToolModule(ToolModuleInterface):
 
     def refs_targets(self):
         self.args_resolver.resolve_arg(self.args_dict['refs'], self)
+
+    def perf_diff(self):
+        self.args_resolver.resolve_arg(self.args_dict['perf_diff'], self)
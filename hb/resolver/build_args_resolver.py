@@ -30,12 +30,13 @@ from containers.status import throw_exception
 from exceptions.ohos_exception import OHOSException
 from modules.interface.build_module_interface import BuildModuleInterface
 from resources.config import Config
-from resources.global_var import CURRENT_OHOS_ROOT, DEFAULT_BUILD_ARGS
+from resources.global_var import CURRENT_OHOS_ROOT, DEFAULT_BUILD_ARGS, BUILD_HISTORY_FILE
 from resolver.interface.args_resolver_interface import ArgsResolverInterface
 from util.type_check_util import TypeCheckUtil
 from util.io_util import IoUtil
 from util.log_util import LogUtil
 from util.system_util import SystemUtil
+from util.trace_util import TraceUtil
 from util.type_check_util import TypeCheckUtil
 from util.component_util import ComponentUtil
 from util.product_util import ProductUtil
@@ -781,7 +782,11 @@ class BuildArgsResolver(ArgsResolverInterface):
                 logfile = os.path.join(ccache_base, logfile)
             cmd = [
                 'python3', '{}/build/scripts/summary_ccache_hitrate.py'.format(
-                    config.root_path), logfile
+                    config.root_path), logfile,
+                '--parts-info-dir',
+                '{}/build_configs/parts_info'.format(config.out_path),
+                '--summary-file',
+                '{}/ccache_summary.json'.format(config.out_path),
             ]
             if os.path.isfile(logfile):
                 SystemUtil.exec_command(cmd, log_path=config.log_path)
@@ -832,6 +837,107 @@ class BuildArgsResolver(ArgsResolverInterface):
             ]
             SystemUtil.exec_command(cmd, log_path=config.log_path)
 
+    @staticmethod
+    def resolve_build_history(target_arg: Arg, build_module: BuildModuleInterface):
+        """resolve '--build-history' arg
+        :param target_arg: arg object which is used to get arg value.
+        :param build_module [maybe unused]: build module object which is used to get other services.
+        :phase: postTargetCompilation
+        """
+        if not target_arg.arg_value:
+            return
+        # Recording the history must never fail a build which succeeded.
+        try:
+            BuildArgsResolver._record_build_history(build_module)
+        except Exception as error:  # pylint: disable=broad-except
+            LogUtil.hb_warning('Failed to record build history: {}'.format(error))
+
+    @staticmethod
+    def _record_build_history(build_module: BuildModuleInterface):
+        from scripts.ninja2trace import NinjaToTrace
+        from scripts.util.parts_index import PartsIndex
+        from scripts.summary_ccache_hitrate import HIT_DIRECT, HIT_PREPROCESSED, MISS
+        from util.build_history import BuildHistory, get_commit_id
+
+        config = Config()
+        # 中国标准时间与UTC标准时间差8h, _start_time记录为中国标准时间
+        epoch = datetime.utcfromtimestamp(28800)
+        unixtime = '%f' % (
+            (build_module.target_compiler._start_time - epoch).total_seconds() * 10**9)
+        ninja_trace = NinjaToTrace()
+        if not ninja_trace.parse_file(os.path.join(config.out_path, '.ninja_log'), unixtime):
+            return
+        parts_index = PartsIndex(os.path.join(config.out_path, 'build_configs', 'parts_info'))
+        actions = []
+        for action in ninja_trace.datalist:
+            target = action.target_obj_names[0]
+            part, subsystem = parts_index.lookup(target)
+            actions.append((target, part, subsystem, action.end - action.start))
+
+        # Reuse the summary of --stat-ccache, which runs before, if it was
+        # written by this build.
+        ccache_hit, ccache_miss = None, None
+        ccache_summary_file = os.path.join(config.out_path, 'ccache_summary.json')
+        if os.path.isfile(ccache_summary_file) and \
+                os.path.getmtime(ccache_summary_file) >= build_module._start_time.timestamp():
+            totals = IoUtil.read_json_file(ccache_summary_file).get('total', {})
+            ccache_hit = totals.get(HIT_DIRECT, 0) + totals.get(HIT_PREPROCESSED, 0)
+            ccache_miss = totals.get(MISS, 0)
+
+        phases = {phase: duration // 1000 for phase, duration in TraceUtil.get_durations('phase').items()}
+        build = {
+            'start_time': str(build_module._start_time),
+            'product': config.product,
+            'commit_id': get_commit_id(config.root_path),
+            'build_time': build_module.build_time.total_seconds(),
+            'ccache_hit': ccache_hit,
+            'ccache_miss': ccache_miss,
+        }
+        build_history = BuildHistory(BUILD_HISTORY_FILE)
+        try:
+            build_id = build_history.add_build(build, actions, phases)
+        finally:
+            build_history.close()
+        LogUtil.write_log(config.log_path, 'record build {} with {} actions to {}'.format(
+            build_id, len(actions), BUILD_HISTORY_FILE), 'info')
+
+    @staticmethod
+    def resolve_build_trace(target_arg: Arg, build_module: BuildModuleInterface):
+        """resolve '--build-trace' arg
+        :param target_arg: arg object which is used to get arg value.
+        :param build_module [maybe unused]: build module object which is used to get other services.
+        :phase: prebuild.
+        """
+        if target_arg.arg_value:
+            TraceUtil.enable()
+
+    @staticmethod
+    def resolve_critical_path_report(target_arg: Arg, build_module: BuildModuleInterface):
+        """resolve '--critical-path-report' arg
+        :param target_arg: arg object which is used to get arg value.
+        :param build_module [maybe unused]: build module object which is used to get other services.
+        :phase: postTargetCompilation
+        """
+        if target_arg.arg_value:
+            config = Config()
+            # 中国标准时间与UTC标准时间差8h, _start_time记录为中国标准时间
+            epoch = datetime.utcfromtimestamp(28800)
+            unixtime = '%f' % (
+                (build_module.target_compiler._start_time - epoch).total_seconds() * 10**9)
+            cmd = [
+                'python3',
+                '{}/build/scripts/ninja_critical_path.py'.format(config.root_path),
+                '--build-dir',
+                config.out_path,
+                '--ninja-start-time',
+                str(unixtime),
+                '--parts-info-dir',
+                '{}/build_configs/parts_info'.format(config.out_path),
+                '--report-file',
+                '{}/critical_path_report.json'.format(config.out_path),
+            ]
+            SystemUtil.exec_command(cmd, log_path=config.log_path)
+
     @staticmethod
     def resolve_compute_overlap_rate(target_arg: Arg, build_module: BuildModuleInterface):
         """resolve "--compute-overlap-rate' arg
@@ -891,6 +997,20 @@ class BuildArgsResolver(ArgsResolverInterface):
         loader = build_module.loader
         loader.regist_arg("skip_partlist_check", target_arg.arg_value)
 
+    @staticmethod
+    @throw_exception
+    def resolve_load_jobs(target_arg: Arg, build_module: BuildModuleInterface):
+        """resolve '--load-jobs' arg
+        :param target_arg: arg object which is used to get arg value.
+        :param build_module [maybe unused]: build module object which is used to get other services.
+        :phase: load.
+        """
+        if target_arg.arg_value and not str(target_arg.arg_value).isdigit():
+            raise OHOSException('--load-jobs must be a non-negative integer, but got "{}"'.format(
+                target_arg.arg_value), "2015")
+        loader = build_module.loader
+        loader.regist_arg("load_jobs", target_arg.arg_value)
+
     @staticmethod
     def resolve_clean_args(target_arg: Arg, build_module: BuildModuleInterface):
         """resolve '--clean-args' arg
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from containers.arg import Arg
+from resolver.interface.args_resolver_interface import ArgsResolverInterface
+from modules.interface.daemon_module_interface import DaemonModuleInterface
+
+
+class DaemonArgsResolver(ArgsResolverInterface):
+
+    def __init__(self, args_dict: dict):
+        super().__init__(args_dict)
+
+    @staticmethod
+    def resolve_start(target_arg: Arg, daemon_module: DaemonModuleInterface):
+        if target_arg.arg_value:
+            daemon_module.daemon.start()
+
+    @staticmethod
+    def resolve_stop(target_arg: Arg, daemon_module: DaemonModuleInterface):
+        if target_arg.arg_value:
+            daemon_module.daemon.stop()
+
+    @staticmethod
+    def resolve_stat(target_arg: Arg, daemon_module: DaemonModuleInterface):
+        if target_arg.arg_value:
+            daemon_module.daemon.show_statistics()
+
+    @staticmethod
+    def resolve_serve(target_arg: Arg, daemon_module: DaemonModuleInterface):
+        if target_arg.arg_value:
+            daemon_module.daemon.run()
@@ -16,6 +16,8 @@
 # limitations under the License.
 #
 
+import os
+
 from containers.arg import Arg
 from containers.status import throw_exception
 from exceptions.ohos_exception import OHOSException
@@ -23,6 +25,8 @@ from services.gn import CMDTYPE
 from resolver.interface.args_resolver_interface import ArgsResolverInterface
 from modules.interface.tool_module_interface import ToolModuleInterface
 from util.component_util import ComponentUtil
+from util.log_util import LogUtil
+from resources.global_var import BUILD_HISTORY_FILE
 
 
 class ToolArgsResolver(ArgsResolverInterface):
@@ -112,3 +116,49 @@ class ToolArgsResolver(ArgsResolverInterface):
         out_dir = ''
         out_dir = target_arg.arg_value[0]
         tool_module.gn.execute_gn_cmd(cmd_type=CMDTYPE.CLEAN, out_dir=out_dir)
+
+    @staticmethod
+    def resolve_perf_diff(target_arg: Arg, tool_module: ToolModuleInterface):
+        from util.build_history import BuildHistory
+
+        sub_options = target_arg.arg_attribute.get('support_sub_options')
+        options = {name: value.get('argDefault') for name, value in sub_options.items()}
+        build_refs = []
+        for arg in target_arg.arg_value:
+            if not arg.startswith('-'):
+                build_refs.append(arg)
+                continue
+            option_name, _, option_value = arg.lstrip('-').partition('=')
+            if option_name not in options or not option_value:
+                raise OHOSException('Invalid perf-diff args: {} ,choose from {} and use "=" to connect '
+                                    'argument and value'.format(arg, list(options.keys())), '3003')
+            options[option_name] = option_value
+        if not os.path.isfile(BUILD_HISTORY_FILE):
+            raise OHOSException('Build history "{}" not found, please run "hb build" first'.format(
+                BUILD_HISTORY_FILE), '3015')
+
+        build_history = BuildHistory(BUILD_HISTORY_FILE)
+        try:
+            if build_refs == ['list']:
+                for build in build_history.list_builds(int(options.get('top'))):
+                    LogUtil.hb_info('build {}: {} {} commit {} cost {}s'.format(*build))
+                return
+            if len(build_refs) == 1:
+                build_refs.append('latest')
+            if len(build_refs) != 2:
+                raise OHOSException('Invalid perf-diff args: {} ,need <build_a> [<build_b>]'.format(
+                    build_refs), '3003')
+            build_a = build_history.find_build(build_refs[0])
+            build_b = build_history.find_build(build_refs[1])
+            result = build_history.diff(build_a, build_b, float(options.get('threshold')),
+                                        int(options.get('min-delta')))
+        finally:
+            build_history.close()
+
+        LogUtil.hb_info('compare build {} with build {}, threshold {}x, min delta {}ms'.format(
+            build_a, build_b, options.get('threshold'), options.get('min-delta')))
+        for kind, regressed in result.items():
+            LogUtil.hb_info('{} regressed {}:'.format(len(regressed), kind))
+            for name, base_duration, duration in regressed[:int(options.get('top'))]:
+                LogUtil.hb_info('  {}: {}ms -> {}ms (x{:.2f})'.format(
+                    name, base_duration, duration, duration / base_duration))
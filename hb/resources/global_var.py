@@ -56,6 +56,9 @@ DEFAULT_UPDATE_ARGS = os.path.join(
 DEFAULT_PUSH_ARGS = os.path.join(
     CURRENT_HB_DIR, 'resources/args/default/pushargs.json')
 
+DEFAULT_DAEMON_ARGS = os.path.join(
+    CURRENT_HB_DIR, 'resources/args/default/daemonargs.json')
+
 CURRENT_ARGS_DIR = os.path.join(CURRENT_OHOS_ROOT, 'out/hb_args')
 CURRENT_BUILD_ARGS = os.path.join(
     CURRENT_ARGS_DIR, 'buildargs.json')
@@ -79,6 +82,8 @@ CURRENT_UPDATE_ARGS = os.path.join(
     CURRENT_ARGS_DIR, 'updateargs.json')
 CURRENT_PUSH_ARGS = os.path.join(
     CURRENT_ARGS_DIR, 'pushargs.json')
+CURRENT_DAEMON_ARGS = os.path.join(
+    CURRENT_ARGS_DIR, 'daemonargs.json')
 
 BUILD_CONFIG_FILE = os.path.join(
     CURRENT_HB_DIR, 'resources/config/config.json')
@@ -90,6 +95,12 @@ ENV_SETUP_FILE = os.path.join(
 
 COMPONENTS_PATH_DIR = os.path.join(CURRENT_OHOS_ROOT, 'out/components_path.json')
 
+DAEMON_DIR = os.path.join(CURRENT_OHOS_ROOT, 'out/hb_daemon')
+DAEMON_CONFIG_FILE = os.path.join(DAEMON_DIR, 'daemon.json')
+DAEMON_LOG_FILE = os.path.join(DAEMON_DIR, 'daemon.log')
+
+BUILD_HISTORY_FILE = os.path.join(CURRENT_OHOS_ROOT, 'out/hb_build_history.db')
+
 HPM_CHECK_INFO = ""
 
 
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import sys
+import json
+import time
+import errno
+import hashlib
+import subprocess
+import http.client as client
+
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+
+from services.interface.service_interface import ServiceInterface
+from resources.global_var import CURRENT_OHOS_ROOT
+from resources.global_var import CURRENT_HB_DIR
+from resources.global_var import DAEMON_DIR
+from resources.global_var import DAEMON_CONFIG_FILE
+from resources.global_var import DAEMON_LOG_FILE
+from resources.config import Config
+from helper.singleton import Singleton
+from util.io_util import IoUtil
+from util.loader.subsystem_info import get_build_file_index_file
+from util.loader.subsystem_scan import BuildFileIndex
+from util.log_util import LogUtil
+
+HB_DAEMON_PORT = 7980
+LOCALHOST = '127.0.0.1'
+
+# gn args which change on every build and must not invalidate 'gn gen'
+_VOLATILE_GN_ARGS = ['ohos_build_time', 'ohos_build_datetime']
+# loader args that don't change the load result
+_VOLATILE_LOADER_ARGS = ['load_jobs']
+
+_WATCHED_BUILD_FILES = [
+    'build/subsystem_config.json',
+    'build/subsystem_config_example.json',
+    'build/compile_standard_whitelist.json',
+    'build/compile_env_allowlist.json',
+    'build/component_feature_whitelist.json',
+    'build/subsystem_components_whitelist.json',
+    'build/third_party_allow_list.json',
+]
+
+
+def _digest(data) -> str:
+    content = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _stat_file(path: str):
+    try:
+        stat_info = os.stat(path)
+    except OSError:
+        return None
+    return [stat_info.st_mtime_ns, stat_info.st_size]
+
+
+class LoadState():
+    """In-memory result of one preloader/loader run, keyed by product and args."""
+
+    def __init__(self, key: str, preloader, loader):
+        self.key = key
+        self.preloader = preloader
+        self.loader = loader
+        self.inputs = {}
+        self.gn_key = ''
+        self.is_fresh = False
+
+    def collect_inputs(self):
+        watched_files = [os.path.join(CURRENT_OHOS_ROOT, path) for path in _WATCHED_BUILD_FILES]
+        # product config, inherit/system_component and whitelists fingerprinted by the preloader
+        watched_files.extend(self.preloader.fingerprint_files)
+        products_ext_dir = os.path.join(CURRENT_OHOS_ROOT, 'out/products_ext')
+        if os.path.isdir(products_ext_dir):
+            watched_files.append(products_ext_dir)
+            for name in os.listdir(products_ext_dir):
+                watched_files.append(os.path.join(products_ext_dir, name))
+
+        # bundle.json/ohos.build files, and every directory scanned for them:
+        # a build file added to any of them changes its mtime
+        for subsystem in self.loader._subsystem_info.values():
+            for subsystem_path in subsystem.get('path', []):
+                watched_files.append(os.path.join(CURRENT_OHOS_ROOT, subsystem_path))
+            for build_file in subsystem.get('build_files', []):
+                watched_files.append(build_file)
+                watched_files.append(os.path.dirname(build_file))
+        watched_files.extend(BuildFileIndex.scanned_dirs(get_build_file_index_file(
+            self.loader.source_root_dir, self.loader.config_output_relpath)))
+        self.inputs = {path: _stat_file(path) for path in watched_files}
+
+    def changed_input(self) -> str:
+        for path, stat_info in self.inputs.items():
+            if _stat_file(path) != stat_info:
+                return path
+        for output in [self.preloader._outputs.parts_json,
+                       self.loader.parts_src_file,
+                       self.loader.components_file]:
+            if not os.path.exists(output):
+                return output
+        return ''
+
+
+class HbDaemonRequestHandler(BaseHTTPRequestHandler):
+    # Suppress logs
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def do_load(self):
+        self._reply(self.server.load(self._request()))
+
+    def do_check_gn(self):
+        self._reply(self.server.check_gn(self._request()))
+
+    def do_record_gn(self):
+        self._reply(self.server.record_gn(self._request()))
+
+    def do_show_statistics(self):
+        self._reply(self.server.statistics())
+
+    def do_ping(self):
+        self._reply({'root': CURRENT_OHOS_ROOT, 'pid': os.getpid()})
+
+    def do_stop_service(self):
+        self.server.stop_service = True
+        self._reply({})
+
+    def _request(self) -> dict:
+        length = int(self.headers.get('Content-Length', 0))
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def _reply(self, reply: dict):
+        data = json.dumps(reply).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class HbDaemon(HTTPServer):
+    def __init__(self, *args, **kargs):
+        self.stop_service = False
+        self.states = {}
+        self.hit_times = 0
+        self.miss_times = 0
+        super().__init__(*args, **kargs)
+
+    def serve_forever(self, poll_interval=0.5):
+        while not self.stop_service:
+            self.handle_request()
+        if os.path.exists(DAEMON_CONFIG_FILE):
+            os.unlink(DAEMON_CONFIG_FILE)
+
+    def record_daemon_config(self):
+        os.makedirs(DAEMON_DIR, exist_ok=True)
+        host, port = self.server_address[:2]
+        IoUtil.dump_json_file(DAEMON_CONFIG_FILE, {
+            'root': CURRENT_OHOS_ROOT,
+            'host': host,
+            'port': port,
+            'pid': os.getpid(),
+        })
+
+    def load(self, request: dict) -> dict:
+        key = request.get('key')
+        state = self.states.get(key)
+        if state is not None:
+            reason = state.changed_input()
+            if not reason:
+                self.hit_times += 1
+                state.is_fresh = False
+                LogUtil.hb_info('hb daemon: reuse load state {}'.format(key[:12]))
+                return {'status': 'unchanged'}
+        else:
+            reason = 'no cached state for product "{}"'.format(request.get('product'))
+
+        self.miss_times += 1
+        LogUtil.hb_info('hb daemon: reload {} ({})'.format(key[:12], reason))
+        start_time = time.monotonic()
+        try:
+            state = self._reload(key, request.get('loader_args', {}))
+        except BaseException as exception:  # noqa: B036 preloader/loader exit() on error
+            self.states.pop(key, None)
+            LogUtil.hb_warning('hb daemon: reload failed: {}'.format(exception))
+            return {'status': 'failed', 'reason': reason}
+        self.states[key] = state
+        return {'status': 'reloaded', 'reason': reason,
+                'cost': round(time.monotonic() - start_time, 2)}
+
+    def check_gn(self, request: dict) -> dict:
+        state = self.states.get(request.get('key'))
+        up_to_date = state is not None and not state.is_fresh and \
+            state.gn_key == request.get('gn_key') and \
+            os.path.exists(os.path.join(state.preloader.config.out_path, 'build.ninja'))
+        return {'up_to_date': up_to_date}
+
+    def record_gn(self, request: dict) -> dict:
+        state = self.states.get(request.get('key'))
+        if state is not None:
+            state.gn_key = request.get('gn_key')
+        return {}
+
+    def statistics(self) -> dict:
+        return {
+            'states': len(self.states),
+            'hit_times': self.hit_times,
+            'miss_times': self.miss_times,
+        }
+
+    def _reload(self, key: str, loader_args: dict) -> LoadState:
+        # Drop the cached Config so 'hb set' changes in out/ohos_config.json are seen
+        Singleton._instances.pop(Config, None)
+        from services.preloader import OHOSPreloader
+        from services.loader import OHOSLoader
+        preloader = OHOSPreloader()
+        preloader.run()
+        loader = OHOSLoader()
+        for arg_name, arg_value in loader_args.items():
+            loader.regist_arg(arg_name, arg_value)
+        loader.run()
+        state = LoadState(key, preloader, loader)
+        state.collect_inputs()
+        state.is_fresh = True
+        return state
+
+
+def start_server(host: str, port: int):
+    server_address = (host, port)
+    try:
+        daemon = HbDaemon(server_address, HbDaemonRequestHandler)
+        LogUtil.hb_info('Starting hb daemon at {}:{}'.format(host, port))
+        daemon.record_daemon_config()
+        daemon.serve_forever()
+    except OSError as err:
+        if err.errno == errno.EADDRINUSE:
+            start_server(host, port + 2)
+        else:
+            LogUtil.hb_warning('Failed to start hb daemon process')
+
+
+class Daemon(ServiceInterface):
+    """Client side of the hb daemon, used by 'hb daemon' and 'hb build'."""
+
+    def __init__(self):
+        super().__init__()
+        self._address = None
+
+    def regist_arg(self, arg_name: str, arg_value):
+        self._args_dict[arg_name] = arg_value
+
+    def run(self):
+        start_server(LOCALHOST, HB_DAEMON_PORT)
+
+    def start(self):
+        if self.is_available():
+            LogUtil.hb_info('hb daemon is already running at {}:{}'.format(*self._address))
+            return
+        os.makedirs(DAEMON_DIR, exist_ok=True)
+        with open(DAEMON_LOG_FILE, 'at', encoding='utf-8') as log_file:
+            subprocess.Popen([sys.executable, os.path.join(CURRENT_HB_DIR, 'main.py'), 'daemon', '--serve'],
+                             stdout=log_file, stderr=subprocess.STDOUT, start_new_session=True)
+        for _ in range(50):
+            if self.is_available():
+                LogUtil.hb_info('hb daemon started at {}:{}, log: {}'.format(
+                    self._address[0], self._address[1], DAEMON_LOG_FILE))
+                return
+            time.sleep(0.1)
+        LogUtil.hb_warning('hb daemon did not come up, please check {}'.format(DAEMON_LOG_FILE))
+
+    def stop(self):
+        if self._request('stop_service') is not None:
+            LogUtil.hb_info('hb daemon stopped')
+
+    def show_statistics(self):
+        reply = self._request('show_statistics')
+        if reply is None:
+            LogUtil.hb_info('hb daemon is not running')
+            return
+        LogUtil.hb_info('hb daemon cached states: {}'.format(reply.get('states')))
+        LogUtil.hb_info('hb daemon reused loads: {}'.format(reply.get('hit_times')))
+        LogUtil.hb_info('hb daemon reloaded loads: {}'.format(reply.get('miss_times')))
+
+    def is_available(self) -> bool:
+        reply = self._request('ping', timeout=1)
+        return reply is not None and reply.get('root') == CURRENT_OHOS_ROOT
+
+    def load(self, loader_args: dict) -> bool:
+        """Ask the daemon to bring out/preloader and build_configs up to date.
+        :return: False when the caller has to run preloader and loader itself.
+        """
+        reply = self._request('load', {
+            'key': self._state_key(loader_args),
+            'product': Config().product,
+            'loader_args': loader_args,
+        })
+        if reply is None or reply.get('status') == 'failed':
+            LogUtil.hb_warning('hb daemon could not load build config, fall back to local load')
+            return False
+        if reply.get('status') == 'unchanged':
+            LogUtil.hb_info('hb daemon: build config unchanged, skip preload and load')
+        else:
+            LogUtil.hb_info('hb daemon: build config reloaded in {} s, reason: {}'.format(
+                reply.get('cost'), reply.get('reason')))
+        return True
+
+    def is_gn_up_to_date(self, loader_args: dict, target_generator) -> bool:
+        reply = self._request('check_gn', {
+            'key': self._state_key(loader_args),
+            'gn_key': self._gn_key(target_generator),
+        })
+        return reply is not None and reply.get('up_to_date', False)
+
+    def record_gn(self, loader_args: dict, target_generator):
+        self._request('record_gn', {
+            'key': self._state_key(loader_args),
+            'gn_key': self._gn_key(target_generator),
+        })
+
+    def _state_key(self, loader_args: dict) -> str:
+        config = Config()
+        return _digest({
+            'product': config.product,
+            'product_json': config.product_json,
+            'device_path': config.device_path,
+            'out_path': config.out_path,
+            'os_level': config.os_level,
+            'target_os': config.target_os,
+            'target_cpu': config.target_cpu,
+            'compile_config': config.compile_config,
+            'subsystem_config_json': config.subsystem_config_json,
+            'loader_args': {key: value for key, value in loader_args.items()
+                            if key not in _VOLATILE_LOADER_ARGS},
+        })
+
+    def _gn_key(self, target_generator) -> str:
+        gn_args = {key: value for key, value in target_generator.args_dict.items()
+                   if key not in _VOLATILE_GN_ARGS}
+        return _digest({'args': gn_args, 'flags': target_generator.flags_dict})
+
+    def _request(self, method: str, data: dict = None, timeout=None):
+        if self._address is None:
+            if not os.path.exists(DAEMON_CONFIG_FILE):
+                return None
+            try:
+                daemon_config = IoUtil.read_json_file(DAEMON_CONFIG_FILE)
+            except ValueError:
+                return None
+            self._address = (daemon_config.get('host'), daemon_config.get('port'))
+        body = json.dumps(data or {}).encode('utf-8')
+        try:
+            conn = client.HTTPConnection(self._address[0], self._address[1], timeout=timeout)
+            conn.request(method, '/', body=body, headers={'Content-Length': str(len(body))})
+            response = conn.getresponse()
+            reply = json.loads(response.read().decode('utf-8'))
+            conn.close()
+            return reply
+        except (OSError, ValueError, client.HTTPException):
+            return None
@@ -31,6 +31,7 @@ from containers.arg import Arg, ModuleType
 from util.system_util import SystemUtil
 from util.io_util import IoUtil
 from util.log_util import LogUtil
+from util.trace_util import TraceUtil
 
 
 class CMDTYPE(Enum):
@@ -100,6 +101,10 @@ class Gn(BuildFileGeneratorInterface):
                       self.config.out_path] + self._convert_flags()
         if self.config.os_level == 'mini' or self.config.os_level == 'small':
             gn_gen_cmd.append(f'--script-executable={sys.executable}')
+        gn_tracelog = os.path.join(self.config.out_path, 'gn_trace.json')
+        if TraceUtil.is_enabled():
+            gn_gen_cmd.append(f'--tracelog={gn_tracelog}')
+        gn_start_time = TraceUtil.now_us()
         LogUtil.write_log(self.config.log_path, 'Excuting gn command: {} {} --args="{}" {}'.format(
             self.exec, 'gen',
             ' '.join(self._convert_args()).replace('"', "\\\""),
@@ -126,6 +131,9 @@ class Gn(BuildFileGeneratorInterface):
             animation_thread.join()
         else:
             SystemUtil.exec_command(gn_gen_cmd, self.config.log_path)
+        TraceUtil.add_span('gn gen', 'gn', gn_start_time, TraceUtil.now_us() - gn_start_time)
+        if TraceUtil.is_enabled():
+            TraceUtil.add_gn_tracelog(gn_tracelog, gn_start_time)
 
     '''Description: Execute 'gn path' command using registed args
     @parameter: kwargs TBD
@@ -19,6 +19,7 @@ from abc import abstractmethod
 from services.interface.service_interface import ServiceInterface
 from resources.config import Config
 from util.log_util import LogUtil
+from util.trace_util import TraceUtil
 
 
 class LoadInterface(ServiceInterface):
@@ -47,26 +48,30 @@ class LoadInterface(ServiceInterface):
         self._args_dict[arg_name] = arg_value
 
     def run(self):
-        self.__post_init__()
-        self._execute_loader_args_display()
-        self._check_parts_config_info()
-        self._generate_subsystem_configs()
-        self._generate_target_platform_parts()
-        self._generate_system_capabilities()
-        self._generate_stub_targets()
-        self._generate_platforms_part_by_src()
-        self._generate_target_gn()
-        self._generate_phony_targets_build_file()
-        self._generate_required_parts_targets()
-        self._generate_required_parts_targets_list()
-        self._generate_src_flag()
-        self._generate_auto_install_part()
-        self._generate_platforms_list()
-        self._generate_part_different_info()
-        self._generate_infos_for_testfwk()
-        self._check_product_part_feature()
-        self._generate_syscap_files()
-        self._cropping_components()
+        for generator in [
+                self.__post_init__,
+                self._execute_loader_args_display,
+                self._check_parts_config_info,
+                self._generate_subsystem_configs,
+                self._generate_target_platform_parts,
+                self._generate_system_capabilities,
+                self._generate_stub_targets,
+                self._generate_platforms_part_by_src,
+                self._generate_target_gn,
+                self._generate_phony_targets_build_file,
+                self._generate_required_parts_targets,
+                self._generate_required_parts_targets_list,
+                self._generate_src_flag,
+                self._generate_auto_install_part,
+                self._generate_platforms_list,
+                self._generate_part_different_info,
+                self._generate_infos_for_testfwk,
+                self._check_product_part_feature,
+                self._generate_syscap_files,
+                self._cropping_components
+        ]:
+            with TraceUtil.span(generator.__name__, 'loader'):
+                generator()
 
     @abstractmethod
     def _execute_loader_args_display(self):
@@ -19,6 +19,7 @@ from abc import abstractmethod
 from services.interface.service_interface import ServiceInterface
 from resources.config import Config
 from util.log_util import LogUtil
+from util.trace_util import TraceUtil
 
 
 class PreloadInterface(ServiceInterface):
@@ -47,20 +48,35 @@ class PreloadInterface(ServiceInterface):
         self._args_dict[arg_name] = arg_value
 
     def run(self):
-        self.__post_init__()
-        self._generate_build_prop()
-        self._generate_build_config_json()
-        self._generate_parts_json()
-        self._generate_parts_config_json()
-        self._generate_build_gnargs_prop()
-        self._generate_features_json()
-        self._generate_syscap_json()
-        self._generate_exclusion_modules_json()
-        self._generate_platforms_build()
-        self._generate_subsystem_config_json()
-        self._generate_systemcapability_json()
-        self._generate_compile_standard_whitelist_json()
-        self._generate_compile_env_allowlist_json()
+        if self._check_fingerprint():
+            return
+        for generator in [
+                self.__post_init__,
+                self._generate_build_prop,
+                self._generate_build_config_json,
+                self._generate_parts_json,
+                self._generate_parts_config_json,
+                self._generate_build_gnargs_prop,
+                self._generate_features_json,
+                self._generate_syscap_json,
+                self._generate_exclusion_modules_json,
+                self._generate_platforms_build,
+                self._generate_subsystem_config_json,
+                self._generate_systemcapability_json,
+                self._generate_compile_standard_whitelist_json,
+                self._generate_compile_env_allowlist_json
+        ]:
+            with TraceUtil.span(generator.__name__, 'preloader'):
+                generator()
+        self._save_fingerprint()
+
+    @abstractmethod
+    def _check_fingerprint(self) -> bool:
+        pass
+
+    @abstractmethod
+    def _save_fingerprint(self):
+        pass
 
     @abstractmethod
     def _generate_build_prop(self):
@@ -58,6 +58,7 @@ class OHOSLoader(LoadInterface):
         self.subsystem_configs = ""
         self._subsystem_info = ""
         self.skip_partlist_check = ""
+        self.load_jobs = ""
 
     def __post_init__(self):
         self.source_root_dir = self.config.root_path + '/'
@@ -103,6 +104,7 @@ class OHOSLoader(LoadInterface):
         self.ignore_api_check = self.args_dict.get('ignore_api_check')
         self.load_test_config = self.args_dict.get('load_test_config')
         self.skip_partlist_check = self.args_dict.get('skip_partlist_check')
+        self.load_jobs = self.args_dict.get('load_jobs', '')
 
         self._subsystem_info = subsystem_info.get_subsystem_info(
             self.subsystem_config_file,
@@ -135,7 +137,8 @@ class OHOSLoader(LoadInterface):
             overrided_components,
             bundle_subsystem_allow_list,
             self.skip_partlist_check,
-            self.build_xts)
+            self.build_xts,
+            self.load_jobs)
         self.parts_targets = self.parts_config_info.get('parts_targets')
         self.phony_targets = self.parts_config_info.get('phony_target')
         self.parts_info = self.parts_config_info.get('parts_info')
@@ -860,6 +863,7 @@ class OHOSLoader(LoadInterface):
         args.append('ignore_api_check={}'.format(self.ignore_api_check))
         args.append('scalable_build={}'.format(self.scalable_build))
         args.append('skip_partlist_check={}'.format(self.skip_partlist_check))
+        args.append('load_jobs={}'.format(self.load_jobs))
         LogUtil.write_log(self.config.log_path,
                           'loader args:{}'.format(args), 'info')
 
@@ -25,6 +25,7 @@ from resources.config import Config
 from util.system_util import SystemUtil, ExecEnviron
 from util.io_util import IoUtil
 from util.log_util import LogUtil
+from util.trace_util import TraceUtil
 
 
 class Ninja(BuildExecutorInterface):
@@ -66,13 +67,21 @@ class Ninja(BuildExecutorInterface):
             )
 
         log_filter = os.getenv("LOG_FILTER", "True") == "True"
-        SystemUtil.exec_command(
-            ninja_cmd,
-            self.config.log_path,
-            exec_env=ninja_env.allenv,
-            log_filter=log_filter,
-            log_mode=self.config.log_mode
-        )
+        ninja_log = os.path.join(self.config.out_path, '.ninja_log')
+        ninja_log_offset = os.path.getsize(ninja_log) if os.path.isfile(ninja_log) else 0
+        ninja_start_time = TraceUtil.now_us()
+        try:
+            SystemUtil.exec_command(
+                ninja_cmd,
+                self.config.log_path,
+                exec_env=ninja_env.allenv,
+                log_filter=log_filter,
+                log_mode=self.config.log_mode
+            )
+        finally:
+            TraceUtil.add_span('ninja', 'ninja', ninja_start_time, TraceUtil.now_us() - ninja_start_time)
+            if TraceUtil.is_enabled():
+                TraceUtil.add_ninja_log(ninja_log, ninja_start_time, ninja_log_offset)
 
     def _convert_args(self) -> list:
         """convert all registed args into a list
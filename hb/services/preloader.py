@@ -16,7 +16,9 @@
 # limitations under the License.
 
 import os
-import stat
+import sys
+import json
+import hashlib
 
 from services.interface.preload_interface import PreloadInterface
 from util.io_util import IoUtil
@@ -41,6 +43,12 @@ class OHOSPreloader(PreloadInterface):
         self._build_vars = {}
         self._compile_standard_whitelist_info = {}
         self._compile_env_allowlist_info = {}
+        self._fingerprint = ""
+        self._fingerprint_inputs = {}
+
+    @property
+    def fingerprint_files(self) -> list:
+        return list(self._fingerprint_inputs.get('files', {}).keys())
 
     def __post_init__(self):
         self._dirs = Dirs(self._config)
@@ -72,7 +80,7 @@ class OHOSPreloader(PreloadInterface):
                                             self._dirs.preloader_output_dir)
         }
         platform_config = {'version': 2, 'platforms': {'phone': config}}
-        IoUtil.dump_json_file(self._outputs.platforms_build, platform_config)
+        IoUtil.dump_json_file_if_changed(self._outputs.platforms_build, platform_config)
         LogUtil.hb_info(
             'generated platforms build info to {}/platforms.build'.format(
                 self._dirs.preloader_output_dir), mode=self.config.log_mode)
@@ -100,9 +108,7 @@ class OHOSPreloader(PreloadInterface):
             else:
                 raise Exception("part feature '{key}:{val}' type not support.")
             attr_list.append(_item)
-        with os.fdopen(os.open(self._outputs.build_gnargs_prop,
-                               os.O_RDWR | os.O_CREAT, stat.S_IWUSR | stat.S_IRUSR), 'w') as fobj:
-            fobj.write('\n'.join(attr_list))
+        IoUtil.write_file_if_changed(self._outputs.build_gnargs_prop, '\n'.join(attr_list))
         LogUtil.hb_info(
             'generated build gnargs prop info to {}/build_gnargs.prop'.format(
                 self._dirs.preloader_output_dir), mode=self.config.log_mode)
@@ -126,7 +132,7 @@ class OHOSPreloader(PreloadInterface):
             "features": all_features,
             "part_to_feature": part_feature_map
         }
-        IoUtil.dump_json_file(self._outputs.features_json, parts_feature_info)
+        IoUtil.dump_json_file_if_changed(self._outputs.features_json, parts_feature_info)
         LogUtil.hb_info(
             'generated features info to {}/features.json'.format(
                 self._dirs.preloader_output_dir), mode=self.config.log_mode)
@@ -148,7 +154,7 @@ class OHOSPreloader(PreloadInterface):
             "syscap": all_syscap,
             "part_to_syscap": part_syscap_map
         }
-        IoUtil.dump_json_file(self._outputs.syscap_json, parts_syscap_info)
+        IoUtil.dump_json_file_if_changed(self._outputs.syscap_json, parts_syscap_info)
         LogUtil.hb_info(
             'generated syscap info to {}/syscap.json'.format(
                 self._dirs.preloader_output_dir), mode=self.config.log_mode)
@@ -166,7 +172,7 @@ class OHOSPreloader(PreloadInterface):
                 pair = dict()
                 pair[_part_name] = _exclusions
                 exclusions.update(pair)
-        IoUtil.dump_json_file(self._outputs.exclusion_modules_json, exclusions)
+        IoUtil.dump_json_file_if_changed(self._outputs.exclusion_modules_json, exclusions)
         LogUtil.hb_info(
             'generated exclusion modules info to {}/exclusion_modules.json'.format(
                 self._dirs.preloader_output_dir), mode=self.config.log_mode)
@@ -177,7 +183,7 @@ class OHOSPreloader(PreloadInterface):
     '''
 
     def _generate_build_config_json(self):
-        IoUtil.dump_json_file(
+        IoUtil.dump_json_file_if_changed(
             self._outputs.build_config_json, self._build_vars)
         LogUtil.hb_info(
             'generated build config info to {}/build_config.json'.format(
@@ -192,9 +198,7 @@ class OHOSPreloader(PreloadInterface):
         build_vars_list = []
         for key, value in self._build_vars.items():
             build_vars_list.append('{}={}'.format(key, value))
-        with os.fdopen(os.open(self._outputs.build_prop,
-                               os.O_RDWR | os.O_CREAT, stat.S_IWUSR | stat.S_IRUSR), 'w') as fobj:
-            fobj.write('\n'.join(build_vars_list))
+        IoUtil.write_file_if_changed(self._outputs.build_prop, '\n'.join(build_vars_list))
         LogUtil.hb_info(
             'generated build prop info to {}/build.prop'.format(
                 self._dirs.preloader_output_dir), mode=self.config.log_mode)
@@ -206,7 +210,7 @@ class OHOSPreloader(PreloadInterface):
 
     def _generate_parts_json(self):
         parts_info = {"parts": sorted(list(self._all_parts.keys()))}
-        IoUtil.dump_json_file(self._outputs.parts_json, parts_info)
+        IoUtil.dump_json_file_if_changed(self._outputs.parts_json, parts_info)
         LogUtil.hb_info(
             'generated product parts info to {}/parts.json'.format(
                 self._dirs.preloader_output_dir), mode=self.config.log_mode)
@@ -224,7 +228,7 @@ class OHOSPreloader(PreloadInterface):
             part = part.replace(".", "_")
             part = part.replace("/", "_")
             parts_config[part] = True
-        IoUtil.dump_json_file(self._outputs.parts_config_json, parts_config)
+        IoUtil.dump_json_file_if_changed(self._outputs.parts_config_json, parts_config)
         LogUtil.hb_info(
             'generated parts config info to {}/parts_config.json'.format(
                 self._dirs.preloader_output_dir), mode=self.config.log_mode)
@@ -240,7 +244,7 @@ class OHOSPreloader(PreloadInterface):
                 self._product._get_product_specific_subsystem())
             self._subsystem_info.update(
                 self._product._get_device_specific_subsystem())
-        IoUtil.dump_json_file(
+        IoUtil.dump_json_file_if_changed(
             self._outputs.subsystem_config_json, self._subsystem_info)
         LogUtil.hb_info(
             'generated subsystem config info to {}/subsystem_config.json'.format(
@@ -252,7 +256,7 @@ class OHOSPreloader(PreloadInterface):
     '''
 
     def _generate_systemcapability_json(self):
-        IoUtil.dump_json_file(
+        IoUtil.dump_json_file_if_changed(
             self._outputs.systemcapability_json, self._product._syscap_info)
         LogUtil.hb_info(
             'generated system capability info to {}/systemcapability.json'.format(
@@ -264,14 +268,14 @@ class OHOSPreloader(PreloadInterface):
     '''
 
     def _generate_compile_standard_whitelist_json(self):
-        IoUtil.dump_json_file(
+        IoUtil.dump_json_file_if_changed(
             self._outputs.compile_standard_whitelist_json, self._compile_standard_whitelist_info)
         LogUtil.hb_info(
             'generated compile_standard_whitelist info to {}/compile_standard_whitelist.json'
             .format(self._dirs.preloader_output_dir), mode=self.config.log_mode)
 
     def _generate_compile_env_allowlist_json(self):
-        IoUtil.dump_json_file(
+        IoUtil.dump_json_file_if_changed(
             self._outputs.compile_env_allowlist_json, self._compile_env_allowlist_info
         )
         LogUtil.hb_info(
@@ -280,6 +284,125 @@ class OHOSPreloader(PreloadInterface):
             )
         )
 
+# fingerprint method
+
+    '''Description: fingerprint all preloader inputs and compare with the last run,
+        the fingerprint and the reason of a cache miss are written to build log
+    @parameter:none
+    @return :True if inputs are unchanged and all outputs exist, preload can be skipped
+    '''
+
+    def _check_fingerprint(self) -> bool:
+        self._dirs = Dirs(self._config)
+        self._outputs = Outputs(self._dirs.preloader_output_dir)
+        self._fingerprint_inputs = self._get_fingerprint_inputs()
+        self._fingerprint = hashlib.sha256(json.dumps(
+            self._fingerprint_inputs, sort_keys=True).encode('utf-8')).hexdigest()
+        reason = self._get_cache_miss_reason()
+        if reason:
+            LogUtil.write_log(self.config.log_path,
+                              'preloader fingerprint {}, cache miss: {}'.format(self._fingerprint, reason), 'info')
+            return False
+        LogUtil.write_log(self.config.log_path,
+                          'preloader fingerprint {} unchanged, skip preload'.format(self._fingerprint), 'info')
+        return True
+
+    '''Description: save fingerprint to "out/preloader/{product_name}/preloader_fingerprint.json"
+    @parameter:none
+    @return :none
+    '''
+
+    def _save_fingerprint(self):
+        IoUtil.dump_json_file(self._outputs.preloader_fingerprint_json, {
+            'fingerprint': self._fingerprint,
+            'inputs': self._fingerprint_inputs
+        })
+
+    def _get_cache_miss_reason(self) -> str:
+        if not os.path.isfile(self._outputs.preloader_fingerprint_json):
+            return 'no fingerprint of last preload'
+        try:
+            last_fingerprint = IoUtil.read_json_file(self._outputs.preloader_fingerprint_json)
+        except ValueError:
+            return 'fingerprint of last preload is broken'
+        if last_fingerprint.get('fingerprint') == self._fingerprint:
+            for output in self._get_generated_outputs():
+                if not os.path.exists(output):
+                    return "output '{}' is missing".format(output)
+            return ''
+        last_inputs = last_fingerprint.get('inputs', {})
+        for section in ['config', 'files']:
+            current = self._fingerprint_inputs.get(section, {})
+            last = last_inputs.get(section, {})
+            for key in sorted(set(current) | set(last)):
+                if current.get(key) != last.get(key):
+                    return "{} '{}' changed".format(section, key)
+        return 'preloader inputs changed'
+
+    def _get_generated_outputs(self) -> list:
+        return [
+            self._outputs.build_prop, self._outputs.build_config_json,
+            self._outputs.parts_json, self._outputs.parts_config_json,
+            self._outputs.build_gnargs_prop, self._outputs.features_json,
+            self._outputs.syscap_json, self._outputs.exclusion_modules_json,
+            self._outputs.platforms_build, self._outputs.subsystem_config_json,
+            self._outputs.systemcapability_json, self._outputs.compile_standard_whitelist_json,
+            self._outputs.compile_env_allowlist_json
+        ]
+
+    def _get_fingerprint_inputs(self) -> dict:
+        config = self.config
+        config_info = {
+            'root_path': config.root_path,
+            'product': config.product,
+            'product_json': config.product_json,
+            'product_path': config.product_path,
+            'device_path': config.device_path,
+            'os_level': config.os_level,
+            'target_os': config.target_os,
+            'target_cpu': config.target_cpu,
+            'compile_config': config.compile_config,
+            'subsystem_config_json': config.subsystem_config_json,
+        }
+        files_info = {}
+        for _file in self._get_fingerprint_files():
+            files_info[_file] = _get_file_digest(_file)
+        return {'config': config_info, 'files': files_info}
+
+    def _get_fingerprint_files(self) -> list:
+        source_root_dir = self._dirs.source_root_dir
+        scripts_dir = os.path.dirname(sys.modules[Product.__module__].__file__)
+        fingerprint_files = [os.path.abspath(__file__)]
+        fingerprint_files.extend(sorted(os.path.join(scripts_dir, name)
+                                        for name in os.listdir(scripts_dir) if name.endswith('.py')))
+        fingerprint_files.append(self.config.product_json)
+        if os.path.isfile(self.config.product_json):
+            product_config = IoUtil.read_json_file(self.config.product_json)
+            for _config in product_config.get('inherit', []):
+                fingerprint_files.append(os.path.join(source_root_dir, _config))
+            for key in ['system_component', 'ext_root_proc_conf_path', 'ext_critical_proc_conf_path',
+                        'ext_sanitizer_check_list_path', 'chipprod_config_path', 'ext_sdk_config_file',
+                        'ext_ndk_config_file', 'ext_sign_hap_py_path']:
+                if product_config.get(key):
+                    fingerprint_files.append(os.path.join(source_root_dir, product_config.get(key)))
+            if product_config.get('version') == '2.0' and product_config.get('product_device'):
+                fingerprint_files.append(os.path.join(self._dirs.built_in_device_dir, '{}.json'.format(
+                    product_config.get('product_device'))))
+            if product_config.get('based_on_mininum_system') == 'true':
+                default_os_level = 'standard' if product_config.get('version') == '2.0' else 'mini'
+                fingerprint_files.append(os.path.join(self._dirs.built_in_base_dir, '{}_system.json'.format(
+                    product_config.get('type', default_os_level))))
+        fingerprint_files.append(self._dirs.subsystem_config_json)
+        fingerprint_files.append(self._dirs.subsystem_config_overlay_json)
+        for name in ['compile_standard_whitelist.json', 'compile_env_allowlist.json']:
+            fingerprint_files.append(os.path.join(source_root_dir, 'out/products_ext', self.config.product, name))
+            fingerprint_files.append(os.path.join(source_root_dir, 'build', name))
+        fingerprint_files.append(os.path.join(source_root_dir, 'out/products_ext', 'global_ext_var_file.gni'))
+        if self.config.os_level in ['mini', 'small']:
+            for root, _, files in os.walk(self._dirs.lite_components_dir):
+                fingerprint_files.extend(sorted(os.path.join(root, name) for name in files if name.endswith('.json')))
+        return fingerprint_files
+
 # get method
 
     def _get_org_subsystem_info(self) -> dict:
@@ -321,3 +444,12 @@ class OHOSPreloader(PreloadInterface):
 
         allow_env = IoUtil.read_json_file(allow_env_file)
         return allow_env
+
+
+def _get_file_digest(file_path: str):
+    if os.path.isfile(file_path):
+        with open(file_path, 'rb') as input_f:
+            return hashlib.sha256(input_f.read()).hexdigest()
+    if os.path.exists(file_path):
+        return 'dir'
+    return None
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Startup benchmark of hb.
+
+Runs cold 'hb --help' and 'hb env' processes with '-X importtime' and
+fails when hb exits with an error, imports a module listed in
+startup_budget.json, imports more hb modules than budgeted, or gets slower
+than the recorded local baseline.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+HB_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+HB_MAIN = os.path.join(HB_DIR, 'main.py')
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_budget.json')
+HB_PACKAGES = ['containers', 'exceptions', 'helper', 'modules', 'resolver', 'resources', 'services', 'util']
+
+COMMANDS = {
+    'help': ['--help'],
+    'env': ['env'],
+}
+
+
+def _parse_importtime(stderr):
+    '''Description: parse '-X importtime' output
+    @parameter: [stderr]: stderr of the python process
+    @return: {module: (self_us, cumulative_us)} in import order
+    '''
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        imports[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return imports
+
+
+def _run_once(command):
+    start = time.monotonic()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', HB_MAIN] + command,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                          text=True, errors='replace')
+    wall = time.monotonic() - start
+    output = [line for line in proc.stderr.splitlines() if not line.startswith('import time:')]
+    return wall, proc.returncode, _parse_importtime(proc.stderr), output
+
+
+def _is_hb_module(name):
+    return name.split('.')[0] in HB_PACKAGES
+
+
+def measure(name, repeat):
+    walls = []
+    imports = {}
+    returncode = 0
+    output = []
+    for _ in range(repeat):
+        wall, run_returncode, imports, run_output = _run_once(COMMANDS.get(name))
+        walls.append(wall)
+        if run_returncode and not returncode:
+            returncode, output = run_returncode, run_output
+    walls.sort()
+    return {
+        'wall_min': round(walls[0], 4),
+        'wall_median': round(walls[len(walls) // 2], 4),
+        'import_total': round(sum(item[0] for item in imports.values()) / 1000000, 4),
+        'modules': list(imports.keys()),
+        'hb_modules': [module for module in imports if _is_hb_module(module)],
+        'slowest': sorted(imports.items(), key=lambda item: item[1][1], reverse=True)[:10],
+        'returncode': returncode,
+        'output': output[-10:]
+    }
+
+
+def check(name, result, budget, baseline, tolerance):
+    errors = []
+    if result.get('returncode'):
+        # Timings of a crashed hb are meaningless, they are neither checked nor recorded.
+        return ["'hb {}' exited with {}".format(name, result.get('returncode'))]
+    command_budget = budget.get(name, {})
+    for module in result.get('modules'):
+        for forbidden in command_budget.get('forbidden_modules', []):
+            if module == forbidden or module.startswith(forbidden + '.'):
+                errors.append("'hb {}' imports forbidden module '{}'".format(name, module))
+    max_hb_modules = command_budget.get('max_hb_modules')
+    if max_hb_modules is not None and len(result.get('hb_modules')) > max_hb_modules:
+        errors.append("'hb {}' imports {} hb modules, budget is {}".format(
+            name, len(result.get('hb_modules')), max_hb_modules))
+    last = baseline.get(name)
+    if last:
+        limit = last.get('wall_median') * (1 + tolerance)
+        if result.get('wall_median') > limit:
+            errors.append("'hb {}' takes {} s, baseline is {} s (limit {} s)".format(
+                name, result.get('wall_median'), last.get('wall_median'), round(limit, 4)))
+    return errors
+
+
+def report(name, result):
+    print('hb {}: wall min {} s, median {} s, imports {} s, {} modules ({} from hb)'.format(
+        name, result.get('wall_min'), result.get('wall_median'), result.get('import_total'),
+        len(result.get('modules')), len(result.get('hb_modules'))))
+    if result.get('returncode'):
+        print('  error: hb {} exited with {}'.format(name, result.get('returncode')))
+        for line in result.get('output'):
+            print('    {}'.format(line))
+    for module, (_, cumulative) in result.get('slowest'):
+        print('  {:>10} us  {}'.format(cumulative, module))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown against the baseline, 0.2 means 20%%')
+    parser.add_argument('--baseline', default=os.path.join(HB_DIR, '..', '..', 'out', 'hb_benchmark',
+                                                           'startup_baseline.json'))
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    with open(BUDGET_FILE, 'r') as input_f:
+        budget = json.load(input_f)
+    baseline = {}
+    if os.path.isfile(args.baseline) and not args.update_baseline:
+        with open(args.baseline, 'r') as input_f:
+            baseline = json.load(input_f)
+
+    errors = []
+    results = {}
+    failed = False
+    for name in COMMANDS:
+        result = measure(name, args.repeat)
+        report(name, result)
+        failed = failed or bool(result.get('returncode'))
+        errors.extend(check(name, result, budget, baseline, args.tolerance))
+        results[name] = {'wall_median': result.get('wall_median'), 'import_total': result.get('import_total')}
+
+    if failed:
+        print('baseline not written, hb failed')
+    elif args.update_baseline or not baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as output_f:
+            json.dump(results, output_f, indent=2)
+        print('baseline written to {}'.format(os.path.abspath(args.baseline)))
+    for error in errors:
+        print('error: {}'.format(error))
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
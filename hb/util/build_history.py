@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sqlite3
+import subprocess
+
+from exceptions.ohos_exception import OHOSException
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS builds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    start_time TEXT,
+    product TEXT,
+    commit_id TEXT,
+    build_time REAL,
+    ccache_hit INTEGER,
+    ccache_miss INTEGER
+);
+CREATE TABLE IF NOT EXISTS actions (
+    build_id INTEGER,
+    target TEXT,
+    part TEXT,
+    subsystem TEXT,
+    duration INTEGER
+);
+CREATE TABLE IF NOT EXISTS phases (
+    build_id INTEGER,
+    phase TEXT,
+    duration INTEGER
+);
+CREATE INDEX IF NOT EXISTS actions_build_idx ON actions (build_id);
+CREATE INDEX IF NOT EXISTS actions_target_idx ON actions (target);
+CREATE INDEX IF NOT EXISTS actions_part_idx ON actions (part);
+CREATE INDEX IF NOT EXISTS builds_commit_idx ON builds (commit_id);
+'''
+
+
+def get_commit_id(root_path: str) -> str:
+    for repo_path in (root_path, os.path.join(root_path, 'build')):
+        try:
+            output = subprocess.run(['git', '-C', repo_path, 'rev-parse', 'HEAD'],
+                                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                    check=True).stdout
+        except (OSError, subprocess.CalledProcessError):
+            continue
+        return output.decode().strip()
+    return ''
+
+
+class BuildHistory(object):
+    """sqlite database of action timings, ccache results and phase
+    durations of the last builds, timings are in milliseconds.
+    """
+
+    # Number of builds kept, the actions of older builds are deleted.
+    MAX_BUILDS = 50
+
+    def __init__(self, db_file: str, max_builds: int = MAX_BUILDS):
+        self._max_builds = max_builds
+        os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+        self._conn = sqlite3.connect(db_file)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def add_build(self, build: dict, actions: list, phases: dict) -> int:
+        '''Description: add one build, and delete the builds older than the last max_builds
+        @parameter: [build]: start_time, product, commit_id, build_time, ccache_hit
+            and ccache_miss of the build, [actions]: (target, part, subsystem, duration)
+            tuples, [phases]: phase name to duration
+        @return: id of the build
+        '''
+        with self._conn:
+            cursor = self._conn.execute(
+                'INSERT INTO builds (start_time, product, commit_id, build_time, ccache_hit, ccache_miss) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (build.get('start_time'), build.get('product'), build.get('commit_id'),
+                 build.get('build_time'), build.get('ccache_hit'), build.get('ccache_miss')))
+            build_id = cursor.lastrowid
+            self._conn.executemany(
+                'INSERT INTO actions (build_id, target, part, subsystem, duration) VALUES (?, ?, ?, ?, ?)',
+                [(build_id,) + tuple(action) for action in actions])
+            self._conn.executemany(
+                'INSERT INTO phases (build_id, phase, duration) VALUES (?, ?, ?)',
+                [(build_id, phase, duration) for phase, duration in phases.items()])
+            self._prune()
+        return build_id
+
+    def _prune(self):
+        row = self._conn.execute('SELECT id FROM builds ORDER BY id DESC LIMIT 1 OFFSET ?',
+                                 (self._max_builds - 1,)).fetchone()
+        if row is None:
+            return
+        for table, column in (('actions', 'build_id'), ('phases', 'build_id'), ('builds', 'id')):
+            self._conn.execute('DELETE FROM {} WHERE {} < ?'.format(table, column), (row[0],))
+
+    def list_builds(self, limit: int = 20) -> list:
+        return self._conn.execute(
+            'SELECT id, start_time, product, commit_id, build_time FROM builds '
+            'ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+
+    def find_build(self, build_ref: str) -> int:
+        '''Description: find a build by id, commit id prefix, 'latest' or 'previous'
+        @parameter: [build_ref]: build reference
+        @return: id of the build
+        '''
+        if build_ref in ('latest', 'previous'):
+            rows = self._conn.execute('SELECT id FROM builds ORDER BY id DESC LIMIT 2').fetchall()
+            index = 0 if build_ref == 'latest' else 1
+            row = rows[index] if len(rows) > index else None
+        elif build_ref.isdigit():
+            row = self._conn.execute('SELECT id FROM builds WHERE id = ?', (int(build_ref),)).fetchone()
+        else:
+            row = self._conn.execute('SELECT id FROM builds WHERE commit_id LIKE ? ORDER BY id DESC LIMIT 1',
+                                     (build_ref + '%',)).fetchone()
+        if row is None:
+            raise OHOSException('Build "{}" not found in build history'.format(build_ref), '3015')
+        return row[0]
+
+    def diff(self, build_a: int, build_b: int, threshold: float, min_delta: int) -> dict:
+        '''Description: compare two builds, actions and parts are regressed when
+            their cost in build_b is at least threshold times and min_delta ms
+            more than in build_a
+        @parameter: [build_a]: base build id, [build_b]: new build id,
+            [threshold]: regression ratio, [min_delta]: minimum regression in ms
+        @return: regressed actions, parts and phases
+        '''
+        result = {}
+        queries = {
+            'actions': 'SELECT target, SUM(duration) FROM actions WHERE build_id = ? GROUP BY target',
+            'parts': "SELECT part, SUM(duration) FROM actions WHERE build_id = ? AND part != '' GROUP BY part",
+            'subsystems': 'SELECT subsystem, SUM(duration) FROM actions '
+                          "WHERE build_id = ? AND subsystem != '' GROUP BY subsystem",
+            'phases': 'SELECT phase, SUM(duration) FROM phases WHERE build_id = ? GROUP BY phase',
+        }
+        for kind, query in queries.items():
+            base = dict(self._conn.execute(query, (build_a,)).fetchall())
+            regressed = []
+            for name, duration in self._conn.execute(query, (build_b,)).fetchall():
+                base_duration = base.get(name)
+                if not base_duration:
+                    continue
+                if duration - base_duration >= min_delta and duration >= base_duration * threshold:
+                    regressed.append((name, base_duration, duration))
+            regressed.sort(key=lambda item: item[2] - item[1], reverse=True)
+            result[kind] = regressed
+        return result
@@ -21,6 +21,7 @@ import json
 import importlib
 import re
 import shutil
+import stat
 
 from hb.helper.no_instance import NoInstance
 from exceptions.ohos_exception import OHOSException
@@ -42,6 +43,28 @@ class IoUtil(metaclass=NoInstance):
         with open(dump_file, 'wt', encoding='utf-8') as json_file:
             json.dump(json_data, json_file, ensure_ascii=False, indent=2)
 
+    @staticmethod
+    def dump_json_file_if_changed(dump_file: str, json_data: dict or list) -> bool:
+        return IoUtil.write_file_if_changed(
+            dump_file, json.dumps(json_data, ensure_ascii=False, indent=2))
+
+    @staticmethod
+    def write_file_if_changed(file_path: str, content: str) -> bool:
+        '''Description: write content to file only when the bytes differ, so
+            unchanged outputs keep their mtime and don't retrigger gn/ninja
+        @parameter: [file_path]: output file, [content]: text to write
+        @return: True when the file was (re)written
+        '''
+        data = content.encode('utf-8')
+        if os.path.isfile(file_path):
+            with open(file_path, 'rb') as input_f:
+                if input_f.read() == data:
+                    return False
+        with os.fdopen(os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                               stat.S_IWUSR | stat.S_IRUSR), 'wb') as output_f:
+            output_f.write(data)
+        return True
+
     @staticmethod
     def read_file(file_path: str):
         if not os.path.exists(file_path):
@@ -15,14 +15,18 @@
 
 import os
 import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 from containers.status import throw_exception
 from util.log_util import LogUtil
+from util.timer_util import TimerUtil
 from resources.config import Config
 from exceptions.ohos_exception import OHOSException
 from scripts.util.file_utils import read_json_file, write_json_file, \
     write_file  # noqa: E402, E501  pylint: disable=C0413, E0611
 from . import load_bundle_file
+from .part_parse_cache import PartParseCache, file_digest
 
 IMPORT_LIST = """
 # import("//build/ohos.gni")
@@ -74,6 +78,10 @@ ohos_part_test("{0}_test") {{
 }}"""
 
 
+# arguments of the running get_parts_info, read by parse workers
+_parse_context = {}
+
+
 def _normalize(label, path):
     if not label.startswith('//'):
         label = '//{}/{}'.format(path, label)
@@ -126,8 +134,23 @@ class PartObject(object):
         self._target_arch = target_arch
         self._system_capabilities = []
         self._overrided_components = overrided_components
+        self._build_gn_digest = ''
         self._parsing_config(self._part_name, part_config, subsystem_name)
 
+    @classmethod
+    def from_record(cls, record, overrided_components):
+        """restore part object from a parse cache record."""
+        part_obj = cls.__new__(cls)
+        part_obj.__dict__.update(record)
+        part_obj._overrided_components = overrided_components
+        return part_obj
+
+    def to_record(self):
+        """part object record saved in the parse cache."""
+        record = dict(self.__dict__)
+        record.pop('_overrided_components')
+        return record
+
     @classmethod
     def _parsing_kits_lib(cls, kit_lib, is_inner_kits=False):
         lib_config = []
@@ -229,7 +252,11 @@ class PartObject(object):
         """output build gn."""
         part_gn_file = os.path.join(config_output_dir, self._part_name,
                                     'BUILD.gn')
+        # skip rewriting and gn format if the formatted file is unchanged
+        if self._build_gn_digest and file_digest(part_gn_file) == self._build_gn_digest:
+            return
         write_file(part_gn_file, '\n'.join(self._build_gn_content))
+        self._build_gn_digest = file_digest(part_gn_file)
 
     def get_target_label(self, config_output_relpath):
         """target label."""
@@ -403,7 +430,8 @@ class LoadBuildConfig(object):
     def __init__(self, source_root_dir, subsystem_build_info,
                  config_output_dir, variant_toolchains, subsystem_name,
                  target_arch, ignored_subsystems, exclusion_modules_config_file,
-                 load_test_config, overrided_components, bundle_subsystem_allow_list):
+                 load_test_config, overrided_components, bundle_subsystem_allow_list,
+                 parse_cache=None):
         self._source_root_dir = source_root_dir
         self._build_info = subsystem_build_info
         self._config_output_relpath = config_output_dir
@@ -425,6 +453,9 @@ class LoadBuildConfig(object):
         self._load_test_config = load_test_config
         self._overrided_components = overrided_components
         self._bundle_subsystem_allow_list = bundle_subsystem_allow_list
+        self._parse_cache = parse_cache
+        self._build_file_keys = {}
+        self._syscap_info = []
 
     @throw_exception
     def _parsing_config(self, parts_config):
@@ -445,8 +476,7 @@ class LoadBuildConfig(object):
                 toolchain = self._variant_toolchains.get(variant)
                 if toolchain is None:
                     continue
-                part_obj = PartObject(part_name, variant, value, toolchain,
-                                      self._subsystem_name, self._target_arch, self._overrided_components)
+                part_obj, part_key = self._get_part_obj(part_name, variant, value, toolchain)
                 real_part_name = part_obj.part_name()
                 self._part_list[real_part_name] = part_obj
 
@@ -454,6 +484,8 @@ class LoadBuildConfig(object):
                     self._config_output_relpath, self._subsystem_name)
                 part_obj.write_build_gn(
                     os.path.join(self._source_root_dir, subsystem_config_dir))
+                if part_key:
+                    self._parse_cache.put_part(part_key, part_obj.to_record())
 
                 _target_label = part_obj.get_target_label(subsystem_config_dir)
                 _build_target[variant] = _target_label
@@ -478,15 +510,25 @@ class LoadBuildConfig(object):
         self._phony_targets = _variant_phony_targets
         self._parts_deps = _parts_deps
 
+    def _get_part_obj(self, part_name, variant, part_config, toolchain):
+        if self._parse_cache is None or part_name not in self._build_file_keys:
+            return PartObject(part_name, variant, part_config, toolchain,
+                              self._subsystem_name, self._target_arch, self._overrided_components), ''
+        full_part_name = '{}:{}'.format(self._subsystem_name, part_name)
+        part_key = self._parse_cache.part_key(self._build_file_keys.get(part_name),
+                                              part_name, variant, toolchain,
+                                              self._subsystem_name, self._target_arch,
+                                              self._overrided_components.get(full_part_name))
+        record = self._parse_cache.get_part(part_key)
+        if record is not None:
+            return PartObject.from_record(record, self._overrided_components), part_key
+        return PartObject(part_name, variant, part_config, toolchain,
+                          self._subsystem_name, self._target_arch, self._overrided_components), part_key
+
     def parse_syscap_info(self):
-        _build_files = self._build_info.get('build_files')
-        subsystem_syscap = []
-        for _build_file in _build_files:
-            if _build_file.endswith('bundle.json'):
-                part_name, part_syscap = get_syscap_from_bundle(_build_file)
-                subsystem_syscap.append(
-                    {'component': part_name, 'syscap': part_syscap})
-        return subsystem_syscap
+        """syscap of bundle.json parts, collected when merging build files."""
+        self.parse()
+        return self._syscap_info
 
     def parse(self):
         """parse part info from build config file."""
@@ -598,13 +640,7 @@ class LoadBuildConfig(object):
         parts_info = {}
         parts_path_dict = {}
         for _build_file in _build_files:
-            if _build_file.endswith('bundle.json'):
-                bundle_part_obj = load_bundle_file.BundlePartObj(
-                    _build_file, self._exclusion_modules_config_file,
-                    self._load_test_config)
-                _parts_config = bundle_part_obj.to_ohos_build()
-            else:
-                _parts_config = read_build_file(_build_file)
+            _build_file_key, _parts_config = self._read_build_config(_build_file)
 
             _subsystem_name = _parts_config.get('subsystem')
             if not is_thirdparty_subsystem and subsystem_name and _subsystem_name != subsystem_name:
@@ -631,12 +667,39 @@ class LoadBuildConfig(object):
             for _pname in _curr_parts_info.keys():
                 parts_path_dict[_pname] = os.path.relpath(
                     os.path.dirname(_build_file), self._source_root_dir)
+                if _build_file_key:
+                    self._build_file_keys[_pname] = _build_file_key
+                else:
+                    self._build_file_keys.pop(_pname, None)
+                if _build_file.endswith('bundle.json'):
+                    self._syscap_info.append({
+                        'component': _pname,
+                        'syscap': _curr_parts_info.get(_pname).get('system_capabilities')
+                    })
             parts_info.update(_curr_parts_info)
         subsystem_config = {}
         subsystem_config['subsystem'] = subsystem_name
         subsystem_config['parts'] = parts_info
         return subsystem_config, parts_path_dict
 
+    def _read_build_config(self, build_file):
+        _build_file_key = ''
+        if self._parse_cache is not None and os.path.isfile(build_file):
+            _build_file_key = self._parse_cache.build_file_key(build_file)
+            _parts_config = self._parse_cache.get_build_config(_build_file_key)
+            if _parts_config is not None:
+                return _build_file_key, _parts_config
+        if build_file.endswith('bundle.json'):
+            bundle_part_obj = load_bundle_file.BundlePartObj(
+                build_file, self._exclusion_modules_config_file,
+                self._load_test_config)
+            _parts_config = bundle_part_obj.to_ohos_build()
+        else:
+            _parts_config = read_build_file(build_file)
+        if _build_file_key:
+            self._parse_cache.put_build_config(_build_file_key, _parts_config)
+        return _build_file_key, _parts_config
+
 
 def compare_subsystem_and_component(subsystem_name, components_name, subsystem_components_whitelist_info,
                                     part_subsystem_component_info, parts_config_path, subsystem_components_list):
@@ -867,6 +930,66 @@ def process_parts_info(parts_config_dict, parts_info_output_path, skip_partlist_
                 _part_subsystem_file), mode=Config.log_mode)
 
 
+def _get_load_jobs(load_jobs):
+    if load_jobs and int(load_jobs) > 0:
+        return int(load_jobs)
+    return os.cpu_count() or 1
+
+
+def _parse_subsystem(subsystem_name):
+    """parse build files of one subsystem, return the infos merged by get_parts_info."""
+    context = _parse_context
+    build_loader = LoadBuildConfig(context.get('source_root_dir'),
+                                   context.get('subsystem_info').get(subsystem_name),
+                                   context.get('config_output_relpath'),
+                                   context.get('variant_toolchains'), subsystem_name,
+                                   context.get('target_arch'), context.get('ignored_subsystems'),
+                                   context.get('exclusion_modules_config_file'),
+                                   context.get('load_test_config'), context.get('overrided_components'),
+                                   context.get('bundle_subsystem_allow_list'),
+                                   context.get('parse_cache'))
+    # xts subsystem special handling, device_attest and
+    # device_attest_lite parts need to be compiled into the version image, other parts are not.
+    # parts_modules_info needs to be parse before filting.
+    if subsystem_name == 'xts' and context.get('build_xts') is False:
+        xts_device_attest_name = ['device_attest_lite', 'device_attest']
+        build_loader.parse()
+        build_loader.parts_info_filter(xts_device_attest_name)
+    return {
+        'parts_variants': build_loader.parts_variants(),
+        'parts_inner_kits_info': build_loader.parts_inner_kits_info(),
+        'parts_component_info': build_loader.parts_component_info(),
+        'parts_kits_info': build_loader.parts_kits_info(),
+        'parts_targets': build_loader.parts_build_targets(),
+        'parts_name_list': build_loader.parts_name_list(),
+        'parts_info': build_loader.parts_info(),
+        'phony_target': build_loader.parts_phony_target(),
+        'parts_path_info': build_loader.parts_path_info(),
+        'hisysevent_config': build_loader.parts_hisysevent_config(),
+        'parts_modules_info': build_loader.parts_modules_info(),
+        'parts_deps': build_loader.parts_deps(),
+        'syscap_info': build_loader.parse_syscap_info()
+    }
+
+
+def _parse_subsystem_in_worker(subsystem_name):
+    result = _parse_subsystem(subsystem_name)
+    # hand the cache entries used by this subsystem back to the main process
+    result['parse_cache_used'] = _parse_context.get('parse_cache').take_used()
+    return result
+
+
+@TimerUtil.cost_time
+def _parse_subsystems(subsystem_names, load_jobs):
+    if load_jobs <= 1 or len(subsystem_names) <= 1 \
+            or 'fork' not in multiprocessing.get_all_start_methods():
+        return [_parse_subsystem(subsystem_name) for subsystem_name in subsystem_names]
+    # workers are forked so they share the parse context and the loaded parse cache
+    with ProcessPoolExecutor(max_workers=min(load_jobs, len(subsystem_names)),
+                             mp_context=multiprocessing.get_context('fork')) as executor:
+        return list(executor.map(_parse_subsystem_in_worker, subsystem_names))
+
+
 def get_parts_info(source_root_dir,
                    config_output_relpath,
                    subsystem_info,
@@ -878,7 +1001,8 @@ def get_parts_info(source_root_dir,
                    overrided_components,
                    bundle_subsystem_allow_list,
                    skip_partlist_check,
-                   build_xts=False):
+                   build_xts=False,
+                   load_jobs=''):
     """parts info,
     get info from build config file.
     """
@@ -895,40 +1019,54 @@ def get_parts_info(source_root_dir,
     _parts_modules_info = {}
     _parts_deps = {}
     system_syscap = []
-    for subsystem_name, build_config_info in subsystem_info.items():
-        if not len(build_config_info.get("build_files")):
-            continue
-        build_loader = LoadBuildConfig(source_root_dir, build_config_info,
-                                       config_output_relpath,
-                                       variant_toolchains, subsystem_name,
-                                       target_arch, ignored_subsystems,
-                                       exclusion_modules_config_file,
-                                       load_test_config, overrided_components,
-                                       bundle_subsystem_allow_list)
-        # xts subsystem special handling, device_attest and
-        # device_attest_lite parts need to be compiled into the version image, other parts are not.
-        # parts_modules_info needs to be parse before filting.
-        if subsystem_name == 'xts' and build_xts is False:
-            xts_device_attest_name = ['device_attest_lite', 'device_attest']
-            build_loader.parse()
-            build_loader.parts_info_filter(xts_device_attest_name)
-        _parts_variants = build_loader.parts_variants()
-        parts_variants.update(_parts_variants)
-        _inner_kits_info = build_loader.parts_inner_kits_info()
-        parts_inner_kits_info.update(_inner_kits_info)
-        _parts_component_info = build_loader.parts_component_info()
-        parts_component_info.update(_parts_component_info)
-        parts_kits_info.update(build_loader.parts_kits_info())
-        _parts_targets = build_loader.parts_build_targets()
-        parts_targets.update(_parts_targets)
-        subsystem_parts[subsystem_name] = build_loader.parts_name_list()
-        parts_info.update(build_loader.parts_info())
-        _phony_target.update(build_loader.parts_phony_target())
-        _parts_path_info.update(build_loader.parts_path_info())
-        _parts_hisysevent_config.update(build_loader.parts_hisysevent_config())
-        _parts_modules_info.update(build_loader.parts_modules_info())
-        _parts_deps.update(build_loader.parts_deps())
-        system_syscap.extend(build_loader.parse_syscap_info())
+    parse_cache = PartParseCache(
+        os.path.join(source_root_dir, config_output_relpath, 'part_parse_cache.json'),
+        [os.path.abspath(__file__), load_bundle_file.__file__, exclusion_modules_config_file],
+        [source_root_dir, target_arch, load_test_config])
+    _parse_context.update({
+        'source_root_dir': source_root_dir,
+        'config_output_relpath': config_output_relpath,
+        'subsystem_info': subsystem_info,
+        'variant_toolchains': variant_toolchains,
+        'target_arch': target_arch,
+        'ignored_subsystems': ignored_subsystems,
+        'exclusion_modules_config_file': exclusion_modules_config_file,
+        'load_test_config': load_test_config,
+        'overrided_components': overrided_components,
+        'bundle_subsystem_allow_list': bundle_subsystem_allow_list,
+        'build_xts': build_xts,
+        'parse_cache': parse_cache
+    })
+    subsystem_names = [subsystem_name for subsystem_name, build_config_info in subsystem_info.items()
+                       if len(build_config_info.get("build_files"))]
+    load_jobs = _get_load_jobs(load_jobs)
+    LogUtil.hb_info("parse {} subsystems with {} jobs".format(
+        len(subsystem_names), load_jobs), mode=Config.log_mode)
+    try:
+        parse_results = _parse_subsystems(subsystem_names, load_jobs)
+    finally:
+        _parse_context.clear()
+    # merge in subsystem order, the result is the same as serial parsing
+    for subsystem_name, parse_result in zip(subsystem_names, parse_results):
+        parts_variants.update(parse_result.get('parts_variants'))
+        parts_inner_kits_info.update(parse_result.get('parts_inner_kits_info'))
+        parts_component_info.update(parse_result.get('parts_component_info'))
+        parts_kits_info.update(parse_result.get('parts_kits_info'))
+        parts_targets.update(parse_result.get('parts_targets'))
+        subsystem_parts[subsystem_name] = parse_result.get('parts_name_list')
+        parts_info.update(parse_result.get('parts_info'))
+        _phony_target.update(parse_result.get('phony_target'))
+        _parts_path_info.update(parse_result.get('parts_path_info'))
+        _parts_hisysevent_config.update(parse_result.get('hisysevent_config'))
+        _parts_modules_info.update(parse_result.get('parts_modules_info'))
+        _parts_deps.update(parse_result.get('parts_deps'))
+        system_syscap.extend(parse_result.get('syscap_info'))
+        if 'parse_cache_used' in parse_result:
+            parse_cache.merge_used(parse_result.get('parse_cache_used'))
+    parse_cache.save()
+    LogUtil.hb_info(
+        "part parse cache: {} hits, {} misses".format(
+            parse_cache.hits, parse_cache.misses), mode=Config.log_mode)
     LogUtil.hb_info(
         "generate all parts build gn file to '{}/{}'".format(
             source_root_dir, config_output_relpath), mode=Config.log_mode)
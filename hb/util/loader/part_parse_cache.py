@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+import hashlib
+
+from scripts.util.file_utils import read_json_file  # noqa: E402, E501  pylint: disable=C0413, E0611
+
+CACHE_VERSION = 1
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(file_path: str) -> str:
+    if not os.path.isfile(file_path):
+        return ''
+    with open(file_path, 'rb') as input_f:
+        return _sha256(input_f.read())
+
+
+class PartParseCache(object):
+    """on-disk cache of parsed build files and part objects.
+
+    Build files are keyed by path and content hash, part objects by the
+    build file key, variant and toolchain. Only entries used by the current
+    load are saved, so stale bundles are dropped from the cache.
+    """
+
+    def __init__(self, cache_file, salt_files, salt_values):
+        self._cache_file = cache_file
+        salt_info = [CACHE_VERSION, [file_digest(_file) for _file in salt_files], salt_values]
+        self._salt = _sha256(json.dumps(salt_info, sort_keys=True).encode('utf-8'))
+        self._build_configs = {}
+        self._parts = {}
+        self._used_build_configs = {}
+        self._used_parts = {}
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.isfile(self._cache_file):
+            return
+        cache_info = read_json_file(self._cache_file)
+        if not cache_info or cache_info.get('salt') != self._salt:
+            return
+        self._build_configs = cache_info.get('build_configs', {})
+        self._parts = cache_info.get('parts', {})
+
+    def build_file_key(self, build_file: str) -> str:
+        with open(build_file, 'rb') as input_f:
+            content = input_f.read()
+        return _sha256(self._salt.encode('utf-8') + build_file.encode('utf-8') + b'\0' + content)
+
+    def get_build_config(self, key: str):
+        build_config = self._build_configs.get(key)
+        if build_config is not None:
+            self._used_build_configs[key] = build_config
+        return build_config
+
+    def put_build_config(self, key: str, build_config: dict):
+        self._used_build_configs[key] = build_config
+
+    @staticmethod
+    def part_key(build_file_key: str, *args) -> str:
+        part_info = [build_file_key]
+        part_info.extend(args)
+        return _sha256(json.dumps(part_info, sort_keys=True).encode('utf-8'))
+
+    def get_part(self, key: str):
+        record = self._parts.get(key)
+        if record is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used_parts[key] = record
+        return record
+
+    def put_part(self, key: str, record: dict):
+        self._used_parts[key] = record
+
+    def take_used(self):
+        """return and reset the entries used since the last call."""
+        used = (self._used_build_configs, self._used_parts, self.hits, self.misses)
+        self._used_build_configs = {}
+        self._used_parts = {}
+        self.hits = 0
+        self.misses = 0
+        return used
+
+    def merge_used(self, used):
+        """merge entries taken from the cache copy of a parse worker."""
+        build_configs, parts, hits, misses = used
+        self._used_build_configs.update(build_configs)
+        self._used_parts.update(parts)
+        self.hits += hits
+        self.misses += misses
+
+    def save(self):
+        cache_info = {
+            'salt': self._salt,
+            'build_configs': self._used_build_configs,
+            'parts': self._used_parts
+        }
+        os.makedirs(os.path.dirname(self._cache_file), exist_ok=True)
+        # keep key order, restored records must match freshly parsed ones
+        with open(self._cache_file, 'w') as output_f:
+            json.dump(cache_info, output_f, separators=(',', ':'))
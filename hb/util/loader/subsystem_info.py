@@ -62,6 +62,11 @@ def merge_subsystem_overlay(subsystem_configs, subsystem_config_overlay, key):
             subsystem_configs[key].setdefault(subsystem, subsystem_config_overlay[key][subsystem])
 
 
+def get_build_file_index_file(source_root_dir, config_output_path):
+    return os.path.join(source_root_dir, config_output_path, 'subsystem_info',
+                        'build_file_index.json')
+
+
 def get_subsystem_info(subsystem_config_file, example_subsystem_file,
                        source_root_dir, config_output_path, os_level):
     if not subsystem_config_file:
@@ -69,9 +74,12 @@ def get_subsystem_info(subsystem_config_file, example_subsystem_file,
 
     subsystem_configs = {}
     output_dir_realpath = os.path.join(source_root_dir, config_output_path)
+    build_file_index = subsystem_scan.BuildFileIndex(
+        get_build_file_index_file(source_root_dir, config_output_path))
     subsystem_configs = subsystem_scan.scan(subsystem_config_file,
                                             example_subsystem_file,
-                                            source_root_dir)
+                                            source_root_dir,
+                                            build_file_index)
     config = Config()
     subsystem_config_overlay_file = os.path.join(
         config.product_path, "subsystem_config_overlay.json")
@@ -79,9 +87,11 @@ def get_subsystem_info(subsystem_config_file, example_subsystem_file,
         subsystem_config_overlay = {}
         subsystem_config_overlay = subsystem_scan.scan(subsystem_config_overlay_file,
                                                        example_subsystem_file,
-                                                       source_root_dir)
+                                                       source_root_dir,
+                                                       build_file_index)
         merge_subsystem_overlay(subsystem_configs, subsystem_config_overlay, 'subsystem')
         merge_subsystem_overlay(subsystem_configs, subsystem_config_overlay, 'no_src_subsystem')
 
+    build_file_index.save()
     _output_subsystem_configs(output_dir_realpath, subsystem_configs)
     return subsystem_configs.get('subsystem')
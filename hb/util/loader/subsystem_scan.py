@@ -15,13 +15,22 @@
 
 import os
 import sys
+import time
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from containers.status import throw_exception
 from exceptions.ohos_exception import OHOSException
 from scripts.util.file_utils import read_json_file, write_json_file  # noqa: E402 E501
 from util.log_util import LogUtil
 
 _default_subsystem = {"build": "build"}
+_build_file_names = ['ohos.build', 'bundle.json']
+# directories that never hold build config files
+_skip_dirs = ['.git', '.repo', '.svn', 'out', 'prebuilts']
+_scan_index_version = 1
+# a directory changed again within the same mtime tick keeps its mtime,
+# so directories modified this close to the scan are always rescanned
+_racy_mtime_ns = 2 * 1000 * 1000 * 1000
 
 
 @throw_exception
@@ -49,18 +58,86 @@ def _read_config(subsystem_config_file, example_subsystem_file):
     return subsystem_info
 
 
-def _scan_build_file(subsystem_path):
-    _files = []
-    _bundle_files = []
-    for root, dirs, files in os.walk(subsystem_path):
-        for name in files:
-            if name == 'ohos.build':
-                _files.append(os.path.join(root, name))
-            elif name == 'bundle.json':
-                _bundle_files.append(os.path.join(root, name))
-    if _bundle_files:
+class BuildFileIndex(object):
+    """ohos.build/bundle.json locations and directory mtimes of the last scan,
+    directories whose mtime is unchanged are not listed again."""
+
+    def __init__(self, index_file=None):
+        self._index_file = index_file
+        self._dirs = {}
+        self._visited = {}
+        self._scan_start_ns = time.time_ns()
+        if index_file and os.path.isfile(index_file):
+            index_info = read_json_file(index_file)
+            if index_info and index_info.get('version') == _scan_index_version \
+                    and index_info.get('skip_dirs') == _skip_dirs:
+                self._dirs = index_info.get('dirs', {})
+
+    @staticmethod
+    def scanned_dirs(index_file):
+        """Returns the directories listed by the scan which saved
+        |index_file|."""
+        if not os.path.isfile(index_file):
+            return []
+        index_info = read_json_file(index_file)
+        return list(index_info.get('dirs', {})) if index_info else []
+
+    def scan(self, subsystem_path):
+        _files = []
+        _bundle_files = []
+        self._scan_dir(subsystem_path, _files, _bundle_files)
         _files.extend(_bundle_files)
-    return _files
+        return _files
+
+    def save(self):
+        if not self._index_file:
+            return
+        index_info = {
+            'version': _scan_index_version,
+            'skip_dirs': _skip_dirs,
+            'dirs': self._visited
+        }
+        write_json_file(self._index_file, index_info)
+
+    def _scan_dir(self, dir_path, files, bundle_files):
+        try:
+            mtime = os.stat(dir_path).st_mtime_ns
+        except OSError:
+            return
+        dir_info = self._dirs.get(dir_path)
+        if dir_info is None or dir_info[0] != mtime:
+            dir_info = self._list_dir(dir_path, mtime)
+        self._visited[dir_path] = dir_info
+        for name in dir_info[1]:
+            if name == 'ohos.build':
+                files.append(os.path.join(dir_path, name))
+            else:
+                bundle_files.append(os.path.join(dir_path, name))
+        for name in dir_info[2]:
+            self._scan_dir(os.path.join(dir_path, name), files, bundle_files)
+
+    def _list_dir(self, dir_path, mtime):
+        build_files = []
+        sub_dirs = []
+        try:
+            with os.scandir(dir_path) as dir_entries:
+                for dir_entry in dir_entries:
+                    if dir_entry.is_dir():
+                        if not dir_entry.is_symlink() and dir_entry.name not in _skip_dirs:
+                            sub_dirs.append(dir_entry.name)
+                    elif dir_entry.name in _build_file_names:
+                        build_files.append(dir_entry.name)
+        except OSError:
+            pass
+        if mtime >= self._scan_start_ns - _racy_mtime_ns:
+            mtime = None
+        return [mtime, sorted(build_files), sorted(sub_dirs)]
+
+
+def _scan_build_files(subsystem_paths, build_file_index):
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(build_file_index.scan, subsystem_paths))
 
 
 def _check_path_prefix(paths):
@@ -72,28 +149,33 @@ def _check_path_prefix(paths):
 
 
 @throw_exception
-def scan(subsystem_config_file, example_subsystem_file, source_root_dir):
+def scan(subsystem_config_file, example_subsystem_file, source_root_dir,
+         build_file_index=None):
     subsystem_infos = _read_config(subsystem_config_file,
                                    example_subsystem_file)
     # add common subsystem info
     subsystem_infos.update(_default_subsystem)
+    if build_file_index is None:
+        build_file_index = BuildFileIndex()
+
+    for key, val in subsystem_infos.items():
+        if not isinstance(val, list):
+            subsystem_infos[key] = [val]
+        elif not _check_path_prefix(val):
+            raise OHOSException(
+                "subsystem '{}' path configuration is incorrect.".format(
+                    key), "2013")
+    subsystem_paths = [os.path.join(source_root_dir, _path)
+                       for val in subsystem_infos.values() for _path in val]
+    scanned_files = iter(_scan_build_files(subsystem_paths, build_file_index))
 
     no_src_subsystem = {}
     _build_configs = {}
     for key, val in subsystem_infos.items():
         _all_build_config_files = []
-        if not isinstance(val, list):
-            val = [val]
-        else:
-            if not _check_path_prefix(val):
-                raise OHOSException(
-                    "subsystem '{}' path configuration is incorrect.".format(
-                        key), "2013")
         _info = {'path': val}
-        for _path in val:
-            _subsystem_path = os.path.join(source_root_dir, _path)
-            _build_config_files = _scan_build_file(_subsystem_path)
-            _all_build_config_files.extend(_build_config_files)
+        for _ in val:
+            _all_build_config_files.extend(next(scanned_files))
         if _all_build_config_files:
             _info['build_files'] = _all_build_config_files
             _build_configs[key] = _info
@@ -116,10 +198,14 @@ def main():
     parser.add_argument('--example-subsystem-file', required=False)
     parser.add_argument('--source-root-dir', required=True)
     parser.add_argument('--output-dir', required=True)
+    parser.add_argument('--build-file-index', required=False)
     args = parser.parse_args()
 
+    build_file_index = BuildFileIndex(args.build_file_index)
     build_configs = scan(args.subsystem_config_file,
-                         args.example_subsystem_file, args.source_root_dir)
+                         args.example_subsystem_file, args.source_root_dir,
+                         build_file_index)
+    build_file_index.save()
 
     build_configs_file = os.path.join(args.output_dir,
                                       "subsystem_build_config.json")
@@ -1,173 +1,444 @@
-#!/usr/bin/env python
-# -*- coding: utf-8 -*-
-# Copyright (c) 2024 Huawei Device Co., Ltd.
-# Licensed under the Apache License, Version 2.0 (the "License");
-# you may not use this file except in compliance with the License.
-# You may obtain a copy of the License at
-#
-#     http://www.apache.org/licenses/LICENSE-2.0
-#
-# Unless required by applicable law or agreed to in writing, software
-# distributed under the License is distributed on an "AS IS" BASIS,
-# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
-# See the License for the specific language governing permissions and
-# limitations under the License.
-
-import sys
-import os
-import time
-import platform
-from datetime import datetime
-import re
-from pathlib import Path
-import subprocess
-from collections import defaultdict 
-
-from resources.global_var import ROOT_CONFIG_FILE
-from log_util import LogUtil
-from io_util import IoUtil
-
-GB_CONSTANT = 1024 ** 3
-MEM_CONSTANT = 1024
-RET_CONSTANT = 0
-MONITOR_TIME_CONSTANT = 30
-SNOP_TIME_CONSTANT = 5
-
-memory_info = [RET_CONSTANT] * 3
-target_keys = ['MemTotal', 'SwapTotal', 'MemFree']
-key_indices = {key: index for index, key in enumerate(target_keys)}
-
-
-class Monitor():
-    def __init__(self):
-        self.now_times = []
-        self.usr_cpus = []
-        self.sys_cpus = []
-        self.idle_cpus = []
-        self.total_mems = []
-        self.swap_mems = []
-        self.free_mems = []
-        self.log_path = ""
-
-    def collect_cpu_info(self):
-        if platform.system() != "Linux":
-            return RET_CONSTANT, RET_CONSTANT, RET_CONSTANT
-
-        try:
-            top_command = ["top", "-bn1"]
-            grep_command = ["grep", "%Cpu(s)"]
-            top_output = subprocess.check_output(top_command, universal_newlines=True)
-            result = subprocess.check_output(grep_command, input=top_output, universal_newlines=True).strip()
-            if result:
-                parts = result.split()
-                if len(parts) >= 5:
-                    usr_cpu_str = parts[1]
-                    sys_cpu_str = parts[3]
-                    idle_cpu_str = parts[7]
-
-                    usr_cpu_str = usr_cpu_str.split(',')[0].rstrip('%')
-                    sys_cpu_str = sys_cpu_str.split(',')[0].rstrip('%')
-                    idle_cpu_str = idle_cpu_str.split(',')[0].rstrip('%')
-
-                    usr_cpu = float(usr_cpu_str) if usr_cpu_str.replace('.', '', 1).isdigit() else RET_CONSTANT
-                    sys_cpu = float(sys_cpu_str) if sys_cpu_str.replace('.', '', 1).isdigit() else RET_CONSTANT
-                    idle_cpu = float(idle_cpu_str) if idle_cpu_str.replace('.', '', 1).isdigit() else RET_CONSTANT
-
-                    self.usr_cpu = usr_cpu
-                    self.sys_cpu = sys_cpu
-                    self.idle_cpu = idle_cpu
-                    return self.usr_cpu, self.sys_cpu, self.idle_cpu
-                else:
-                    return RET_CONSTANT, RET_CONSTANT, RET_CONSTANT
-            else:
-                return RET_CONSTANT, RET_CONSTANT, RET_CONSTANT
-        except subprocess.CalledProcessError:
-            return RET_CONSTANT, RET_CONSTANT, RET_CONSTANT
-
-    def extract_memory_value(self, line: str):
-        match = re.search(r'\d+', line)
-        return int(match.group()) * MEM_CONSTANT if match else RET_CONSTANT
-
-    def get_ret_num(self, line: str):
-        key = line.split(':')[0]
-        if key in target_keys:
-            value = self.extract_memory_value(line)
-            memory_info[key_indices[key]] = value
-
-    def get_linux_mem_info(self):
-        try:
-            with open('/proc/meminfo', 'r') as f:
-                for line in f:
-                    self.get_ret_num(line)
-            return memory_info[0], memory_info[1], memory_info[2]
-        except FileNotFoundError:
-            return RET_CONSTANT, RET_CONSTANT, RET_CONSTANT
-        except Exception as e:
-            print(f"Error occurred while getting memory info: {e}")
-            return RET_CONSTANT, RET_CONSTANT, RET_CONSTANT
-
-    def collect_linux_mem_info(self):
-        total_memory, swap_memory, free_memory = self.get_linux_mem_info()
-        total_mem = round(total_memory / GB_CONSTANT, 1)
-        free_mem = round(free_memory / GB_CONSTANT, 1)
-        swap_mem = round(swap_memory / GB_CONSTANT, 1)
-        return total_mem, free_mem, swap_mem
-    
-    def get_current_time(self):
-        now_time = datetime.now().strftime("%H:%M:%S")
-        self.now_times.append(now_time)
-
-    def get_current_cpu(self):
-        usr_cpu, sys_cpu, idle_cpu = self.collect_cpu_info()
-        self.usr_cpus.append(usr_cpu)
-        self.sys_cpus.append(sys_cpu)
-        self.idle_cpus.append(idle_cpu)
-        LogUtil.write_log(self.log_path, f"User Cpu%: {usr_cpu}%", "info")
-        LogUtil.write_log(self.log_path, f"System Cpu%: {sys_cpu}%", "info")
-        LogUtil.write_log(self.log_path, f"Idle CPU%: {idle_cpu}%", "info")
-        
-    def get_current_memory(self):
-        total_mem, free_mem, swap_mem = self.collect_linux_mem_info()
-        self.total_mems.append(total_mem)
-        self.free_mems.append(free_mem)
-        self.swap_mems.append(swap_mem)
-        LogUtil.write_log(self.log_path, f"Total Memory: {total_mem}GB", "info")
-        LogUtil.write_log(self.log_path, f"Free Memory: {free_mem}GB", "info")
-        LogUtil.write_log(self.log_path, f"Swap Memory: {swap_mem}GB", "info")
-
-    def get_log_path(self):
-        count = 0
-        config_content = IoUtil.read_json_file(ROOT_CONFIG_FILE)
-        while not os.path.exists(ROOT_CONFIG_FILE) or not config_content.get('out_path', None) and count <= 60:
-            time.sleep(SNAP_TIME_CONSTANT)
-            count += 1
-        return config_content.get('out_path', None)
-
-    def get_disk_usage(self):
-        result = subprocess.run(['df', '-h'], stdout=subprocess.PIPE, text=True)
-        if result.returncode == 0:
-            lines = result.stdout.strip().split('\n')[1:]
-            for line in lines:
-                columns = line.split()
-                if len(columns) > 5:
-                    filesystem, size, used, available, percent, mountpoint = columns[:6]
-                    LogUtil.write_log(self.log_path, 
-                    f"Filesystem: {filesystem}, "
-                    f"Size: {size}, "
-                    f"Used: {used}, "
-                    f"Available: {available}, "
-                    f"Use%: {percent}, "
-                    f"Mounted on: {mountpoint}", 
-                    "info")
-        else:
-            LogUtil.write_log(self.log_path, f"Error running df command:{result.stderr}", "info")
-
-    def run(self):
-        if platform.system() != "Linux":
-            return
-        out_path = self.get_log_path()
-        self.log_path = os.path.join(out_path, "build.log")
-        self.get_current_time()
-        self.get_current_cpu()
-        self.get_current_memory()
-        self.get_disk_usage()
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import os
+import json
+import time
+import argparse
+import platform
+import threading
+from datetime import datetime
+import re
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # ohos/build/hb dir
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))  # ohos/build dir
+from resources.global_var import ROOT_CONFIG_FILE
+from util.log_util import LogUtil
+from util.io_util import IoUtil
+
+GB_CONSTANT = 1024 ** 3
+MEM_CONSTANT = 1024
+RET_CONSTANT = 0
+MONITOR_TIME_CONSTANT = 30
+SNAP_TIME_CONSTANT = 5
+SAMPLE_INTERVAL = 1.0
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+MONITOR_FILE_NAME = 'build_monitor.jsonl'
+TOP_ACTIONS_NUM = 10
+
+memory_info = [RET_CONSTANT] * 3
+target_keys = ['MemTotal', 'SwapTotal', 'MemFree']
+key_indices = {key: index for index, key in enumerate(target_keys)}
+
+
+def read_cpu_times():
+    '''Description: read the aggregated cpu line of /proc/stat
+    @return: [user, nice, system, idle, iowait, irq, softirq, steal] in jiffies
+    '''
+    try:
+        with open('/proc/stat', 'r') as stat_f:
+            fields = stat_f.readline().split()
+        return [int(value) for value in fields[1:9]]
+    except (OSError, ValueError):
+        return []
+
+
+def cpu_percent(prev_times, cur_times):
+    '''Description: user, system and idle cpu% between two /proc/stat reads
+    '''
+    if not prev_times or not cur_times:
+        return RET_CONSTANT, RET_CONSTANT, RET_CONSTANT
+    delta = [cur - prev for cur, prev in zip(cur_times, prev_times)]
+    total = sum(delta)
+    if total <= 0:
+        return RET_CONSTANT, RET_CONSTANT, RET_CONSTANT
+    usr_cpu = round((delta[0] + delta[1]) * 100.0 / total, 1)
+    sys_cpu = round((delta[2] + delta[5] + delta[6]) * 100.0 / total, 1)
+    idle_cpu = round((delta[3] + delta[4]) * 100.0 / total, 1)
+    return usr_cpu, sys_cpu, idle_cpu
+
+
+def read_meminfo():
+    '''Description: /proc/meminfo values in bytes
+    '''
+    meminfo = {}
+    try:
+        with open('/proc/meminfo', 'r') as meminfo_f:
+            for line in meminfo_f:
+                key, _, value = line.partition(':')
+                fields = value.split()
+                if fields and fields[0].isdigit():
+                    meminfo[key] = int(fields[0]) * MEM_CONSTANT
+    except OSError:
+        pass
+    return meminfo
+
+
+def _read_file(path):
+    try:
+        with open(path, 'rb') as input_f:
+            return input_f.read()
+    except OSError:
+        return b''
+
+
+def _read_rss(pid):
+    statm = _read_file('/proc/{}/statm'.format(pid)).split()
+    return int(statm[1]) * PAGE_SIZE if len(statm) > 1 else 0
+
+
+def _read_comm(pid):
+    return _read_file('/proc/{}/comm'.format(pid)).decode('utf-8', 'replace').strip()
+
+
+def _read_cmdline(pid):
+    return [arg.decode('utf-8', 'replace') for arg in _read_file('/proc/{}/cmdline'.format(pid)).split(b'\0') if arg]
+
+
+def _read_children_map():
+    '''Description: parent pid to children pids of all processes, used when
+        /proc/<pid>/task/<tid>/children is not available
+    '''
+    children_map = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        stat_info = _read_file('/proc/{}/stat'.format(name))
+        # the process name may contain spaces, fields start after the last ')'
+        fields = stat_info[stat_info.rfind(b')') + 2:].split()
+        if len(fields) > 1:
+            children_map.setdefault(int(fields[1]), []).append(int(name))
+    return children_map
+
+
+def _action_output(cmdline):
+    '''Description: guess the output of a ninja action from its command line
+    '''
+    args = cmdline
+    if len(args) >= 3 and args[1] == '-c' and os.path.basename(args[0]) in ['sh', 'bash']:
+        args = args[2].split()
+    for index, arg in enumerate(args):
+        if arg in ['-o', '--output', '--out'] and index + 1 < len(args):
+            return args[index + 1]
+        for prefix in ['--output=', '--out=', '-o']:
+            if arg.startswith(prefix) and len(arg) > len(prefix) and not arg.startswith('-o='):
+                return arg[len(prefix):]
+    return ' '.join(args)[:200]
+
+
+class ProcSampler(threading.Thread):
+    '''Description: sample cpu, memory and the ninja process tree of this hb
+        process from /proc, and record per-action peak rss into a jsonl
+        time series, one 'sample' line per interval and one 'action' line
+        per finished ninja action
+    '''
+
+    def __init__(self, monitor_file, interval=SAMPLE_INTERVAL, root_pid=None):
+        super().__init__(daemon=True)
+        self.monitor_file = monitor_file
+        self.interval = interval
+        self.root_pid = root_pid or os.getpid()
+        self.actions = {}
+        self.finished_actions = []
+        self.peak_sample = {}
+        self._next_action_id = 0
+        self._stop_event = threading.Event()
+        self._has_children_file = os.path.exists('/proc/{0}/task/{0}/children'.format(self.root_pid))
+        self._output_f = None
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def run(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.monitor_file)), exist_ok=True)
+        with open(self.monitor_file, 'w') as self._output_f:
+            cpu_times = read_cpu_times()
+            while not self._stop_event.wait(self.interval):
+                cur_cpu_times = read_cpu_times()
+                self._sample(cpu_percent(cpu_times, cur_cpu_times))
+                cpu_times = cur_cpu_times
+            for action in self.actions.values():
+                self._write_action(action)
+
+    def _children(self, pid, children_map):
+        if children_map is not None:
+            return children_map.get(pid, [])
+        children = []
+        try:
+            tids = os.listdir('/proc/{}/task'.format(pid))
+        except OSError:
+            return children
+        for tid in tids:
+            children.extend(int(child) for child in _read_file(
+                '/proc/{}/task/{}/children'.format(pid, tid)).split())
+        return children
+
+    def _subtree_rss(self, pid, children_map):
+        rss = _read_rss(pid)
+        for child in self._children(pid, children_map):
+            rss += self._subtree_rss(child, children_map)
+        return rss
+
+    def _find_ninja(self, pid, children_map):
+        for child in self._children(pid, children_map):
+            if _read_comm(child) == 'ninja':
+                return child
+            ninja_pid = self._find_ninja(child, children_map)
+            if ninja_pid:
+                return ninja_pid
+        return None
+
+    def _sample(self, cpu_info):
+        now = round(time.time(), 1)
+        children_map = None if self._has_children_file else _read_children_map()
+        meminfo = read_meminfo()
+        running = []
+        tree_rss = 0
+        ninja_pid = self._find_ninja(self.root_pid, children_map)
+        if ninja_pid:
+            for child in self._children(ninja_pid, children_map):
+                cmdline = _read_cmdline(child)
+                if not cmdline:
+                    continue
+                key = (child, cmdline[-1][:100])
+                action = self.actions.get(key)
+                if action is None:
+                    action = {'type': 'action', 'id': self._next_action_id, 'pid': child,
+                              'output': _action_output(cmdline), 'peak_rss': 0, 'start': now}
+                    self._next_action_id += 1
+                    self.actions[key] = action
+                rss = self._subtree_rss(child, children_map)
+                action['peak_rss'] = max(action.get('peak_rss'), rss)
+                action['end'] = now
+                tree_rss += rss
+                running.append([action.get('id'), rss])
+        # actions which are no longer running are final
+        running_ids = set(action_id for action_id, _ in running)
+        for key in [key for key, action in self.actions.items() if action.get('id') not in running_ids]:
+            self._write_action(self.actions.pop(key))
+        mem_used = meminfo.get('MemTotal', 0) - meminfo.get('MemAvailable', meminfo.get('MemFree', 0))
+        sample = {
+            'type': 'sample', 'time': now,
+            'cpu': list(cpu_info),
+            'mem_used': mem_used,
+            'swap_used': meminfo.get('SwapTotal', 0) - meminfo.get('SwapFree', 0),
+            'ninja_rss': tree_rss,
+            'running': running
+        }
+        if mem_used >= self.peak_sample.get('mem_used', -1):
+            self.peak_sample = sample
+        self._output_f.write(json.dumps(sample, separators=(',', ':')) + '\n')
+        self._output_f.flush()
+
+    def _write_action(self, action):
+        self.finished_actions.append(action)
+        self._output_f.write(json.dumps(action, separators=(',', ':')) + '\n')
+
+
+def load_monitor_file(monitor_file):
+    samples = []
+    actions = {}
+    with open(monitor_file, 'r') as input_f:
+        for line in input_f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('type') == 'sample':
+                samples.append(record)
+            elif record.get('type') == 'action':
+                actions[record.get('id')] = record
+    return samples, actions
+
+
+def query_peak(monitor_file):
+    '''Description: find the sample with the highest memory usage and the ninja
+        actions that were running at that time
+    @parameter: [monitor_file]: time series written by ProcSampler
+    @return: (peak sample, [(action, rss at peak)] sorted by rss)
+    '''
+    samples, actions = load_monitor_file(monitor_file)
+    if not samples:
+        return {}, []
+    peak = max(samples, key=lambda sample: sample.get('mem_used'))
+    running = [(actions.get(action_id, {'id': action_id, 'output': '?'}), rss)
+               for action_id, rss in peak.get('running')]
+    running.sort(key=lambda item: item[1], reverse=True)
+    return peak, running
+
+
+class Monitor():
+    def __init__(self):
+        self.now_times = []
+        self.usr_cpus = []
+        self.sys_cpus = []
+        self.idle_cpus = []
+        self.total_mems = []
+        self.swap_mems = []
+        self.free_mems = []
+        self.log_path = ""
+        self._cpu_times = read_cpu_times()
+        self._sampler = None
+
+    def collect_cpu_info(self):
+        if platform.system() != "Linux":
+            return RET_CONSTANT, RET_CONSTANT, RET_CONSTANT
+
+        # cpu% since the last collection (or since the monitor was created)
+        cpu_times = read_cpu_times()
+        self.usr_cpu, self.sys_cpu, self.idle_cpu = cpu_percent(self._cpu_times, cpu_times)
+        self._cpu_times = cpu_times
+        return self.usr_cpu, self.sys_cpu, self.idle_cpu
+
+    def extract_memory_value(self, line: str):
+        match = re.search(r'\d+', line)
+        return int(match.group()) * MEM_CONSTANT if match else RET_CONSTANT
+
+    def get_ret_num(self, line: str):
+        key = line.split(':')[0]
+        if key in target_keys:
+            value = self.extract_memory_value(line)
+            memory_info[key_indices[key]] = value
+
+    def get_linux_mem_info(self):
+        try:
+            with open('/proc/meminfo', 'r') as f:
+                for line in f:
+                    self.get_ret_num(line)
+            return memory_info[0], memory_info[1], memory_info[2]
+        except FileNotFoundError:
+            return RET_CONSTANT, RET_CONSTANT, RET_CONSTANT
+        except Exception as e:
+            print(f"Error occurred while getting memory info: {e}")
+            return RET_CONSTANT, RET_CONSTANT, RET_CONSTANT
+
+    def collect_linux_mem_info(self):
+        total_memory, swap_memory, free_memory = self.get_linux_mem_info()
+        total_mem = round(total_memory / GB_CONSTANT, 1)
+        free_mem = round(free_memory / GB_CONSTANT, 1)
+        swap_mem = round(swap_memory / GB_CONSTANT, 1)
+        return total_mem, free_mem, swap_mem
+    
+    def get_current_time(self):
+        now_time = datetime.now().strftime("%H:%M:%S")
+        self.now_times.append(now_time)
+
+    def get_current_cpu(self):
+        usr_cpu, sys_cpu, idle_cpu = self.collect_cpu_info()
+        self.usr_cpus.append(usr_cpu)
+        self.sys_cpus.append(sys_cpu)
+        self.idle_cpus.append(idle_cpu)
+        LogUtil.write_log(self.log_path, f"User Cpu%: {usr_cpu}%", "info")
+        LogUtil.write_log(self.log_path, f"System Cpu%: {sys_cpu}%", "info")
+        LogUtil.write_log(self.log_path, f"Idle CPU%: {idle_cpu}%", "info")
+        
+    def get_current_memory(self):
+        total_mem, free_mem, swap_mem = self.collect_linux_mem_info()
+        self.total_mems.append(total_mem)
+        self.free_mems.append(free_mem)
+        self.swap_mems.append(swap_mem)
+        LogUtil.write_log(self.log_path, f"Total Memory: {total_mem}GB", "info")
+        LogUtil.write_log(self.log_path, f"Free Memory: {free_mem}GB", "info")
+        LogUtil.write_log(self.log_path, f"Swap Memory: {swap_mem}GB", "info")
+
+    def get_log_path(self):
+        count = 0
+        config_content = IoUtil.read_json_file(ROOT_CONFIG_FILE)
+        while not os.path.exists(ROOT_CONFIG_FILE) or not config_content.get('out_path', None) and count <= 60:
+            time.sleep(SNAP_TIME_CONSTANT)
+            count += 1
+        return config_content.get('out_path', None)
+
+    def get_disk_usage(self):
+        result = subprocess.run(['df', '-h'], stdout=subprocess.PIPE, text=True)
+        if result.returncode == 0:
+            lines = result.stdout.strip().split('\n')[1:]
+            for line in lines:
+                columns = line.split()
+                if len(columns) > 5:
+                    filesystem, size, used, available, percent, mountpoint = columns[:6]
+                    LogUtil.write_log(self.log_path, 
+                    f"Filesystem: {filesystem}, "
+                    f"Size: {size}, "
+                    f"Used: {used}, "
+                    f"Available: {available}, "
+                    f"Use%: {percent}, "
+                    f"Mounted on: {mountpoint}", 
+                    "info")
+        else:
+            LogUtil.write_log(self.log_path, f"Error running df command:{result.stderr}", "info")
+
+    def start_sampler(self, out_path: str):
+        '''Description: start sampling the ninja process tree into
+            '{out_path}/build_monitor.jsonl' next to build.log
+        '''
+        if platform.system() != "Linux" or self._sampler is not None:
+            return
+        self._sampler = ProcSampler(os.path.join(out_path, MONITOR_FILE_NAME))
+        self._sampler.start()
+
+    def stop_sampler(self):
+        if self._sampler is None:
+            return
+        self._sampler.stop()
+        self.log_path = os.path.join(os.path.dirname(self._sampler.monitor_file), "build.log")
+        peak = self._sampler.peak_sample
+        if peak:
+            LogUtil.write_log(self.log_path, "Peak Memory: {}GB at {}, ninja actions {}GB".format(
+                round(peak.get('mem_used') / GB_CONSTANT, 1),
+                datetime.fromtimestamp(peak.get('time')).strftime("%H:%M:%S"),
+                round(peak.get('ninja_rss') / GB_CONSTANT, 1)), "info")
+        top_actions = sorted(self._sampler.finished_actions, key=lambda action: action.get('peak_rss'),
+                             reverse=True)[:TOP_ACTIONS_NUM]
+        for action in top_actions:
+            LogUtil.write_log(self.log_path, "Peak RSS: {}MB {}".format(
+                action.get('peak_rss') // (1024 ** 2), action.get('output')), "info")
+        self._sampler = None
+
+    def run(self):
+        if platform.system() != "Linux":
+            return
+        out_path = self.get_log_path()
+        self.log_path = os.path.join(out_path, "build.log")
+        self.get_current_time()
+        self.get_current_cpu()
+        self.get_current_memory()
+        self.get_disk_usage()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--query-peak', required=True,
+                        help='build_monitor.jsonl, print the ninja actions running at the memory peak')
+    args = parser.parse_args()
+    peak, running = query_peak(args.query_peak)
+    if not peak:
+        print('no samples in {}'.format(args.query_peak))
+        return 1
+    print('memory peak {}GB at {}, ninja actions {}GB'.format(
+        round(peak.get('mem_used') / GB_CONSTANT, 1),
+        datetime.fromtimestamp(peak.get('time')).strftime("%H:%M:%S"),
+        round(peak.get('ninja_rss') / GB_CONSTANT, 1)))
+    for action, rss in running:
+        print('{:>8}MB (peak {}MB) {}'.format(rss // (1024 ** 2),
+                                            action.get('peak_rss', 0) // (1024 ** 2), action.get('output')))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -47,6 +47,7 @@ class Outputs:
             output_dir, 'SystemCapability.json')
         self.compile_standard_whitelist_json = os.path.join(output_dir, 'compile_standard_whitelist.json')
         self.compile_env_allowlist_json = os.path.join(output_dir, 'compile_env_allowlist.json')
+        self.preloader_fingerprint_json = os.path.join(output_dir, 'preloader_fingerprint.json')
 
 
 class Dirs:
@@ -60,6 +61,7 @@ class Dirs:
         self.productdefine_dir = os.path.join(
             self.source_root_dir, 'productdefine/common')
         self.built_in_base_dir = os.path.join(self.productdefine_dir, 'base')
+        self.built_in_device_dir = os.path.join(self.productdefine_dir, 'device')
 
         # Configs of vendor specified products are stored in ${vendor_dir} directory.
         self.vendor_dir = config.vendor_path
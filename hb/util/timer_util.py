@@ -16,7 +16,9 @@
 # limitations under the License.
 #
 import time
+import functools
 from util.log_util import LogUtil
+from util.trace_util import TraceUtil
 
 
 class TimerUtil():
@@ -25,9 +27,11 @@ class TimerUtil():
 
     @staticmethod
     def cost_time(func):
+        @functools.wraps(func)
         def inner(*arg, **kwarg):
             s_time = time.monotonic()
-            res = func(*arg, **kwarg)
+            with TraceUtil.span(func.__name__, 'hb'):
+                res = func(*arg, **kwarg)
             e_time = time.monotonic()
             LogUtil.hb_info("The run time for {} is {} s".format(func.__name__, round(e_time - s_time, 2)))
             return res
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+import gzip
+import time
+from contextlib import ContextDecorator
+
+from hb.helper.no_instance import NoInstance
+
+# pid of the event groups in the trace file
+HB_PID = 0
+GN_PID = 1
+NINJA_PID = 2
+
+
+class _Span(ContextDecorator):
+
+    def __init__(self, name: str, cat: str, args: dict = None):
+        self._name = name
+        self._cat = cat
+        self._args = args
+        self._start_stack = []
+
+    def __enter__(self):
+        self._start_stack.append(TraceUtil.now_us())
+        return self
+
+    def __exit__(self, *exc):
+        start = self._start_stack.pop()
+        TraceUtil.add_span(self._name, self._cat, start, TraceUtil.now_us() - start, args=self._args)
+        return False
+
+
+class TraceUtil(metaclass=NoInstance):
+    '''Description: collect a chrome trace of the whole build, hb phases and steps,
+        gn gen and ninja actions share the same clock (epoch microseconds)
+    '''
+
+    _events = []
+    _enabled = False
+
+    @staticmethod
+    def now_us() -> int:
+        return time.time_ns() // 1000
+
+    @staticmethod
+    def enable():
+        TraceUtil._enabled = True
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return TraceUtil._enabled
+
+    @staticmethod
+    def span(name: str, cat: str, args: dict = None) -> _Span:
+        '''Description: context manager and decorator which records a span
+        @parameter: [name]: span name, [cat]: span category, [args]: span args
+        @return: _Span
+        '''
+        return _Span(name, cat, args)
+
+    @staticmethod
+    def add_span(name: str, cat: str, start_us: int, dur_us: int,
+                 pid: int = HB_PID, tid: int = 0, args: dict = None):
+        TraceUtil._events.append({
+            'name': name,
+            'cat': cat,
+            'ph': 'X',
+            'ts': start_us,
+            'dur': dur_us,
+            'pid': pid,
+            'tid': tid,
+            'args': args or {},
+        })
+
+    @staticmethod
+    def get_durations(cat: str) -> dict:
+        '''Description: get the total duration of the recorded spans of a category
+        @parameter: [cat]: span category
+        @return: span name to duration in microseconds
+        '''
+        durations = {}
+        for event in TraceUtil._events:
+            if event.get('cat') == cat and event.get('pid') == HB_PID:
+                durations[event.get('name')] = durations.get(event.get('name'), 0) + event.get('dur')
+        return durations
+
+    @staticmethod
+    def add_gn_tracelog(tracelog_file: str, start_us: int):
+        '''Description: add the events of 'gn gen --tracelog', gn uses its own
+            clock so the events are moved to start at the gn gen start time
+        @parameter: [tracelog_file]: gn tracelog, [start_us]: gn gen start time
+        @return: none
+        '''
+        if not os.path.isfile(tracelog_file):
+            return
+        with open(tracelog_file, 'r') as input_f:
+            try:
+                gn_trace = json.load(input_f)
+            except ValueError:
+                return
+        gn_events = gn_trace.get('traceEvents', []) if isinstance(gn_trace, dict) else gn_trace
+        timed_events = [event for event in gn_events if 'ts' in event]
+        if not timed_events:
+            return
+        offset = start_us - min(float(event.get('ts')) for event in timed_events)
+        for event in gn_events:
+            event = dict(event)
+            if 'ts' in event:
+                event['ts'] = float(event.get('ts')) + offset
+            event['pid'] = GN_PID
+            TraceUtil._events.append(event)
+
+    @staticmethod
+    def add_ninja_log(ninja_log: str, start_us: int, log_offset: int = 0):
+        '''Description: add the actions appended to .ninja_log by this ninja run,
+            ninja logs action times in milliseconds since ninja started
+        @parameter: [ninja_log]: path of .ninja_log, [start_us]: ninja start time,
+            [log_offset]: size of .ninja_log before ninja started
+        @return: none
+        '''
+        from scripts.ninja2trace import StoringDataLine, CountingTheTid
+
+        if not os.path.isfile(ninja_log) or os.path.getsize(ninja_log) < log_offset:
+            # ninja recompacted the log, entries of this run can't be told apart
+            return
+        actions = {}
+        with open(ninja_log, 'r') as input_f:
+            input_f.seek(log_offset)
+            for line in input_f:
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) != 5:
+                    continue
+                start, end, _, name, cmdhash = fields
+                actions.setdefault(cmdhash, StoringDataLine(start, end))
+                actions.get(cmdhash).target_obj_names.append(name)
+        counter = CountingTheTid()
+        for action in sorted(actions.values(), key=lambda line: line.start):
+            TraceUtil.add_span(', '.join(action.target_obj_names), 'ninja',
+                               start_us + action.start * 1000, (action.end - action.start) * 1000,
+                               pid=NINJA_PID, tid=counter.counting_the_new_tid(action))
+
+    @staticmethod
+    def save(trace_file: str):
+        if not TraceUtil._enabled:
+            return
+        metadata = [
+            {'name': 'process_name', 'ph': 'M', 'pid': HB_PID, 'args': {'name': 'hb'}},
+            {'name': 'process_name', 'ph': 'M', 'pid': GN_PID, 'args': {'name': 'gn gen'}},
+            {'name': 'process_name', 'ph': 'M', 'pid': NINJA_PID, 'args': {'name': 'ninja'}},
+        ]
+        os.makedirs(os.path.dirname(trace_file), exist_ok=True)
+        with gzip.open(trace_file, 'wt') as output_f:
+            json.dump(metadata + TraceUtil._events, output_f)
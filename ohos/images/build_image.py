@@ -15,9 +15,12 @@
 
 import sys
 import os
+import stat
 import shutil
+import hashlib
 import argparse
 import json
+from concurrent.futures import ThreadPoolExecutor
 from mkimage import mkimages
 
 sys.path.append(
@@ -124,6 +127,158 @@ def _prepare_eng_ststem(eng_system_path: str, build_variant: str):
             shutil.copy(sources_file, dest_file)
 
 
+def _file_digest(path: str):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as input_f:
+        while True:
+            data = input_f.read(1 << 20)
+            if not data:
+                break
+            sha256.update(data)
+    return sha256.hexdigest()
+
+
+class StagingFingerprint(object):
+    """Fingerprint of the staging trees and the options an image is made of.
+
+    Every entry of the trees is recorded with its type, mode and content
+    (sha256 of files, target of symlinks). The fingerprint of the previous
+    build is stored next to the image, files whose stat didn't change since
+    then are not hashed again.
+    """
+
+    def __init__(self, fingerprint_file: str):
+        self.fingerprint_file = fingerprint_file
+        self.options = {}
+        self.entries = {}
+        self.previous = {}
+        if os.path.exists(fingerprint_file):
+            try:
+                with open(fingerprint_file, 'r') as input_f:
+                    self.previous = json.load(input_f)
+            except (OSError, ValueError):
+                self.previous = {}
+
+    def scan(self, trees: dict, options: dict):
+        """|trees| maps a prefix to the dir whose content is recorded."""
+        self.options = options
+        previous_entries = self.previous.get('entries', {})
+        pending = []
+        for prefix, tree in trees.items():
+            for root, dirs, files in os.walk(tree):
+                for name in dirs + files:
+                    path = os.path.join(root, name)
+                    key = os.path.join(prefix, os.path.relpath(path, tree))
+                    st = os.lstat(path)
+                    stat_key = [st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino]
+                    if stat.S_ISLNK(st.st_mode):
+                        self.entries[key] = ['link', os.readlink(path)]
+                    elif stat.S_ISDIR(st.st_mode):
+                        self.entries[key] = ['dir', stat.S_IMODE(st.st_mode)]
+                    else:
+                        entry = previous_entries.get(key)
+                        if entry and entry[0] == 'file' and entry[3] == stat_key:
+                            self.entries[key] = ['file', stat.S_IMODE(st.st_mode),
+                                                 entry[2], stat_key]
+                        else:
+                            self.entries[key] = ['file', stat.S_IMODE(st.st_mode),
+                                                 None, stat_key]
+                            pending.append((key, path))
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+            digests = executor.map(_file_digest, [path for _, path in pending])
+            for (key, _), digest in zip(pending, digests):
+                self.entries[key][2] = digest
+        return self
+
+    @staticmethod
+    def _content(entry: list):
+        # The stat of files isn't part of the content.
+        return entry[:3]
+
+    def changes(self):
+        """Returns the changed options and the added, removed and modified
+        entries since the previous build."""
+        previous_entries = self.previous.get('entries', {})
+        previous_options = self.previous.get('options', {})
+        options = sorted(name for name in set(self.options) | set(previous_options)
+                         if self.options.get(name) != previous_options.get(name))
+        added = sorted(set(self.entries) - set(previous_entries))
+        removed = sorted(set(previous_entries) - set(self.entries))
+        modified = sorted(key for key in set(self.entries) & set(previous_entries)
+                          if self._content(self.entries[key]) !=
+                          self._content(previous_entries[key]))
+        return options, added, removed, modified
+
+    def invalidate(self):
+        if os.path.exists(self.fingerprint_file):
+            os.remove(self.fingerprint_file)
+
+    def save(self):
+        with open(self.fingerprint_file, 'w') as output_f:
+            json.dump({'options': self.options, 'entries': self.entries}, output_f)
+
+
+# Binaries run by the mkfs script of every file system type, besides the
+# script itself.
+_FS_TOOLS = {
+    'ext4': ['mke2fs', 'e2fsdroid'],
+    'f2fs': ['mkfs.f2fs', 'sload.f2fs', 'truncate'],
+    'cpio': ['cpio'],
+}
+# Keys of out/ohos_config.json which change the images.
+_OHOS_CONFIG_KEYS = ['component_type']
+
+
+def _config_references(config_file: str):
+    """Returns the digests of the files referenced by the image config
+    (--dac_config, --file_context, ...), and whether the config can be
+    fingerprinted: a referenced directory can't be."""
+    _, mk_configs, _ = mkimages.load_config(config_file)
+    references = {}
+    complete = True
+    for token in mk_configs.split():
+        # Options come both as '--opt value' and '--opt=value'.
+        value = token.split('=', 1)[-1] if token.startswith('--') else token
+        if os.path.isfile(value):
+            references[value] = _file_digest(value)
+        elif os.path.isabs(value):
+            # Mount points like '/' or '/ramdisk'.
+            continue
+        elif os.path.isdir(value):
+            complete = False
+        elif os.sep in value:
+            # A missing file is recorded, its creation changes the image.
+            references[value] = None
+    return references, complete
+
+
+def _tool_digests(config_file: str, sparse: bool):
+    """Returns the digests of the mkfs script and binaries which make the
+    image, resolved in PATH like mkimages runs them."""
+    mkfs_tool, _, fs_type = mkimages.load_config(config_file)
+    tools = [mkfs_tool] + _FS_TOOLS.get(fs_type, [])
+    if sparse:
+        tools.append('img2simg')
+    digests = {}
+    for tool in tools:
+        tool_path = shutil.which(tool)
+        digests[tool] = [tool_path, _file_digest(tool_path) if tool_path else None]
+    return digests
+
+
+def _report_changes(image_name: str, changes: tuple, limit: int = 20):
+    options, added, removed, modified = changes
+    print('rebuild {} image: {} options changed, {} added, {} removed, {} modified'.format(
+        image_name, len(options), len(added), len(removed), len(modified)))
+    if options:
+        print('  options: {}'.format(', '.join(options)))
+    for kind, keys in (('added', added), ('removed', removed), ('modified', modified)):
+        for key in keys[:limit]:
+            print('  {}: {}'.format(kind, key))
+        if len(keys) > limit:
+            print('  ... {} more {}'.format(len(keys) - limit, kind))
+
+
 def _make_image(args):
     if args.image_name == 'system':
         _prepare_root(args.input_path, args.target_cpu)
@@ -146,7 +301,44 @@ def _make_image(args):
     if args.build_image_tools_path:
         env_path = ':'.join(args.build_image_tools_path)
         os.environ['PATH'] = '{}:{}'.format(env_path, os.environ.get('PATH'))
+
+    trees = {'input': args.input_path}
+    if args.image_name == 'system':
+        trees['root'] = os.path.join(os.path.dirname(args.input_path), 'root')
+    mkimage_dir = os.path.dirname(os.path.abspath(mkimages.__file__))
+    references, complete = _config_references(config_file)
+    ohos_config = mkimages._load_ohos_config()
+    options = {
+        'mk_image_args': mk_image_args[1:],
+        'config_file': _file_digest(config_file),
+        'config_references': references,
+        'tools_path': os.environ.get('PATH'),
+        'tools': _tool_digests(config_file, args.sparse_image),
+        'ohos_config': {key: ohos_config.get(key) for key in _OHOS_CONFIG_KEYS},
+        'mkimage_scripts': {name: _file_digest(os.path.join(mkimage_dir, name))
+                            for name in sorted(os.listdir(mkimage_dir))
+                            if os.path.isfile(os.path.join(mkimage_dir, name))},
+    }
+    fingerprint = StagingFingerprint(
+        '{}.fingerprint'.format(args.output_image_path)).scan(trees, options)
+    changes = fingerprint.changes()
+    # A referenced directory isn't fingerprinted, the image is always rebuilt.
+    if complete and os.path.exists(args.output_image_path) and not any(changes):
+        print('{} image is up to date'.format(args.image_name))
+        # ninja compares the mtime of the image with its inputs.
+        os.utime(args.output_image_path)
+        return
+
+    if not fingerprint.previous or not os.path.exists(args.output_image_path):
+        print('build {} image: no previous image'.format(args.image_name))
+    else:
+        _report_changes(args.image_name, changes)
+    fingerprint.invalidate()
+    if os.path.exists(args.output_image_path):
+        os.remove(args.output_image_path)
     mkimages.mk_images(mk_image_args)
+    if os.path.exists(args.output_image_path):
+        fingerprint.save()
 
 
 def main(argv):
@@ -166,7 +358,7 @@ def main(argv):
     parser.add_argument('--target-cpu', required=False)
     args = parser.parse_args(argv)
 
-    if os.path.exists(args.output_image_path):
+    if not os.path.isdir(args.input_path) and os.path.exists(args.output_image_path):
         os.remove(args.output_image_path)
     if args.image_name == 'userdata':
         _prepare_userdata(args.input_path)
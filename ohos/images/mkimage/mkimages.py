@@ -92,11 +92,13 @@ def sparse_img2simg(is_sparse: str, device: str):
 def mk_system_img(mkfs_tools: str, mk_configs: str, device: str, src_dir: str, is_sparse: str):
     src_dir = build_rootdir(src_dir)
     mk_configs = " ".join([src_dir, device, mk_configs])
-    res = run_cmd(" ".join([mkfs_tools, mk_configs]))
-    verify_ret(res)
+    try:
+        res = run_cmd(" ".join([mkfs_tools, mk_configs]))
+        verify_ret(res)
+    finally:
+        if os.path.isdir(src_dir):
+            shutil.rmtree(src_dir)
     sparse_img2simg(is_sparse, device)
-    if os.path.isdir(src_dir):
-        shutil.rmtree(src_dir)
 
 
 def mk_ramdisk_img(mkfs_tools: str, mk_configs: str, device: str, src_dir: str, is_sparse: str):
@@ -115,22 +117,25 @@ def mk_other_img(mkfs_tools: str, mk_configs: str, device: str, src_dir: str, is
     sparse_img2simg(is_sparse, device)
 
 
+def _load_ohos_config() -> dict:
+    root_path = find_top()
+    config_json = os.path.join(root_path, "out/ohos_config.json")
+    with open(config_json, 'rb') as f:
+        return json.load(f)
+
+
 def mk_images(args):
     if len(args) != 4:
         print("mk_images need 4 args!!!")
         sys.exit(1)
-    root_path = find_top()
-    config_json = os.path.join(root_path, "out/ohos_config.json")
-    config = {}
-    with open(config_json, 'rb') as f:
-        config = json.load(f)
+    config = _load_ohos_config()
     src_dir = args[0]
     config_file = args[1]
     device = args[2]
     is_sparse = args[3]
     mkfs_tools, mk_configs, _ = load_config(config_file)
     image_name = device.split("/")[-1]
-    if image_name == "system.img":   
+    if image_name == "system.img":
         mk_system_img(mkfs_tools, mk_configs, device, src_dir, is_sparse)
     elif image_name == "ramdisk.img":
         mk_ramdisk_img(mkfs_tools, mk_configs, device, src_dir, is_sparse)
@@ -48,17 +48,16 @@ def do_archive(output: str, directory: str, prefix: str, compress_fn, filter_fil
         for f in filenames:
             if f not in filter_file_name:
                 files.extend([os.path.join(root, f)])
+    inputs = []
+    for f in files:
+        compress = compress_fn(f) if compress_fn else None
+        if prefix:
+            zip_path = os.path.join(prefix, os.path.relpath(f, directory))
+        else:
+            zip_path = os.path.relpath(f, directory)
+        inputs.append((zip_path, f, compress))
     with zipfile.ZipFile(output, 'a') as outfile:
-        for f in files:
-            compress = compress_fn(f) if compress_fn else None
-            if prefix:
-                zip_path = os.path.join(prefix, os.path.relpath(f, directory))
-            else:
-                zip_path = os.path.relpath(f, directory)
-            build_utils.add_to_zip_hermetic(outfile,
-                                         zip_path,
-                                         src_path=f,
-                                         compress=compress)
+        build_utils.add_files_to_zip_hermetic(outfile, inputs)
 
 
 def archive_ndk(output: str, os_irrelevant_dir: str, os_specific_dir: str, prefix: str,
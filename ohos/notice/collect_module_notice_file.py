@@ -15,8 +15,10 @@
 
 import sys
 import argparse
+import json
 import os
 import shutil
+import sqlite3
 import stat
 
 sys.path.append(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
@@ -58,25 +60,157 @@ def find_other_files(license_file_path):
     return other_files
 
 
-def find_file_recursively(current_dir: str, target_files: list):
-    if is_top_dir(current_dir):
-        return None
-    for file in target_files:
-        candidate = os.path.join(current_dir, file)
-        if os.path.isfile(candidate):
-            return candidate
-    return find_file_recursively(os.path.dirname(current_dir), target_files)
-
-
-def find_license(current_dir: str):
-    return find_file_recursively(current_dir, LICENSE_CANDIDATES)
-
-
-def find_opensource(current_dir: str):
-    return find_file_recursively(current_dir, [README_FILE_NAME])
-
-
-def get_license_from_readme(readme_path: str):
+class LicenseIndex(object):
+    """Directory to license index shared by the notice actions of a build
+    through sqlite. It keeps the license candidates found in every directory
+    walked up, and the parsed README.OpenSource files. Entries are dropped
+    when the mtime of the directory or of the README changes. The index is
+    only a cache: once sqlite fails, it is left and entries are kept in
+    memory."""
+
+    def __init__(self, index_file: str = None):
+        self._dirs = {}
+        self._readmes = {}
+        self._new_dirs = {}
+        self._new_readmes = {}
+        self.conn = None
+        if index_file:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(index_file)),
+                            exist_ok=True)
+                self.conn = sqlite3.connect(index_file, timeout=120)
+                self.conn.execute('PRAGMA journal_mode=WAL')
+                self.conn.execute('CREATE TABLE IF NOT EXISTS dirs ('
+                                  'path TEXT PRIMARY KEY, mtime INTEGER, '
+                                  'is_top INTEGER, files TEXT)')
+                self.conn.execute('CREATE TABLE IF NOT EXISTS readmes ('
+                                  'path TEXT PRIMARY KEY, mtime INTEGER, '
+                                  'size INTEGER, info TEXT)')
+            except (OSError, sqlite3.Error) as error:
+                self._disable(error)
+
+    def _disable(self, error):
+        print("warning: license index disabled: {}".format(error))
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except sqlite3.Error:
+                pass
+            self.conn = None
+
+    def dir_entry(self, current_dir: str):
+        """Returns whether |current_dir| is the top dir, and which of the
+        license candidates and README.OpenSource are files in it."""
+        path = os.path.abspath(current_dir)
+        entry = self._dirs.get(path)
+        if entry is not None:
+            return entry
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime is not None and self.conn is not None:
+            try:
+                row = self.conn.execute(
+                    'SELECT is_top, files FROM dirs WHERE path = ? AND mtime = ?',
+                    (path, mtime)).fetchone()
+            except sqlite3.Error as error:
+                self._disable(error)
+                row = None
+            if row is not None:
+                entry = bool(row[0]), json.loads(row[1])
+        if entry is None:
+            files = [
+                file for file in LICENSE_CANDIDATES + [README_FILE_NAME]
+                if os.path.isfile(os.path.join(path, file))
+            ]
+            entry = is_top_dir(path), files
+            if mtime is not None:
+                self._new_dirs[path] = (mtime, entry)
+        self._dirs[path] = entry
+        return entry
+
+    def readme_info(self, readme_path: str):
+        info = self._readmes.get(readme_path)
+        if info is not None:
+            return info
+        readme_stat = os.stat(readme_path)
+        key = (readme_stat.st_mtime_ns, readme_stat.st_size)
+        if self.conn is not None:
+            try:
+                row = self.conn.execute(
+                    'SELECT info FROM readmes WHERE path = ? AND mtime = ? '
+                    'AND size = ?', (readme_path, ) + key).fetchone()
+            except sqlite3.Error as error:
+                self._disable(error)
+                row = None
+            if row is not None:
+                info = tuple(json.loads(row[0]))
+        if info is None:
+            info = parse_license_from_readme(readme_path)
+            self._new_readmes[readme_path] = key + (info, )
+        self._readmes[readme_path] = info
+        return info
+
+    def save(self):
+        if self.conn is None or not (self._new_dirs or self._new_readmes):
+            return
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO dirs (path, mtime, is_top, files) '
+                    'VALUES (?, ?, ?, ?)',
+                    [(path, mtime, int(is_top), json.dumps(files))
+                     for path, (mtime, (is_top, files)) in self._new_dirs.items()])
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO readmes (path, mtime, size, info) '
+                    'VALUES (?, ?, ?, ?)',
+                    [(path, mtime, size, json.dumps(info))
+                     for path, (mtime, size, info) in self._new_readmes.items()])
+        except sqlite3.Error as error:
+            self._disable(error)
+        self._new_dirs = {}
+        self._new_readmes = {}
+
+    def close(self):
+        self.save()
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+_DEFAULT_INDEX = LicenseIndex()
+
+
+def find_file_recursively(current_dir: str, target_files: list,
+                          index: LicenseIndex = None):
+    index = index or _DEFAULT_INDEX
+    while True:
+        is_top, files = index.dir_entry(current_dir)
+        if is_top:
+            return None
+        for file in target_files:
+            if file in files:
+                return os.path.join(current_dir, file)
+        parent_dir = os.path.dirname(current_dir)
+        if parent_dir == current_dir:
+            return None
+        current_dir = parent_dir
+
+
+def find_license(current_dir: str, index: LicenseIndex = None):
+    return find_file_recursively(current_dir, LICENSE_CANDIDATES, index)
+
+
+def find_opensource(current_dir: str, index: LicenseIndex = None):
+    return find_file_recursively(current_dir, [README_FILE_NAME], index)
+
+
+def get_license_from_readme(readme_path: str, index: LicenseIndex = None):
+    return (index or _DEFAULT_INDEX).readme_info(readme_path)
+
+
+def parse_license_from_readme(readme_path: str):
     contents = read_json_file(readme_path)
     if contents is None:
         raise Exception("Error: failed to read {}.".format(readme_path))
@@ -137,16 +271,16 @@ def add_path_to_module_notice(module_notice_info, module_notice_info_list, optio
                 module_notice_info["Path"] = module_path.replace("../", "")
 
 
-def do_collect_notice_files(options, depfiles: str):
+def do_collect_notice_files(options, depfiles: str, index: LicenseIndex = None):
     module_notice_info_list = []
     module_notice_info = {}
     notice_file = options.license_file
     other_files = []
     if notice_file:
-        opensource_file = find_opensource(os.path.abspath(options.module_source_dir))
+        opensource_file = find_opensource(os.path.abspath(options.module_source_dir), index)
         if opensource_file is not None and os.path.exists(opensource_file):
             other_files.extend(find_other_files(opensource_file))
-            notice_file_info = get_license_from_readme(opensource_file)
+            notice_file_info = get_license_from_readme(opensource_file, index)
             module_notice_info['Software'] = notice_file_info[1]
             module_notice_info['Version'] = notice_file_info[2]
         else:
@@ -156,11 +290,11 @@ def do_collect_notice_files(options, depfiles: str):
         readme_path = os.path.join(options.module_source_dir,
                                    README_FILE_NAME)
         if not os.path.exists(readme_path):
-            readme_path = find_opensource(os.path.abspath(options.module_source_dir))
+            readme_path = find_opensource(os.path.abspath(options.module_source_dir), index)
         other_files.extend(find_other_files(options.module_source_dir))
         if readme_path is not None:
             depfiles.append(readme_path)
-            notice_file_info = get_license_from_readme(readme_path)
+            notice_file_info = get_license_from_readme(readme_path, index)
             notice_file = notice_file_info[0]
             if isinstance(notice_file, list):
                 notice_file = ",".join(notice_file)
@@ -168,11 +302,11 @@ def do_collect_notice_files(options, depfiles: str):
             module_notice_info['Version'] = notice_file_info[2]
 
     if notice_file is None:
-        notice_file = find_license(options.module_source_dir)
-        opensource_file = find_opensource(os.path.abspath(options.module_source_dir))
+        notice_file = find_license(options.module_source_dir, index)
+        opensource_file = find_opensource(os.path.abspath(options.module_source_dir), index)
         if opensource_file is not None and os.path.exists(opensource_file):
             other_files.extend(find_other_files(opensource_file))
-            notice_file_info = get_license_from_readme(opensource_file)
+            notice_file_info = get_license_from_readme(opensource_file, index)
             module_notice_info['Software'] = notice_file_info[1]
             module_notice_info['Version'] = notice_file_info[2]
         else:
@@ -238,6 +372,8 @@ def main(args):
     parser.add_argument('--module-source-dir',
                         help='source directory of this module',
                         required=True)
+    parser.add_argument('--license-index',
+                        help='license index shared by the notice actions')
 
     options = parser.parse_args()
     depfiles = []
@@ -255,7 +391,11 @@ def main(args):
                                              '{}.{}'.format(os.path.basename(src), 'txt'))
                 options.output.append(extend_output)
 
-    do_collect_notice_files(options, depfiles)
+    index = LicenseIndex(options.license_index)
+    try:
+        do_collect_notice_files(options, depfiles, index)
+    finally:
+        index.close()
     if options.license_file:
         depfiles.append(options.license_file)
     build_utils.write_depfile(options.depfile, options.output[0], depfiles)
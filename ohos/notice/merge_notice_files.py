@@ -14,8 +14,11 @@
 # limitations under the License.
 
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import argparse
 import hashlib
+import io
+import json
 import os
 import os.path
 import sys
@@ -96,96 +99,205 @@ def get_entity(text: str):
     return "".join(xml_escape_table.get(c, c) for c in text)
 
 
-def generate_txt_notice_files(file_hash: str, input_dir: str, output_filename: str,
-                              notice_title: str):
+def _file_stat(file: str):
+    try:
+        file_stat = os.stat(file)
+    except OSError:
+        return None
+    return [file_stat.st_size, file_stat.st_mtime_ns]
+
+
+class NoticeCache(object):
+    """Notice merge state kept across builds: the hash of every notice
+    file keyed by its stat, and the rendered TXT and XML sections of the
+    groups of identical notices."""
+
+    VERSION = 1
+
+    def __init__(self, cache_file: str = None):
+        self._cache_file = cache_file
+        self._hashes = {}
+        self._sections = {}
+        self._used_hashes = {}
+        self._used_sections = {}
+        if cache_file and os.path.isfile(cache_file):
+            try:
+                data = read_json_file(cache_file)
+            except ValueError:
+                data = None
+            if data and data.get('version') == self.VERSION:
+                self._hashes = data.get('hashes', {})
+                self._sections = data.get('sections', {})
+
+    def hash_files(self, files: list, jobs: int = None) -> dict:
+        hashes = {}
+        missing = []
+        for file in files:
+            file_stat = _file_stat(file)
+            cached = self._hashes.get(file)
+            if cached and cached[:2] == file_stat:
+                hashes[file] = cached[2]
+                self._used_hashes[file] = cached
+            else:
+                missing.append((file, file_stat))
+        if missing:
+            jobs = min(jobs or os.cpu_count() or 1, len(missing))
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                results = executor.map(compute_hash,
+                                       [file for file, _ in missing])
+                for (file, file_stat), file_hash in zip(missing, results):
+                    hashes[file] = file_hash
+                    self._used_hashes[file] = file_stat + [file_hash]
+        return hashes
+
+    def section(self, key: str, render) -> str:
+        text = self._sections.get(key)
+        if text is None:
+            text = render()
+        self._used_sections[key] = text
+        return text
+
+    def save(self):
+        # Only the entries of this merge are kept, so the cache does not
+        # grow with removed notices.
+        if self._cache_file:
+            write_json_file(self._cache_file, {
+                'version': self.VERSION,
+                'hashes': self._used_hashes,
+                'sections': self._used_sections,
+            })
+
+
+def _render_txt_notice_section(value: list, input_dir: str) -> str:
+    output_file = io.StringIO()
+    write_file(output_file, '=' * 60)
+    write_file(output_file, "Notices for file(s):")
+    for filename in value:
+        write_file(
+            output_file, '/{}'.format(
+                re.sub('.txt.*', '',
+                       os.path.relpath(filename, input_dir))))
+    write_file(output_file, '-' * 60)
+    write_file(output_file, "Notices for software(s):")
+    software_list = []
+    for filename in value:
+        json_filename = '{}.json'.format(filename)
+        contents = read_json_file(json_filename)
+        if contents is not None and contents not in software_list:
+            software_list.append(contents)
+    software_dict = {}
+    for contents_value in software_list:
+        if len(contents_value) > 0:
+            for val in contents_value:
+                if val.get('Software'):
+                    software_name = val.get('Software').strip()
+                    if software_name not in software_dict:
+                        software_dict[software_name] = {"_version": "", "_path": []}
+                else:
+                    write_file(output_file, "Software: ")
+                if val.get('Version'):
+                    version = val.get('Version').strip()
+                    software_dict[software_name]["_version"] = version
+                else:
+                    write_file(output_file, "Version: ")
+                if val.get('Path'):
+                    notice_source_path = val.get('Path').strip()
+                    software_dict[software_name]["_path"].append(notice_source_path)
+    for software, software_value in software_dict.items():
+        write_file(output_file, f"Software: {software}")
+        write_file(output_file, f"Version: {software_value.get('_version')}")
+        if software_value.get("_path"):
+            for path in software_value.get("_path"):
+                write_file(output_file, f"Path: {path}")
+    write_file(output_file, '-' * 60)
+    with open(value[0], errors='ignore') as temp_file_hd:
+        write_file(output_file, temp_file_hd.read())
+    return output_file.getvalue()
+
+
+def _render_xml_notice_content(file_key: str, filename: str) -> str:
+    output_file = io.StringIO()
+    with open(filename, errors='ignore') as temp_file_hd:
+        write_file(
+            output_file,
+            '<file-content content_id="{}"><![CDATA[{}]]></file-content>'
+                .format(file_key, get_entity(temp_file_hd.read())))
+    write_file(output_file, '')
+    return output_file.getvalue()
+
+
+def _write_if_changed(output_filename: str, text: str) -> bool:
+    # Unchanged outputs are only touched, they stay newer than the inputs.
+    if os.path.isfile(output_filename):
+        with open(output_filename) as output_file:
+            if output_file.read() == text:
+                build_utils.touch(output_filename)
+                return False
     with open(output_filename, "w") as output_file:
-        write_file(output_file, notice_title)
-        for value in file_hash:
-            write_file(output_file, '=' * 60)
-            write_file(output_file, "Notices for file(s):")
-            for filename in value:
-                write_file(
-                    output_file, '/{}'.format(
-                        re.sub('.txt.*', '',
-                               os.path.relpath(filename, input_dir))))
-            write_file(output_file, '-' * 60)
-            write_file(output_file, "Notices for software(s):")
-            software_list = []
-            for filename in value:
-                json_filename = '{}.json'.format(filename)
-                contents = read_json_file(json_filename)
-                if contents is not None and contents not in software_list:
-                    software_list.append(contents)
-            software_dict = {}
-            for contents_value in software_list:
-                if len(contents_value) > 0:
-                    for val in contents_value:
-                        if val.get('Software'):
-                            software_name = val.get('Software').strip()
-                            if software_name not in software_dict:
-                                software_dict[software_name] = {"_version": "", "_path": []}
-                        else:
-                            write_file(output_file, "Software: ")
-                        if val.get('Version'):
-                            version = val.get('Version').strip()
-                            software_dict[software_name]["_version"] = version
-                        else:
-                            write_file(output_file, "Version: ")
-                        if val.get('Path'):
-                            notice_source_path = val.get('Path').strip()
-                            software_dict[software_name]["_path"].append(notice_source_path)
-            for software, software_value in software_dict.items():
-                write_file(output_file, f"Software: {software}")
-                write_file(output_file, f"Version: {software_value.get('_version')}")
-                if software_value.get("_path"):
-                    for path in software_value.get("_path"):
-                        write_file(output_file, f"Path: {path}")
-            write_file(output_file, '-' * 60)
-            with open(value[0], errors='ignore') as temp_file_hd:
-                write_file(output_file, temp_file_hd.read())
+        output_file.write(text)
+    return True
+
+
+def generate_txt_notice_files(file_hash: list, input_dir: str, output_filename: str,
+                              notice_title: str, cache: NoticeCache = None,
+                              hashes: dict = None) -> bool:
+    output_file = io.StringIO()
+    write_file(output_file, notice_title)
+    for value in file_hash:
+        if cache is None or hashes is None:
+            output_file.write(_render_txt_notice_section(value, input_dir))
+            continue
+        # A section depends on the names, the json files and the content
+        # of the group of identical notices.
+        key = json.dumps(['txt', input_dir, hashes.get(value[0])] + [
+            [filename, _file_stat('{}.json'.format(filename))]
+            for filename in value
+        ])
+        output_file.write(cache.section(
+            key, lambda: _render_txt_notice_section(value, input_dir)))
+    return _write_if_changed(output_filename, output_file.getvalue())
 
 
 def generate_xml_notice_files(files_with_same_hash: dict, input_dir: str,
-                              output_filename: str):
+                              output_filename: str,
+                              cache: NoticeCache = None) -> bool:
+    cache = cache or NoticeCache()
     id_table = {}
     for file_key in files_with_same_hash.keys():
         for filename in files_with_same_hash[file_key]:
             id_table[filename] = file_key
-    with open(output_filename, "w") as output_file:
-        write_file(output_file, '<?xml version="1.0" encoding="utf-8"?>')
-        write_file(output_file, "<licenses>")
-
-        # Flatten the lists into a single filename list
-        sorted_filenames = sorted(id_table.keys())
-
-        # write out a table of contents
-        for filename in sorted_filenames:
-            stripped_filename = re.sub('.txt.*', '',
-                                       os.path.relpath(filename, input_dir))
-            write_file(
-                output_file, '<file-name content_id="%s">%s</file-name>' %
-                             (id_table.get(filename), stripped_filename))
-
-        write_file(output_file, '')
-        write_file(output_file, '')
-
-        processed_file_keys = []
-        # write the notice file lists
-        for filename in sorted_filenames:
-            file_key = id_table.get(filename)
-            if file_key in processed_file_keys:
-                continue
-            processed_file_keys.append(file_key)
-
-            with open(filename, errors='ignore') as temp_file_hd:
-                write_file(
-                    output_file,
-                    '<file-content content_id="{}"><![CDATA[{}]]></file-content>'
-                        .format(file_key, get_entity(temp_file_hd.read())))
-            write_file(output_file, '')
+    output_file = io.StringIO()
+    write_file(output_file, '<?xml version="1.0" encoding="utf-8"?>')
+    write_file(output_file, "<licenses>")
+
+    # Flatten the lists into a single filename list
+    sorted_filenames = sorted(id_table.keys())
+
+    # write out a table of contents
+    for filename in sorted_filenames:
+        stripped_filename = re.sub('.txt.*', '',
+                                   os.path.relpath(filename, input_dir))
+        write_file(
+            output_file, '<file-name content_id="%s">%s</file-name>' %
+                         (id_table.get(filename), stripped_filename))
+
+    write_file(output_file, '')
+    write_file(output_file, '')
+
+    processed_file_keys = set()
+    # write the notice file lists, the content of a file is given by its hash.
+    for filename in sorted_filenames:
+        file_key = id_table.get(filename)
+        if file_key in processed_file_keys:
+            continue
+        processed_file_keys.add(file_key)
+        output_file.write(cache.section(
+            json.dumps(['xml', file_key]),
+            lambda: _render_xml_notice_content(file_key, filename)))
 
-        # write the file complete node.
-        write_file(output_file, "</licenses>")
+    # write the file complete node.
+    write_file(output_file, "</licenses>")
+    return _write_if_changed(output_filename, output_file.getvalue())
 
 
 def compress_file_to_gz(src_file_name: str, gz_file_name: str):
@@ -225,15 +337,15 @@ def do_merge_notice(args, zipfiles: str, txt_files: str):
 
     notice_xml = notice_gz.replace('.gz', '')
 
+    cache = NoticeCache('{}.cache.json'.format(notice_txt))
     files_with_same_hash = defaultdict(list)
     for file in zipfiles:
         txt_files.append(handle_zipfile_notices(file))
 
+    txt_files = [file for file in txt_files if os.stat(file).st_size != 0]
+    hashes = cache.hash_files(txt_files, args.jobs)
     for file in txt_files:
-        if os.stat(file).st_size == 0:
-            continue
-        file_hash = compute_hash(file)
-        files_with_same_hash[file_hash].append(file)
+        files_with_same_hash[hashes[file]].append(file)
 
     file_sets = [
         sorted(files_with_same_hash[hash])
@@ -242,11 +354,16 @@ def do_merge_notice(args, zipfiles: str, txt_files: str):
 
     if file_sets is not None:
         generate_txt_notice_files(file_sets, notice_dir, notice_txt,
-                                  notice_title)
+                                  notice_title, cache, hashes)
 
     if files_with_same_hash is not None:
-        generate_xml_notice_files(files_with_same_hash, notice_dir, notice_xml)
-        compress_file_to_gz(notice_xml, args.output_notice_gz)
+        xml_changed = generate_xml_notice_files(files_with_same_hash,
+                                                notice_dir, notice_xml, cache)
+        if xml_changed or not os.path.isfile(args.output_notice_gz):
+            compress_file_to_gz(notice_xml, args.output_notice_gz)
+        else:
+            build_utils.touch(args.output_notice_gz)
+    cache.save()
 
     if args.notice_module_info:
         module_install_info_list = []
@@ -292,6 +409,8 @@ def parse_args():
     parser.add_argument('--notice-install-dir',
                         help='install directories of notice file')
     parser.add_argument('--lite-product', help='', default="")
+    parser.add_argument('--jobs', type=int,
+                        help='threads hashing the notice files')
 
 
     return parser.parse_args()
@@ -17,6 +17,7 @@ import sys
 import argparse
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.append(
     os.path.dirname(os.path.dirname(os.path.dirname(
@@ -64,10 +65,161 @@ def _get_post_process_modules_info(post_process_modules_info_files: list, depfil
     return modules_info_list
 
 
+def _stat_key(path: str):
+    try:
+        st = os.stat(path, follow_symlinks=False)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+def _source_stat_key(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino]
+
+
+class ModuleInstaller(object):
+    """Installs files into the platform dir like shutil.copy2, in a thread
+    pool.
+
+    The install manifest records the source and installed file of every
+    destination with their stats, a rerun skips the destinations whose
+    source and installed file are unchanged, and remove_stale() deletes the
+    files the run didn't install, giving the same tree as a clean install.
+    """
+
+    def __init__(self, platform_installed_path: str, manifest_file: str = None,
+                 hardlink: bool = False):
+        self.platform_installed_path = os.path.abspath(platform_installed_path)
+        self.manifest_file = manifest_file
+        self.hardlink = hardlink
+        self.files = {}
+        self.dirs = []
+        self.outputs = set()
+        self.manifest = {}
+        if manifest_file and os.path.exists(manifest_file):
+            self.manifest = (read_json_file(manifest_file) or {}).get('files', {})
+        self.copied = 0
+        self.skipped = 0
+        self.removed = 0
+
+    def _key(self, path: str):
+        return os.path.relpath(os.path.abspath(path), self.platform_installed_path)
+
+    def add_file(self, source: str, dest: str):
+        dest = os.path.abspath(dest)
+        # The last module installing a destination wins.
+        self.files.pop(dest, None)
+        self.files[dest] = os.path.abspath(source)
+        self.outputs.add(dest)
+
+    def add_dir(self, source: str, dest: str):
+        """Installs a directory like shutil.copytree(dirs_exist_ok=True)."""
+        for root, dirs, files in os.walk(source, followlinks=True):
+            dest_root = os.path.join(dest, os.path.relpath(root, source))
+            self.make_dir(dest_root)
+            for name in files:
+                self.add_file(os.path.join(root, name), os.path.join(dest_root, name))
+            self.dirs.append((root, dest_root))
+
+    def make_dir(self, path: str):
+        path = os.path.abspath(path)
+        if path not in self.outputs and (os.path.islink(path) or
+                                         os.path.lexists(path) and not os.path.isdir(path)):
+            os.unlink(path)
+        os.makedirs(path, exist_ok=True)
+        self.outputs.add(path)
+
+    def claim(self, path: str):
+        """Prepares to create |path| outside of the installer: a leftover of
+        the previous run is deleted, as after a clean install it wouldn't
+        exist."""
+        path = os.path.abspath(path)
+        if path in self.outputs or path in self.files:
+            return
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        elif os.path.lexists(path):
+            os.unlink(path)
+        self.outputs.add(path)
+
+    def _up_to_date(self, source: str, dest: str):
+        entry = self.manifest.get(self._key(dest))
+        return entry is not None and entry.get('source') == source and \
+            entry.get('source_stat') == _source_stat_key(source) and \
+            entry.get('dest_stat') == _stat_key(dest)
+
+    def _install(self, dest: str):
+        source = self.files.get(dest)
+        if self._up_to_date(source, dest):
+            return False
+        if os.path.lexists(dest):
+            # Don't write into a file which may be hardlinked to a source.
+            os.unlink(dest)
+        if build_utils.copy_file_data(source, dest, hardlink=self.hardlink) != 'hardlink':
+            shutil.copystat(source, dest)
+        return True
+
+    def run(self, jobs: int = None):
+        for dest in self.files:
+            if os.path.isdir(dest) and not os.path.islink(dest):
+                shutil.rmtree(dest)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+        jobs = jobs or os.cpu_count() or 1
+        dests = list(self.files)
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            copied = list(executor.map(self._install, dests))
+        self.copied = sum(copied)
+        self.skipped = len(copied) - self.copied
+        for source, dest in reversed(self.dirs):
+            shutil.copystat(source, dest)
+
+    def remove_stale(self, roots: list):
+        keep = set()
+        for output in self.outputs:
+            while output not in keep and output != self.platform_installed_path:
+                keep.add(output)
+                output = os.path.dirname(output)
+        for root in roots:
+            root = os.path.abspath(root)
+            if os.path.isdir(root) and not os.path.islink(root):
+                self._remove_stale(root, keep)
+
+    def _remove_stale(self, path: str, keep: set):
+        if path not in keep:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.unlink(path)
+            self.removed += 1
+            return
+        if os.path.isdir(path) and not os.path.islink(path):
+            for name in os.listdir(path):
+                self._remove_stale(os.path.join(path, name), keep)
+
+    def save(self):
+        if not self.manifest_file:
+            return
+        files = {}
+        for dest, source in self.files.items():
+            files[self._key(dest)] = {
+                'source': source,
+                'source_stat': _source_stat_key(source),
+                'dest_stat': _stat_key(dest),
+            }
+        write_json_file(self.manifest_file, {'files': files})
+
+
 def copy_modules(system_install_info: dict, install_modules_info_file: str,
                  modules_info_file: str, module_list_file: str,
                  post_process_modules_info_files: list, platform_installed_path: str,
-                 host_toolchain, additional_system_files: dict, depfiles: list, categorized_libraries: dict):
+                 host_toolchain, additional_system_files: dict, depfiles: list, categorized_libraries: dict,
+                 installer: ModuleInstaller = None, jobs: int = None):
+    if installer is None:
+        installer = ModuleInstaller(platform_installed_path)
     output_result = []
     dest_list = []
     symlink_dest = []
@@ -93,9 +245,10 @@ def copy_modules(system_install_info: dict, install_modules_info_file: str,
         output_result.append(_module_info)
 
     for source, system_path in additional_system_files:
-        shutil.copy(source, os.path.join(platform_installed_path, system_path))
+        installer.add_file(source, os.path.join(platform_installed_path, system_path))
 
-    # copy modules
+    # plan the copies of modules
+    installed_modules = []
     for module_info in output_result:
         if module_info.get('type') == 'none':
             continue
@@ -109,7 +262,8 @@ def copy_modules(system_install_info: dict, install_modules_info_file: str,
         if not os.path.exists(source):
             raise Exception("source '{}' doesn't exist.".format(source))
         depfiles.append(source)
-        for dest in dests:
+        installed_modules.append(module_info)
+        for index, dest in enumerate(dests):
             if dest.startswith('/'):
                 dest = dest[1:]
             dest_list.append(dest)
@@ -119,20 +273,27 @@ def copy_modules(system_install_info: dict, install_modules_info_file: str,
                                         os.path.dirname(dest))
             elif os.path.isdir(source):
                 dest_dir = os.path.join(platform_installed_path, dest)
-            if not os.path.exists(dest_dir):
-                os.makedirs(dest_dir, exist_ok=True)
+            installer.make_dir(dest_dir)
             if os.path.isdir(source):
                 is_hvigor_hap = False
                 for filename in os.listdir(source):
                     if filename.endswith('.hap') or filename.endswith('.hsp'):
                         is_hvigor_hap = True
-                        shutil.copy2(os.path.join(source, filename),
-                                     os.path.join(platform_installed_path, dest, filename))
+                        installer.add_file(os.path.join(source, filename),
+                                           os.path.join(platform_installed_path, dest, filename))
                 if not is_hvigor_hap:
-                    shutil.copytree(source, os.path.join(platform_installed_path, dest), dirs_exist_ok=True)
+                    installer.add_dir(source, os.path.join(platform_installed_path, dest))
+            elif index == 0 and 'symlink_path' in module_info and \
+                    not dests[0].startswith('/'):
+                # replaced by a symlink below
+                continue
             else:
-                shutil.copy2(source, os.path.join(platform_installed_path, dest))
+                installer.add_file(source, os.path.join(platform_installed_path, dest))
 
+    installer.run(jobs)
+
+    for module_info in installed_modules:
+        dests = module_info.get('dest')
         # add symlink
         if 'symlink' in module_info:
             symlink_dest = module_info.get('symlink')
@@ -142,6 +303,7 @@ def copy_modules(system_install_info: dict, install_modules_info_file: str,
                     symlink_dest_dir = os.path.dirname(dest)
                     symlink_dest_file = os.path.join(platform_installed_path,
                                                      symlink_dest_dir, name)
+                    installer.claim(symlink_dest_file)
                     if not os.path.exists(symlink_dest_file):
                         os.symlink(symlink_src_file, symlink_dest_file)
         if 'symlink_ext' in module_info:
@@ -151,14 +313,15 @@ def copy_modules(system_install_info: dict, install_modules_info_file: str,
                 for name in symlink_ext:
                     symlink_dest_file = os.path.join(platform_installed_path, dest.split('/')[0], name)
                     relpath = os.path.relpath(os.path.dirname(symlink_src_file), os.path.dirname(symlink_dest_file))
-                    if not os.path.exists(os.path.dirname(symlink_dest_file)):
-                        os.makedirs(os.path.dirname(symlink_dest_file), exist_ok=True)
+                    installer.make_dir(os.path.dirname(symlink_dest_file))
+                    installer.claim(symlink_dest_file)
                     if not os.path.exists(symlink_dest_file):
                         os.symlink(os.path.join(relpath, os.path.basename(dest)), symlink_dest_file)
         if 'symlink_path' in module_info:
             symlink_path = module_info.get('symlink_path')
             dest_file = os.path.join(platform_installed_path, dests[0])
-            if os.path.exists(dest_file):
+            installer.claim(dest_file)
+            if os.path.lexists(dest_file):
                 os.remove(dest_file)
             os.symlink(symlink_path, dest_file)
             if not os.path.lexists(dest_file):
@@ -197,6 +360,10 @@ def main():
     parser.add_argument('--post-process-modules-info-files',
                         nargs='*',
                         default=[])
+    parser.add_argument('--hardlink', action='store_true',
+                        help='hardlink installed files to their source when possible')
+    parser.add_argument('--jobs', type=int,
+                        help='number of threads copying files, default is the number of cpus')
     args = parser.parse_args()
 
     additional_system_files = []
@@ -215,59 +382,24 @@ def main():
         raise Exception("read file '{}' failed.".format(
             args.system_install_info_file))
 
-    system_install_base_dir = args.system_dir
-    if os.path.exists(system_install_base_dir):
-        shutil.rmtree(system_install_base_dir)
-        print('remove system dir...')
-    os.makedirs(system_install_base_dir, exist_ok=True)
-
-    vendor_install_base_dir = os.path.join(args.platform_installed_path,
-                                           'vendor')
-    if os.path.exists(vendor_install_base_dir):
-        shutil.rmtree(vendor_install_base_dir)
-        print('remove vendor dir...')
-
-    eng_system_install_base_dir = os.path.join(args.platform_installed_path,
-                                           'eng_system')
-    if os.path.exists(eng_system_install_base_dir):
-        shutil.rmtree(eng_system_install_base_dir)
-        print('remove eng_system dir...')
-
-    eng_chipset_install_base_dir = os.path.join(args.platform_installed_path,
-                                           'eng_chipset')
-    if os.path.exists(eng_chipset_install_base_dir):
-        shutil.rmtree(eng_chipset_install_base_dir)
-        print('remove eng_chipset dir...')
-
-    sys_prod_install_base_dir = os.path.join(args.platform_installed_path,
-                                           'sys_prod')
-    if os.path.exists(sys_prod_install_base_dir):
-        shutil.rmtree(sys_prod_install_base_dir)
-        print('remove sys_prod dir...')
-
-    chip_prod_install_base_dir = os.path.join(args.platform_installed_path,
-                                           'chip_prod')
-    if os.path.exists(chip_prod_install_base_dir):
-        shutil.rmtree(chip_prod_install_base_dir)
-        print('remove chip_prod dir...')
-
-    updater_install_base_dir = os.path.join(args.platform_installed_path,
-                                            'updater')
-    if os.path.exists(updater_install_base_dir):
-        shutil.rmtree(updater_install_base_dir)
-        print('remove updater dir...')
-
-    updater_vendor_install_base_dir = os.path.join(args.platform_installed_path,
-                                            'updater_vendor')
-    if os.path.exists(updater_vendor_install_base_dir):
-        shutil.rmtree(updater_vendor_install_base_dir)
-        print('remove updater dir...')
-
-    ramdisk_install_base_dir = os.path.join(args.platform_installed_path,
-                                            'ramdisk')
-    if os.path.exists(ramdisk_install_base_dir):
-        shutil.rmtree(ramdisk_install_base_dir)
-        print('remove ramdisk dir...')
+    # Image staging dirs, which only contain the installed files.
+    install_base_dirs = [args.system_dir] + [
+        os.path.join(args.platform_installed_path, name)
+        for name in ('vendor', 'eng_system', 'eng_chipset', 'sys_prod',
+                     'chip_prod', 'updater', 'updater_vendor', 'ramdisk')
+    ]
+    installer = ModuleInstaller(
+        args.platform_installed_path,
+        manifest_file=os.path.join(args.platform_installed_path,
+                                   'install_manifest.json'),
+        hardlink=args.hardlink)
+    if not installer.manifest:
+        # Nothing is known about the files of a previous install.
+        for install_base_dir in install_base_dirs:
+            if os.path.exists(install_base_dir):
+                shutil.rmtree(install_base_dir)
+                print('remove {} dir...'.format(os.path.basename(install_base_dir)))
+    os.makedirs(args.system_dir, exist_ok=True)
 
     print('copy modules...')
     categorized_libraries = load_categorized_libraries(args.categorized_libraries)
@@ -275,7 +407,13 @@ def main():
                  args.modules_info_file, args.modules_list_file,
                  args.post_process_modules_info_files,
                  args.platform_installed_path, args.host_toolchain,
-                 additional_system_files, depfiles, categorized_libraries)
+                 additional_system_files, depfiles, categorized_libraries,
+                 installer=installer, jobs=args.jobs)
+    installer.outputs.add(os.path.abspath(args.system_dir))
+    installer.remove_stale(install_base_dirs)
+    installer.save()
+    print('copied {} files, {} up to date, removed {} stale files'.format(
+        installer.copied, installer.skipped, installer.removed))
 
     if os.path.exists(args.system_image_zipfile):
         os.unlink(args.system_image_zipfile)
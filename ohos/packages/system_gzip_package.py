@@ -17,7 +17,10 @@ import argparse
 import sys
 import os
 import shutil
+import stat
 import tarfile
+import calendar
+import zipfile
 
 sys.path.append(
     os.path.dirname(os.path.dirname(os.path.dirname(
@@ -68,6 +71,64 @@ def compress_image_files(package_dir: str, output_file: str, additional_files: l
                     raise
 
 
+def _image_zip_members(in_zip: zipfile.ZipFile) -> list:
+    # Directories are implied by the files of the zip, and sorted like
+    # tarfile adds a directory: depth first, by name.
+    members = {}
+    for info in in_zip.infolist():
+        name = info.filename.rstrip('/')
+        if not name:
+            continue
+        members[name] = info
+        parent = os.path.dirname(name)
+        while parent and parent not in members:
+            members[parent] = None
+            parent = os.path.dirname(parent)
+    return sorted(members.items(), key=lambda item: item[0].split('/'))
+
+
+def _image_tar_info(name: str, info: zipfile.ZipInfo) -> tarfile.TarInfo:
+    tar_info = tarfile.TarInfo(name)
+    mode = info.external_attr >> 16 if info else 0
+    if info is None or info.is_dir():
+        tar_info.type = tarfile.DIRTYPE
+        tar_info.mode = stat.S_IMODE(mode) or 0o755
+    elif stat.S_ISLNK(mode):
+        tar_info.type = tarfile.SYMTYPE
+        tar_info.mode = stat.S_IMODE(mode) or 0o777
+    else:
+        tar_info.size = info.file_size
+        tar_info.mode = stat.S_IMODE(mode) or 0o644
+    if info:
+        tar_info.mtime = calendar.timegm(info.date_time + (0, 0, 0))
+    return tar_info
+
+
+def stream_image_files(system_image_zipfile: str, output_file: str,
+                       additional_files: list, jobs: int = None):
+    # Same package as extracting the zip and compress_image_files, but the
+    # members are read from the zip, and the tar is gzipped in blocks in
+    # parallel, as a multi-member gzip.
+    with open(output_file, 'wb') as out_file, \
+            build_utils.ParallelGzipWriter(out_file, jobs=jobs) as gz_file, \
+            tarfile.open(fileobj=gz_file, mode='w') as tar, \
+            zipfile.ZipFile(system_image_zipfile) as in_zip:
+        tar.addfile(_image_tar_info('system', None))
+        for name, info in _image_zip_members(in_zip):
+            tar_info = _image_tar_info('system/' + name, info)
+            if tar_info.issym():
+                tar_info.linkname = in_zip.read(info).decode()
+                tar.addfile(tar_info)
+            elif tar_info.isfile():
+                with in_zip.open(info) as member:
+                    tar.addfile(tar_info, member)
+            else:
+                tar.addfile(tar_info)
+        for f in additional_files:
+            if os.path.exists(f):
+                tar.add(f, arcname=os.path.basename(f))
+
+
 def main(argv):
     argv = build_utils.expand_file_args(argv)
     parser = argparse.ArgumentParser()
@@ -76,9 +137,26 @@ def main(argv):
     parser.add_argument("--system-image-zipfile", required=True)
     parser.add_argument('--output-file', help='', required=True)
     parser.add_argument('--additional-files', help='', action='append')
+    parser.add_argument('--streaming', action='store_true',
+                        help='read the images from the zip and gzip them '
+                        'in parallel, without extracting them first')
+    parser.add_argument('--jobs', type=int,
+                        help='compression threads of --streaming')
     args = parser.parse_args(argv[1:])
 
     depfiles = [args.system_image_zipfile] + args.additional_files
+    if args.streaming:
+        build_utils.call_and_write_depfile_if_stale(
+            lambda: stream_image_files(args.system_image_zipfile,
+                                       args.output_file,
+                                       args.additional_files, args.jobs),
+            args,
+            depfile_deps=depfiles,
+            input_paths=depfiles,
+            output_paths=([args.output_file]),
+            force=False,
+            add_pydeps=False)
+        return
     with build_utils.temp_dir() as img_dir:
         build_utils.extract_all(args.system_image_zipfile,
                                 img_dir,
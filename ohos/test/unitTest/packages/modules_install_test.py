@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))), 'packages'))
+from modules_install import ModuleInstaller  # noqa: E402
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(data)
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def _tree(root):
+    tree = {}
+    for dirpath, dirs, files in os.walk(root):
+        for name in dirs + files:
+            path = os.path.join(dirpath, name)
+            tree[os.path.relpath(path, root)] = None if os.path.isdir(path) else _read(path)
+    return tree
+
+
+class ModuleInstallerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.src = os.path.join(self.work_dir, 'src')
+        self.platform = os.path.join(self.work_dir, 'packages', 'phone')
+        self.system = os.path.join(self.platform, 'system')
+        self.manifest = os.path.join(self.platform, 'install_manifest.json')
+        _write(os.path.join(self.src, 'liba.so'), 'a')
+        _write(os.path.join(self.src, 'libb.so'), 'b')
+        _write(os.path.join(self.src, 'etc', 'conf', 'x.cfg'), 'x')
+        return super().setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+        return super().tearDown()
+
+    def _install(self, files, dirs=(), hardlink=False):
+        installer = ModuleInstaller(self.platform, self.manifest, hardlink=hardlink)
+        for source, dest in files:
+            installer.add_file(os.path.join(self.src, source), os.path.join(self.system, dest))
+        for source, dest in dirs:
+            installer.add_dir(os.path.join(self.src, source), os.path.join(self.system, dest))
+        installer.run(jobs=2)
+        installer.remove_stale([self.system])
+        installer.save()
+        return installer
+
+    def test_install(self):
+        installer = self._install([('liba.so', 'lib/liba.so')], [('etc', 'etc')])
+        self.assertEqual(_tree(self.system), {
+            'lib': None, 'lib/liba.so': 'a', 'etc': None, 'etc/conf': None,
+            'etc/conf/x.cfg': 'x'})
+        self.assertEqual((installer.copied, installer.skipped), (2, 0))
+
+    def test_rerun_skips_unchanged_files(self):
+        files = [('liba.so', 'lib/liba.so'), ('libb.so', 'lib/libb.so')]
+        self._install(files)
+        _write(os.path.join(self.src, 'libb.so'), 'b2')
+        installer = self._install(files)
+        self.assertEqual((installer.copied, installer.skipped), (1, 1))
+        self.assertEqual(_read(os.path.join(self.system, 'lib', 'libb.so')), 'b2')
+
+    def test_modified_install_is_restored(self):
+        files = [('liba.so', 'lib/liba.so')]
+        self._install(files)
+        _write(os.path.join(self.system, 'lib', 'liba.so'), 'modified')
+        installer = self._install(files)
+        self.assertEqual(installer.copied, 1)
+        self.assertEqual(_read(os.path.join(self.system, 'lib', 'liba.so')), 'a')
+
+    def test_stale_files_are_removed(self):
+        self._install([('liba.so', 'lib/liba.so'), ('libb.so', 'lib64/libb.so')])
+        _write(os.path.join(self.system, 'leftover.txt'), 'old')
+        installer = self._install([('liba.so', 'lib/liba.so')])
+        self.assertEqual(_tree(self.system), {'lib': None, 'lib/liba.so': 'a'})
+        self.assertEqual(installer.removed, 2)
+
+    def test_same_tree_as_clean_install(self):
+        self._install([('libb.so', 'lib/liba.so'), ('liba.so', 'bin/x')], [('etc', 'etc')])
+        self._install([('liba.so', 'lib/liba.so')], [('etc', 'etc/other')])
+        incremental = _tree(self.system)
+        shutil.rmtree(self.platform)
+        self._install([('liba.so', 'lib/liba.so')], [('etc', 'etc/other')])
+        self.assertEqual(incremental, _tree(self.system))
+
+    def test_hardlink_is_not_written_through(self):
+        files = [('liba.so', 'lib/liba.so')]
+        self._install(files, hardlink=True)
+        dest = os.path.join(self.system, 'lib', 'liba.so')
+        self.assertTrue(os.path.samefile(dest, os.path.join(self.src, 'liba.so')))
+        _write(os.path.join(self.src, 'liba.so'), 'a2')
+        self._install(files, hardlink=False)
+        self.assertEqual(_read(dest), 'a2')
+        self.assertFalse(os.path.samefile(dest, os.path.join(self.src, 'liba.so')))
+
+
+if __name__ == '__main__':
+    unittest.main()
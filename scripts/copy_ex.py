@@ -11,14 +11,109 @@ import optparse
 import os
 import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 from util import build_utils
 
 
+# Trees with fewer files are copied serially.
+_PARALLEL_MIN_FILES = 64
+
+
+def _remove_path(path):
+    """Deletes |path|, whatever its type, if it exists."""
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.unlink(path)
+
+
+class CopyPlan():
+    """Collects the file copies of a run, to do them in a thread pool.
+
+    In incremental mode, destination files which are up to date copies of
+    their source are kept, and remove_stale() deletes what the run didn't
+    produce, instead of clearing the destination beforehand.
+    """
+    def __init__(self, incremental=False, hardlink=False):
+        self.incremental = incremental
+        self.hardlink = hardlink
+        self.files = []
+        self.dirs = []
+        self.outputs = set()
+
+    def add_file(self, src, dest):
+        self.files.append((src, dest))
+        self.outputs.add(os.path.abspath(dest))
+
+    def add_dir(self, src, dest):
+        """Copies the stat of |src| to |dest| once its files are copied."""
+        self.dirs.append((src, dest))
+        self.outputs.add(os.path.abspath(dest))
+
+    def symlink(self, src, linkto, dest):
+        self.outputs.add(os.path.abspath(dest))
+        if self.incremental and os.path.islink(dest) and \
+                os.readlink(dest) == linkto:
+            return
+        # The destination may be left from a previous run with another type.
+        _remove_path(dest)
+        os.symlink(linkto, dest)
+        shutil.copymode(src, dest, follow_symlinks=False)
+
+    def _copy(self, src, dest):
+        if self.incremental and build_utils.is_copy_up_to_date(
+                os.stat(src), dest):
+            return
+        # Don't write into a file which may be hardlinked to a source, nor
+        # into a directory or symlink left from a previous run.
+        _remove_path(dest)
+        build_utils.copy_file_data(src, dest, hardlink=self.hardlink)
+
+    def run(self, jobs=None):
+        jobs = jobs or os.cpu_count() or 1
+        if jobs > 1 and len(self.files) >= _PARALLEL_MIN_FILES:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                for _ in executor.map(lambda item: self._copy(*item),
+                                      self.files):
+                    pass
+        else:
+            for src, dest in self.files:
+                self._copy(src, dest)
+        for src, dest in self.dirs:
+            shutil.copystat(src, dest)
+        self.files = []
+        self.dirs = []
+
+    def remove_stale(self, dest):
+        """Deletes everything under |dest| which wasn't produced."""
+        keep = set()
+        for output in self.outputs:
+            while output not in keep:
+                keep.add(output)
+                output = os.path.dirname(output)
+        self._remove_stale(os.path.abspath(dest), keep)
+
+    def _remove_stale(self, dest, keep):
+        with os.scandir(dest) as itr:
+            items = list(itr)
+        for item in items:
+            path = os.path.join(dest, item.name)
+            is_dir = item.is_dir(follow_symlinks=False)
+            if path in keep:
+                if is_dir:
+                    self._remove_stale(path, keep)
+            elif is_dir:
+                shutil.rmtree(path)
+            else:
+                os.unlink(path)
+
+
 def copy_tree(src: str,
               dest: str,
               follow_all_symlinks=False,
-              follow_outside_symlinks=False):
+              follow_outside_symlinks=False,
+              plan: CopyPlan = None):
     """copy src/* to dest/
     I. If follow_outside_symlinks is true,
         1. If src item is a symlink, and points to some item inside src,
@@ -31,21 +126,37 @@ def copy_tree(src: str,
             to dest.
         2. Else copy src item to dest.
     follow_outside_symlinks is true when follow_all_symlinks is true.
+    Files are copied when the tree is walked, or by plan.run() if |plan| is
+    given.
     """
     with os.scandir(src) as itr:
         items = list(itr)
-    return _do_copy_tree(items,
-                         src,
-                         dest,
-                         follow_all_symlinks=follow_all_symlinks,
-                         follow_outside_symlinks=follow_outside_symlinks)
+    if plan is not None:
+        return _do_copy_tree(items,
+                             src,
+                             dest,
+                             follow_all_symlinks=follow_all_symlinks,
+                             follow_outside_symlinks=follow_outside_symlinks,
+                             plan=plan)
+    plan = CopyPlan()
+    _do_copy_tree(items,
+                  src,
+                  dest,
+                  follow_all_symlinks=follow_all_symlinks,
+                  follow_outside_symlinks=follow_outside_symlinks,
+                  plan=plan)
+    plan.run()
+    return dest
 
 
 def _do_copy_tree(items: list,
                   src: str,
                   dest: str,
                   follow_all_symlinks: bool = False,
-                  follow_outside_symlinks: bool = False) -> str:
+                  follow_outside_symlinks: bool = False,
+                  plan: CopyPlan = None) -> str:
+    if os.path.islink(dest) or not os.path.isdir(dest):
+        _remove_path(dest)
     os.makedirs(dest, exist_ok=True)
     for item in items:
         srcname = os.path.join(src, item.name)
@@ -58,8 +169,7 @@ def _do_copy_tree(items: list,
                 linkto = os.path.join(os.path.dirname(item), org_linkto)
 
             if not os.path.exists(linkto):
-                os.symlink(org_linkto, destname)
-                shutil.copymode(srcname, destname, follow_symlinks=False)
+                plan.symlink(srcname, org_linkto, destname)
                 continue
 
             if follow_all_symlinks:
@@ -67,38 +177,36 @@ def _do_copy_tree(items: list,
                     copy_tree(item,
                               destname,
                               follow_all_symlinks=follow_all_symlinks,
-                              follow_outside_symlinks=follow_outside_symlinks)
+                              follow_outside_symlinks=follow_outside_symlinks,
+                              plan=plan)
                 else:
-                    shutil.copy(item, destname)
-                    shutil.copymode(item, destname)
+                    plan.add_file(item, destname)
 
             elif follow_outside_symlinks:
                 if os.path.abspath(src) in os.path.abspath(
                         linkto) and not os.path.isabs(org_linkto):
-                    os.symlink(org_linkto, destname)
-                    shutil.copymode(srcname, destname, follow_symlinks=False)
+                    plan.symlink(srcname, org_linkto, destname)
                 else:
                     if item.is_dir():
                         copy_tree(
                             item,
                             destname,
                             follow_all_symlinks=follow_all_symlinks,
-                            follow_outside_symlinks=follow_outside_symlinks)
+                            follow_outside_symlinks=follow_outside_symlinks,
+                            plan=plan)
                     else:
-                        shutil.copy(item, destname)
-                        shutil.copymode(item, destname)
+                        plan.add_file(item, destname)
             else:
-                os.symlink(org_linkto, destname)
-                shutil.copymode(srcname, destname, follow_symlinks=False)
+                plan.symlink(srcname, org_linkto, destname)
         elif item.is_dir():
             copy_tree(item,
                       destname,
                       follow_all_symlinks=follow_all_symlinks,
-                      follow_outside_symlinks=follow_outside_symlinks)
+                      follow_outside_symlinks=follow_outside_symlinks,
+                      plan=plan)
         else:
-            shutil.copy(item, destname)
-            shutil.copymode(item, destname)
-    shutil.copystat(src, dest)
+            plan.add_file(item, destname)
+    plan.add_dir(src, dest)
     return dest
 
 
@@ -106,13 +214,15 @@ def copy_file(f: str,
               dest: str,
               deps: list,
               follow_all_symlinks: bool = False,
-              follow_outside_symlinks: bool = False):
+              follow_outside_symlinks: bool = False,
+              plan: CopyPlan = None):
     """Copy file or directory and update deps."""
     if os.path.isdir(f):
         copy_tree(f,
                   os.path.join(dest, os.path.basename(f)),
                   follow_all_symlinks=follow_all_symlinks,
-                  follow_outside_symlinks=follow_outside_symlinks)
+                  follow_outside_symlinks=follow_outside_symlinks,
+                  plan=plan)
         deps.extend(build_utils.get_all_files(f))
     else:
         if os.path.isfile(os.path.join(dest, os.path.basename(f))):
@@ -120,6 +230,16 @@ def copy_file(f: str,
 
         deps.append(f)
 
+        if plan is not None:
+            if os.path.isdir(dest):
+                dest = os.path.join(dest, os.path.basename(f))
+            if not plan.incremental and os.path.isfile(dest) and \
+                    filecmp.cmp(dest, f, shallow=False):
+                plan.outputs.add(os.path.abspath(dest))
+                return
+            plan.add_file(f, dest)
+            return
+
         if os.path.isfile(dest):
             if filecmp.cmp(dest, f, shallow=False):
                 return
@@ -131,7 +251,7 @@ def copy_file(f: str,
         shutil.copy(f, dest)
 
 
-def do_copy(options, deps: list):
+def do_copy(options, deps: list, plan: CopyPlan = None):
     """Copy files or directories given in options.files and update deps."""
     files = list(
         itertools.chain.from_iterable(
@@ -147,10 +267,11 @@ def do_copy(options, deps: list):
                   options.dest,
                   deps,
                   follow_all_symlinks=options.follow_all_symlinks,
-                  follow_outside_symlinks=options.follow_outside_symlinks)
+                  follow_outside_symlinks=options.follow_outside_symlinks,
+                  plan=plan)
 
 
-def do_renaming(options, deps: list):
+def do_renaming(options, deps: list, plan: CopyPlan = None):
     """Copy and rename files given in options.renaming_sources
     and update deps.
     """
@@ -172,7 +293,7 @@ def do_renaming(options, deps: list):
             print('renaming directory is not supported.')
             sys.exit(-1)
         else:
-            copy_file(src, os.path.join(options.dest, dest), deps)
+            copy_file(src, os.path.join(options.dest, dest), deps, plan=plan)
 
 
 def main(args):
@@ -212,22 +333,46 @@ def main(args):
                       action='append',
                       help='List of destination file name without path, the '
                       'number of elements must match rename-sources.')
+    parser.add_option(
+        '--incremental',
+        action='store_true',
+        help='Keep destination files which are up to date copies of their '
+        'source (same size, written after the last change of the source). '
+        'With --clear, stale files are removed after copying instead of '
+        'deleting the destination directory.')
+    parser.add_option(
+        '--hardlink',
+        action='store_true',
+        help='Hardlink files instead of copying them when possible. The '
+        'copies must never be modified in place.')
+    parser.add_option('--jobs',
+                      type='int',
+                      help='Number of threads copying files, default is the '
+                      'number of cpus.')
 
     options, _ = parser.parse_args(args)
     if options.follow_all_symlinks:
         options.follow_outside_symlinks = True
 
-    if options.clear and not options.ignore_stale:
+    clear = options.clear and not options.ignore_stale
+    if clear and not options.incremental:
         build_utils.delete_directory(options.dest)
+    if clear:
         build_utils.make_directory(options.dest)
 
     deps = []
+    plan = CopyPlan(incremental=options.incremental,
+                    hardlink=options.hardlink)
 
     if options.files:
-        do_copy(options, deps)
+        do_copy(options, deps, plan)
 
     if options.renaming_sources:
-        do_renaming(options, deps)
+        do_renaming(options, deps, plan)
+
+    plan.run(options.jobs)
+    if clear and options.incremental:
+        plan.remove_stale(options.dest)
 
     if options.depfile:
         build_utils.write_depfile(options.depfile,
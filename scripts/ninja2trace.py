@@ -17,6 +17,7 @@ import os
 import sys
 import json
 import gzip
+import heapq
 import shutil
 import argparse
 
@@ -106,18 +107,29 @@ class NinjaToTrace(object):
 
 
 class CountingTheTid(object):
+    """Pack actions sorted by start time into pseudo threads.
+
+    Busy tids sit in a heap keyed by their end time and released tids in a
+    second heap, so every action still gets the lowest tid that is free at
+    its start time, in O(log threads) instead of a linear scan.
+    """
+
     def __init__(self):
-        self.tids = []  # store the tid's end time
+        self.busy_tids = []  # heap of (end time, tid)
+        self.free_tids = []  # heap of released tids
+        self.tid_count = 0
 
     def counting_the_new_tid(self, storingdataline):
-        for i, tid in enumerate(self.tids):  
-            if tid <= storingdataline.start:  
-                self.tids[i] = storingdataline.end  
-                return i  # renew the endtime and return the current tid
-
-        # for the end time is newer than all tids so we need a new one
-        self.tids.append(storingdataline.end)
-        return len(self.tids) - 1  # the last index of the tids
+        while self.busy_tids and self.busy_tids[0][0] <= storingdataline.start:
+            heapq.heappush(self.free_tids, heapq.heappop(self.busy_tids)[1])
+        if self.free_tids:
+            tid = heapq.heappop(self.free_tids)
+        else:
+            # for the end time is newer than all tids so we need a new one
+            tid = self.tid_count
+            self.tid_count += 1
+        heapq.heappush(self.busy_tids, (storingdataline.end, tid))
+        return tid
 
 
 def main():
@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Critical path analysis of a ninja build.
+
+The build graph is read from build.ninja (following include and subninja
+statements) and joined with the action timings of .ninja_log. Assuming
+unlimited parallelism, every action gets its earliest finish time and its
+slack, i.e. how much it may be delayed without delaying the whole build.
+Actions without slack form the critical path: only speeding up those
+shortens the build.
+"""
+
+import os
+import sys
+import argparse
+from collections import deque
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.util.file_utils import write_json_file  # noqa: E402
+from scripts.util.parts_index import PartsIndex  # noqa: E402
+
+NINJA_LOG_SIGNATURE = "# ninja log v"
+
+
+class NinjaEdge(object):
+    def __init__(self, outputs, rule, inputs):
+        self.outputs = outputs
+        self.rule = rule
+        self.inputs = inputs
+        self.duration = 0
+        self.start = None
+        self.end = None
+
+
+def _split_ninja_line(line: str):
+    """Split a build line into paths and the ':', '|', '||', '|@' markers,
+    honouring the '$ ', '$:' and '$$' escapes."""
+    if '$' not in line:
+        return line.replace(':', ' : ', 1).split()
+    tokens = []
+    current = []
+    index = 0
+    while index < len(line):
+        char = line[index]
+        if char == '$' and index + 1 < len(line):
+            next_char = line[index + 1]
+            if next_char in ' :$':
+                current.append(next_char)
+            else:
+                current.append(char + next_char)
+            index += 2
+            continue
+        if char == ' ' or char == ':':
+            if current:
+                tokens.append(''.join(current))
+                current = []
+            if char == ':':
+                tokens.append(':')
+        else:
+            current.append(char)
+        index += 1
+    if current:
+        tokens.append(''.join(current))
+    return tokens
+
+
+def _parse_build_statement(line: str):
+    tokens = _split_ninja_line(line[len('build '):])
+    if ':' not in tokens:
+        return None
+    colon = tokens.index(':')
+    outputs = [token for token in tokens[:colon] if token != '|']
+    rule = tokens[colon + 1] if colon + 1 < len(tokens) else ''
+    inputs = []
+    for token in tokens[colon + 2:]:
+        if token == '|@':
+            break
+        if token not in ('|', '||'):
+            inputs.append(token)
+    return NinjaEdge(outputs, rule, inputs)
+
+
+def _read_ninja_statements(ninja_file: str):
+    with open(ninja_file, 'r', encoding='utf-8', errors='replace') as file:
+        statement = ''
+        for line in file:
+            line = line.rstrip('\n')
+            escapes = len(line) - len(line.rstrip('$'))
+            if escapes % 2 == 1:
+                statement += line[:-1]
+                continue
+            statement += line
+            if statement and not statement[0].isspace():
+                yield statement
+            statement = ''
+        if statement and not statement[0].isspace():
+            yield statement
+
+
+class NinjaGraph(object):
+    def __init__(self, build_dir: str):
+        self.build_dir = build_dir
+        self.edges = []
+        self.producer = {}
+
+    def load(self, ninja_file: str = 'build.ninja'):
+        pending = [ninja_file]
+        while pending:
+            current = os.path.join(self.build_dir, pending.pop())
+            if not os.path.exists(current):
+                print("ninja file: {} not exists".format(current))
+                continue
+            for statement in _read_ninja_statements(current):
+                if statement.startswith('build '):
+                    edge = _parse_build_statement(statement)
+                    if edge is None:
+                        continue
+                    for output in edge.outputs:
+                        self.producer[output] = len(self.edges)
+                    self.edges.append(edge)
+                elif statement.startswith(('subninja ', 'include ')):
+                    pending.append(statement.split(None, 1)[1].strip())
+        return self
+
+    def apply_ninja_log(self, ninja_log: str, ninja_start_time: int = 0):
+        """Attach the last recorded timing of every output to its edge."""
+        if not os.path.exists(ninja_log):
+            print("file: {} not exists".format(ninja_log))
+            return 0
+        timings = {}
+        with open(ninja_log, 'r') as file:
+            if not file.readline().startswith(NINJA_LOG_SIGNATURE):
+                print("unrecognized ninja log format")
+            for line in file:
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) != 5:
+                    continue
+                start, end, mtime, output, _ = fields
+                if ninja_start_time and int(mtime) <= ninja_start_time:
+                    continue
+                timings[output] = (int(start), int(end))
+
+        matched = 0
+        for edge in self.edges:
+            spans = [timings.get(output) for output in edge.outputs]
+            spans = [span for span in spans if span]
+            if not spans:
+                continue
+            edge.start = min(span[0] for span in spans)
+            edge.end = max(span[1] for span in spans)
+            edge.duration = edge.end - edge.start
+            matched += 1
+        return matched
+
+    def dependencies(self):
+        deps = []
+        for edge in self.edges:
+            deps.append({self.producer.get(path) for path in edge.inputs
+                         if path in self.producer})
+        return deps
+
+
+def compute_critical_path(graph: NinjaGraph):
+    """Return (build length, earliest finish, slack, critical path) in ms."""
+    deps = graph.dependencies()
+    users = [[] for _ in graph.edges]
+    pending = [len(edge_deps) for edge_deps in deps]
+    for index, edge_deps in enumerate(deps):
+        for dep in edge_deps:
+            users[dep].append(index)
+
+    order = []
+    ready = deque(index for index, count in enumerate(pending) if count == 0)
+    while ready:
+        index = ready.popleft()
+        order.append(index)
+        for user in users[index]:
+            pending[user] -= 1
+            if pending[user] == 0:
+                ready.append(user)
+    if len(order) != len(graph.edges):
+        print("warning: {} edges are part of a dependency cycle and ignored".format(
+            len(graph.edges) - len(order)))
+
+    finish = [0] * len(graph.edges)
+    for index in order:
+        earliest_start = max((finish[dep] for dep in deps[index]), default=0)
+        finish[index] = earliest_start + graph.edges[index].duration
+    build_length = max(finish, default=0)
+
+    latest_finish = [build_length] * len(graph.edges)
+    for index in reversed(order):
+        for user in users[index]:
+            latest_start = latest_finish[user] - graph.edges[user].duration
+            if latest_start < latest_finish[index]:
+                latest_finish[index] = latest_start
+    slack = [latest_finish[index] - finish[index] for index in range(len(finish))]
+
+    path = []
+    if order:
+        current = max(order, key=lambda index: finish[index])
+        while current is not None:
+            path.append(current)
+            current = max(deps[current], key=lambda dep: finish[dep], default=None)
+        path.reverse()
+    return build_length, finish, slack, path
+
+
+def _group_durations(entries: list, key: str):
+    groups = {}
+    for entry in entries:
+        name = entry.get(key) or 'unknown'
+        groups[name] = groups.get(name, 0) + entry.get('duration')
+    return [{'name': name, 'duration': duration} for name, duration in
+            sorted(groups.items(), key=lambda item: item[1], reverse=True)]
+
+
+def generate_report(graph: NinjaGraph, parts_index: PartsIndex, top: int):
+    build_length, finish, slack, path = compute_critical_path(graph)
+    executed = [index for index, edge in enumerate(graph.edges)
+                if edge.end is not None]
+    wall_time = 0
+    if executed:
+        wall_time = max(graph.edges[index].end for index in executed) - \
+            min(graph.edges[index].start for index in executed)
+
+    def _entry(index):
+        edge = graph.edges[index]
+        part, subsystem = parts_index.lookup(edge.outputs[0])
+        return {
+            'target': edge.outputs[0],
+            'rule': edge.rule,
+            'duration': edge.duration,
+            'earliest_finish': finish[index],
+            'slack': slack[index],
+            'part': part,
+            'subsystem': subsystem,
+        }
+
+    critical_path = [_entry(index) for index in path if graph.edges[index].duration]
+    # speeding up an action shortens the build by at most its own duration,
+    # and only while it stays on the critical path.
+    top_targets = sorted(critical_path, key=lambda entry: entry.get('duration'),
+                         reverse=True)[:top]
+    on_path = set(path)
+    near_critical = sorted(
+        (index for index in executed if index not in on_path),
+        key=lambda index: (slack[index], -graph.edges[index].duration))[:top]
+    return {
+        'build_length': build_length,
+        'wall_time': wall_time,
+        'executed_actions': len(executed),
+        'total_actions': len(graph.edges),
+        'critical_path': critical_path,
+        'top_targets': top_targets,
+        'near_critical_targets': [_entry(index) for index in near_critical],
+        'parts': _group_durations(critical_path, 'part'),
+        'subsystems': _group_durations(critical_path, 'subsystem'),
+    }
+
+
+def _print_report(report: dict):
+    print("critical path: {} ms over {} actions, ninja wall time: {} ms, "
+          "executed actions: {}/{}".format(
+              report.get('build_length'), len(report.get('critical_path')),
+              report.get('wall_time'), report.get('executed_actions'),
+              report.get('total_actions')))
+    print("top targets on the critical path:")
+    for entry in report.get('top_targets'):
+        print("  {:>8} ms  {}  [{}]".format(entry.get('duration'),
+                                             entry.get('target'),
+                                             entry.get('part') or '-'))
+    if any(item.get('name') != 'unknown' for item in report.get('parts')):
+        print("critical path by part:")
+        for item in report.get('parts')[:10]:
+            print("  {:>8} ms  {}".format(item.get('duration'), item.get('name')))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--build-dir', required=True, help='ninja build dir')
+    parser.add_argument('--ninja-file', default='build.ninja',
+                        help='root ninja file relative to build dir')
+    parser.add_argument('--ninja-log', help='path to ninja log')
+    parser.add_argument(
+        '--ninja-start-time', default='0',
+        help='only use actions whose outputs are newer than this epoch time '
+             'in nanoseconds')
+    parser.add_argument('--parts-info-dir',
+                        help='build_configs/parts_info dir used to group targets')
+    parser.add_argument('--top', type=int, default=20,
+                        help='number of targets listed in the report')
+    parser.add_argument('--report-file', help='path to json report file')
+    options = parser.parse_args()
+
+    graph = NinjaGraph(options.build_dir).load(options.ninja_file)
+    ninja_log = options.ninja_log or os.path.join(options.build_dir,
+                                                  '.ninja_log')
+    if not graph.apply_ninja_log(ninja_log,
+                                 int(float(options.ninja_start_time))):
+        print("no action of {} found in ninja log".format(options.ninja_file))
+        return 0
+
+    report = generate_report(graph, PartsIndex(options.parts_info_dir),
+                             options.top)
+    _print_report(report)
+    if options.report_file:
+        write_json_file(options.report_file, report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -15,8 +15,135 @@
 
 import os
 import sys
+import argparse
 import subprocess
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.util.parts_index import PartsIndex  # noqa: E402
+from scripts.util.file_utils import write_json_file  # noqa: E402
+
+HIT_DIRECT = 'direct_cache_hit'
+HIT_PREPROCESSED = 'preprocessed_cache_hit'
+MISS = 'cache_miss'
+UNCACHEABLE = 'uncacheable'
+RESULT_TYPES = [HIT_DIRECT, HIT_PREPROCESSED, MISS, UNCACHEABLE]
+
+
+def _new_counter():
+    return dict.fromkeys(RESULT_TYPES, 0)
+
+
+# Intermediate steps of a ccache 4.x run, the run ends with its own result.
+INTERMEDIATE_RESULTS = ['direct_cache_miss', 'preprocessed_cache_miss']
+
+
+def classify_ccache_run(results: list):
+    """Return the result of one ccache run from all its 'Result:' lines.
+
+    ccache 4.x logs several results per run, e.g. direct_cache_miss,
+    preprocessed_cache_hit and local_storage_hit. A hit wins over a miss,
+    and a miss over anything else, which makes the run uncacheable. Runs
+    with only storage or intermediate results are not counted.
+    """
+    relevant = [result for result in results
+                if 'storage' not in result and result not in INTERMEDIATE_RESULTS]
+    for result in (HIT_DIRECT, HIT_PREPROCESSED, MISS):
+        if result in relevant:
+            return result
+    return UNCACHEABLE if relevant else None
+
+
+def parse_ccache_log(ccache_log: str):
+    """Read the ccache log once and count the results of every object file.
+
+    Lines look like '[<time> <pid>] <message>' and concurrent ccache runs
+    interleave, so the object file and the results of each run are
+    gathered by pid until the run ends: a new run of the pid starts, or
+    the log ends.
+    """
+    objects = {}
+    runs = {}
+
+    def _finish_run(pid):
+        obj, results = runs.pop(pid, (b'', []))
+        result = classify_ccache_run(results)
+        if result is not None:
+            obj = obj.decode(errors='replace')
+            objects.setdefault(obj, _new_counter())[result] += 1
+
+    with open(ccache_log, 'rb') as log:
+        for line in log:
+            header_end = line.find(b'] ')
+            if header_end < 0:
+                continue
+            message = line[header_end + 2:]
+            pid = line[1:header_end].rpartition(b' ')[2]
+            if message.startswith(b'=== CCACHE '):
+                _finish_run(pid)
+            elif message.startswith(b'Object file: '):
+                if runs.get(pid, (b'', []))[1]:
+                    # A log without start lines, the results belong to the previous run.
+                    _finish_run(pid)
+                runs[pid] = (message[len(b'Object file: '):].strip(), runs.get(pid, (b'', []))[1])
+            elif message.startswith(b'Result: '):
+                result = message[len(b'Result: '):].strip().decode(errors='replace')
+                runs.setdefault(pid, (b'', []))[1].append(result)
+    for pid in list(runs):
+        _finish_run(pid)
+    return objects
+
+
+def _hit_rate(counter: dict):
+    total = sum(counter.values())
+    if total == 0:
+        return 0
+    return float(counter.get(HIT_DIRECT) + counter.get(HIT_PREPROCESSED)) / total
+
+
+def _total(objects: dict):
+    totals = _new_counter()
+    for counter in objects.values():
+        for result, count in counter.items():
+            totals[result] += count
+    return totals
+
+
+def _group(objects: dict, key_func):
+    groups = {}
+    for obj, counter in objects.items():
+        group = groups.setdefault(key_func(obj) or 'unknown', _new_counter())
+        for result, count in counter.items():
+            group[result] += count
+    for counter in groups.values():
+        counter['hit_rate'] = round(_hit_rate(counter), 4)
+    return groups
+
+
+def summary_ccache_log(objects: dict, parts_index: PartsIndex, top: int = 20, min_count: int = 10):
+    """Aggregate the object results by target, part and subsystem.
+
+    The target of an object is its output dir, obj/<source dir>/<label name>.
+    Parts with at least min_count compilations are ranked by hit rate to
+    find the ones that defeat ccache.
+    """
+    totals = _total(objects)
+    totals['hit_rate'] = round(_hit_rate(totals), 4)
+    owners = {obj: parts_index.lookup(obj) for obj in objects}
+    targets = _group(objects, os.path.dirname)
+    parts = _group(objects, lambda obj: owners.get(obj)[0])
+    subsystems = _group(objects, lambda obj: owners.get(obj)[1])
+    worst_parts = sorted(
+        (name for name, counter in parts.items()
+         if name != 'unknown' and sum(counter.get(result) for result in RESULT_TYPES) >= min_count),
+        key=lambda name: (parts.get(name).get('hit_rate'), -parts.get(name).get(MISS)))[:top]
+    return {
+        'total': totals,
+        'targets': targets,
+        'parts': parts,
+        'subsystems': subsystems,
+        'worst_parts': [dict(parts.get(name), name=name) for name in worst_parts],
+    }
+
 
 def summary_ccache_new(ccache_log: str):
     hit_dir_num = 0
@@ -24,22 +151,11 @@ def summary_ccache_new(ccache_log: str):
     mis_num = 0
     hit_rate = 0
     mis_rate = 0
-    hit_dir_str = "Result: direct_cache_hit"
-    hit_pre_str = "Result: preprocessed_cache_hit"
-    mis_str = "Result: cache_miss"
     if os.path.exists(ccache_log):
-        cmd = "grep -c \'{}\'  '{}'".format(hit_dir_str, ccache_log)
-        hit_dir_num = int(
-            subprocess.Popen(cmd, shell=True,
-                             stdout=subprocess.PIPE).communicate()[0])
-        cmd = "grep -c \'{}\'  '{}'".format(hit_pre_str, ccache_log)
-        hit_pre_num = int(
-            subprocess.Popen(cmd, shell=True,
-                             stdout=subprocess.PIPE).communicate()[0])
-        cmd = "grep -c \'{}\'  '{}'".format(mis_str, ccache_log)
-        mis_num = int(
-            subprocess.Popen(cmd, shell=True,
-                             stdout=subprocess.PIPE).communicate()[0])
+        totals = _total(parse_ccache_log(ccache_log))
+        hit_dir_num = totals.get(HIT_DIRECT)
+        hit_pre_num = totals.get(HIT_PREPROCESSED)
+        mis_num = totals.get(MISS)
     sum_ccache = hit_dir_num + hit_pre_num + mis_num
     if sum_ccache != 0:
         hit_rate = (float(hit_dir_num) +
@@ -69,11 +185,16 @@ def summary_ccache_size():
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Error, please input the ccache log file path.")
-        exit(-1)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('ccache_log', help='path to ccache log')
+    parser.add_argument('--parts-info-dir',
+                        help='build_configs/parts_info dir used to group objects')
+    parser.add_argument('--summary-file', help='path to json summary file')
+    parser.add_argument('--top', type=int, default=20,
+                        help='number of worst cached parts listed')
+    options = parser.parse_args()
 
-    ccache_log = sys.argv[1]
+    ccache_log = options.ccache_log
     hit_rate = 0
     miss_rate = 0
     hit_dir_num = 0
@@ -81,9 +202,19 @@ def main():
     miss_num = 0
     cache_size = ""
     ccache_version = ""
+    summary = None
     if os.path.exists(ccache_log):
-        hit_rate, miss_rate, hit_dir_num, hit_pre_num, miss_num = summary_ccache_new(
-            ccache_log)
+        summary = summary_ccache_log(parse_ccache_log(ccache_log),
+                                     PartsIndex(options.parts_info_dir),
+                                     options.top)
+        totals = summary.get('total')
+        hit_dir_num = totals.get(HIT_DIRECT)
+        hit_pre_num = totals.get(HIT_PREPROCESSED)
+        miss_num = totals.get(MISS)
+        sum_ccache = hit_dir_num + hit_pre_num + miss_num
+        if sum_ccache != 0:
+            hit_rate = float(hit_dir_num + hit_pre_num) / sum_ccache
+            miss_rate = float(miss_num) / sum_ccache
         cache_size, ccache_version = summary_ccache_size()
 
     print(f"--------------------------------------------\n" +
@@ -96,6 +227,14 @@ def main():
           "miss rate: %.2f%% " % (miss_rate * 100) + "\n" +
           "Cache size (GB): " + cache_size + "\n" +
           "---------------------------------------------")
+    if summary and summary.get('worst_parts'):
+        print("parts with the lowest hit rate:")
+        for part in summary.get('worst_parts'):
+            print("  {}: hit rate {:.2f}%, miss {}, uncacheable {}".format(
+                part.get('name'), part.get('hit_rate') * 100, part.get(MISS),
+                part.get(UNCACHEABLE)))
+    if summary and options.summary_file:
+        write_json_file(options.summary_file, summary)
 
 
 if __name__ == "__main__":
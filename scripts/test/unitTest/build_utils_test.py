@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import random
+import shutil
+import stat
+import tempfile
+import unittest
+import zipfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))))
+from scripts.util import build_utils  # noqa: E402
+
+
+def _zip_content(zip_path):
+    with zipfile.ZipFile(zip_path) as in_zip:
+        return [(info.filename, info.date_time, info.external_attr,
+                 info.compress_type, in_zip.read(info))
+                for info in in_zip.infolist()]
+
+
+class MergeZipsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        rand = random.Random(0)
+        self.inputs = []
+        for index in range(2):
+            path = os.path.join(self.work_dir, 'in{}.zip'.format(index))
+            with zipfile.ZipFile(path, 'w') as out_zip:
+                build_utils.add_to_zip_hermetic(
+                    out_zip, 'res/same.txt',
+                    data='zip{}'.format(index).encode() * 10, compress=True)
+                build_utils.add_to_zip_hermetic(
+                    out_zip, 'lib/random{}.bin'.format(index),
+                    data=bytes(rand.getrandbits(8) for _ in range(5000)),
+                    compress=False)
+                build_utils.add_to_zip_hermetic(
+                    out_zip, 'classes{}.dex'.format(index),
+                    data=b'dex' * 10000, compress=True)
+                out_zip.writestr('dir/', b'')
+            self.inputs.append(path)
+        return super().setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+        return super().tearDown()
+
+    def _merge(self, name, **kwargs):
+        output = os.path.join(self.work_dir, name)
+        build_utils.merge_zips(output, self.inputs, **kwargs)
+        return output
+
+    def test_raw_copy_matches_recompression(self):
+        raw = self._merge('raw.zip')
+        recompressed = self._merge('recompressed.zip', raw_copy=False)
+        self.assertEqual(_zip_content(raw), _zip_content(recompressed))
+        with zipfile.ZipFile(raw) as merged:
+            self.assertIsNone(merged.testzip())
+
+    def test_first_duplicate_wins(self):
+        with zipfile.ZipFile(self._merge('merged.zip')) as merged:
+            self.assertEqual(merged.read('res/same.txt'), b'zip0' * 10)
+            self.assertNotIn('dir/', merged.namelist())
+
+    def test_path_transform(self):
+        output = self._merge('renamed.zip',
+                             path_transform=lambda path: None if path.endswith('.dex')
+                             else 'assets/' + path)
+        with zipfile.ZipFile(output) as merged:
+            self.assertEqual(sorted(merged.namelist()), [
+                'assets/lib/random0.bin', 'assets/lib/random1.bin',
+                'assets/res/same.txt'])
+            self.assertIsNone(merged.testzip())
+
+
+class ZipDirTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.work_dir, 'input')
+        rand = random.Random(0)
+        for index in range(40):
+            path = os.path.join(self.input_dir, 'dir{}'.format(index % 3),
+                                'file{}.txt'.format(index))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(bytes(rand.getrandbits(4) for _ in range(index * 500)))
+            if index % 5 == 0:
+                os.chmod(path, 0o755)
+        os.symlink('file0.txt', os.path.join(self.input_dir, 'dir0', 'link.txt'))
+        return super().setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+        return super().tearDown()
+
+    def _zip_dir(self, name, jobs):
+        output = os.path.join(self.work_dir, name)
+        build_utils.zip_dir(output, self.input_dir,
+                            compress_fn=lambda path: not path.endswith('9.txt'),
+                            jobs=jobs)
+        with open(output, 'rb') as f:
+            return f.read()
+
+    def test_parallel_output_is_identical(self):
+        self.assertEqual(self._zip_dir('serial.zip', 1),
+                         self._zip_dir('parallel.zip', 4))
+
+    def test_entries(self):
+        self._zip_dir('parallel.zip', 4)
+        with zipfile.ZipFile(os.path.join(self.work_dir, 'parallel.zip')) as out_zip:
+            self.assertIsNone(out_zip.testzip())
+            names = out_zip.namelist()
+            self.assertEqual(names, sorted(names))
+            self.assertEqual(out_zip.read('dir0/link.txt'), b'file0.txt')
+            info = out_zip.getinfo('dir1/file10.txt')
+            self.assertEqual(info.date_time, build_utils.HERMETIC_TIMESTAMP)
+            self.assertEqual(info.external_attr >> 16 & 0o777, 0o755)
+            self.assertEqual(out_zip.getinfo('dir0/file9.txt').compress_type,
+                             zipfile.ZIP_STORED)
+
+
+class ExtractAllTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.output_dir = os.path.join(self.work_dir, 'out')
+        return super().setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+        return super().tearDown()
+
+    def _make_zip(self, members):
+        zip_path = os.path.join(self.work_dir, 'input.zip')
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as out_zip:
+            for name, data, is_symlink in members:
+                info = zipfile.ZipInfo(name)
+                if is_symlink:
+                    info.external_attr = (stat.S_IFLNK | 0o777) << 16
+                out_zip.writestr(info, data)
+        return zip_path
+
+    def test_extract(self):
+        zip_path = self._make_zip([
+            ('a/b.txt', b'b' * 100000, False),
+            ('a/link.txt', 'b.txt', True),
+            ('empty/', b'', False),
+            ('c.txt', b'c', False),
+        ])
+        extracted = build_utils.extract_all(zip_path, self.output_dir, jobs=2)
+        self.assertEqual(sorted(os.path.relpath(path, self.output_dir) for path in extracted),
+                         ['a/b.txt', 'a/link.txt', 'c.txt'])
+        with open(os.path.join(self.output_dir, 'a', 'link.txt'), 'rb') as f:
+            self.assertEqual(f.read(), b'b' * 100000)
+        self.assertTrue(os.path.isdir(os.path.join(self.output_dir, 'empty')))
+
+    def test_no_clobber(self):
+        zip_path = self._make_zip([('a.txt', b'1', False)])
+        build_utils.extract_all(zip_path, self.output_dir)
+        with self.assertRaises(Exception):
+            build_utils.extract_all(zip_path, self.output_dir)
+        build_utils.extract_all(zip_path, self.output_dir, no_clobber=False)
+
+    def _assert_rejected(self, members):
+        zip_path = self._make_zip(members)
+        with self.assertRaises(Exception):
+            build_utils.extract_all(zip_path, self.output_dir, no_clobber=False)
+        self.assertEqual(sorted(os.listdir(self.work_dir)), ['input.zip', 'out'])
+
+    def test_parent_path_is_rejected(self):
+        self._assert_rejected([('../escaped.txt', b'evil', False)])
+
+    def test_nested_parent_path_is_rejected(self):
+        self._assert_rejected([('a/../../escaped.txt', b'evil', False)])
+
+    def test_parent_symlink_is_rejected(self):
+        self._assert_rejected([('../escaped', '/etc/passwd', True)])
+
+    def test_parent_directory_is_rejected(self):
+        self._assert_rejected([('../escaped/', b'', False)])
+
+    def test_write_through_symlink_is_rejected(self):
+        os.makedirs(self.output_dir)
+        os.symlink(self.work_dir, os.path.join(self.output_dir, 'link'))
+        self._assert_rejected([('link/escaped.txt', b'evil', False)])
+        self._assert_rejected([('link/escaped', '/etc/passwd', True)])
+
+
+if __name__ == '__main__':
+    unittest.main()
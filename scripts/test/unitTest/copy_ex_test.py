@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+import copy_ex  # noqa: E402
+
+
+class IncrementalCopyTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.src = os.path.join(self.tmp_dir, 'src')
+        self.out = os.path.join(self.tmp_dir, 'out')
+        os.makedirs(self.src)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _write(self, name, data):
+        path = os.path.join(self.src, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            file.write(data)
+
+    def _replace(self, name):
+        path = os.path.join(self.src, name)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.unlink(path)
+        return path
+
+    def _copy(self):
+        copy_ex.main(['--dest', self.out, '--files', self.src, '--clear',
+                      '--incremental'])
+
+    def _dest(self, name):
+        return os.path.join(self.out, 'src', name)
+
+    def test_keeps_and_removes_files(self):
+        self._write('a', 'a')
+        self._write('b', 'b')
+        self._copy()
+        os.unlink(os.path.join(self.src, 'b'))
+        self._write('a', 'new a')
+        self._copy()
+        with open(self._dest('a')) as file:
+            self.assertEqual(file.read(), 'new a')
+        self.assertFalse(os.path.lexists(self._dest('b')))
+
+    def test_file_replaced_by_symlink(self):
+        self._write('a', 'a')
+        self._write('b', 'b')
+        self._copy()
+        os.symlink('b', self._replace('a'))
+        self._copy()
+        self.assertTrue(os.path.islink(self._dest('a')))
+        self.assertEqual(os.readlink(self._dest('a')), 'b')
+
+    def test_file_replaced_by_dir(self):
+        self._write('a', 'a')
+        self._copy()
+        self._replace('a')
+        self._write('a/c', 'c')
+        self._copy()
+        with open(self._dest('a/c')) as file:
+            self.assertEqual(file.read(), 'c')
+
+    def test_dir_replaced_by_file(self):
+        self._write('a/c', 'c')
+        self._copy()
+        self._replace('a')
+        self._write('a', 'a')
+        self._copy()
+        self.assertTrue(os.path.isfile(self._dest('a')))
+        with open(self._dest('a')) as file:
+            self.assertEqual(file.read(), 'a')
+
+    def test_symlink_replaced_by_dir(self):
+        self._write('b/c', 'c')
+        os.symlink('b', os.path.join(self.src, 'a'))
+        self._copy()
+        self._replace('a')
+        self._write('a/d', 'd')
+        self._copy()
+        self.assertFalse(os.path.islink(self._dest('a')))
+        self.assertEqual(os.listdir(self._dest('a')), ['d'])
+        self.assertEqual(os.listdir(self._dest('b')), ['c'])
+
+
+if __name__ == '__main__':
+    unittest.main()
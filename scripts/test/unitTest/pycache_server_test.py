@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))))
+from scripts.util import pycache  # noqa: E402
+from scripts.util import pycache_server  # noqa: E402
+
+
+class ClosingRequestHandler(pycache_server.PycacheServerRequestHandler):
+    """Drops the connection after every response without telling the
+    client, like a server closing idle keep-alive connections."""
+
+    def handle_one_request(self):
+        super().handle_one_request()
+        self.close_connection = True
+
+
+class PycacheServerTest(unittest.TestCase):
+
+    def _start_server(self, handler):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        server.root = self.root
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return pycache.create_remote_storage(
+            'http://127.0.0.1:{}'.format(server.server_address[1]))
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        return super().setUp()
+
+    def test_round_trip(self):
+        remote = self._start_server(pycache_server.PycacheServerRequestHandler)
+        self.assertIsNone(remote.get('cas', 'abcd'))
+        remote.put('cas', 'abcd', b'blob')
+        self.assertEqual(remote.get('cas', 'abcd'), b'blob')
+        self.assertEqual(remote.exists('cas', ['abcd', 'ef01']), {'abcd'})
+        self.assertEqual(remote.exists('entry', ['abcd']), set())
+
+    def test_file_round_trip(self):
+        remote = self._start_server(pycache_server.PycacheServerRequestHandler)
+        src = os.path.join(self.root, 'src')
+        dest = os.path.join(self.root, 'dest')
+        with open(src, 'wb') as f:
+            f.write(os.urandom(3 * 2**20))
+        remote.put_file('manifest', '0123', src)
+        remote.get_file('manifest', '0123', dest)
+        with open(src, 'rb') as f1, open(dest, 'rb') as f2:
+            self.assertEqual(f1.read(), f2.read())
+
+    def test_invalid_key(self):
+        remote = self._start_server(pycache_server.PycacheServerRequestHandler)
+        with self.assertRaises(pycache.client.HTTPException):
+            remote.put('cas', '../x', b'blob')
+
+    def test_connection_reused(self):
+        remote = self._start_server(pycache_server.PycacheServerRequestHandler)
+        remote.put('cas', 'abcd', b'blob')
+        conn = remote.pool.idle.get_nowait()
+        remote.pool.idle.put_nowait(conn)
+        self.assertEqual(remote.get('cas', 'abcd'), b'blob')
+        self.assertIs(remote.pool.idle.get_nowait(), conn)
+
+    def test_retry_on_stale_connection(self):
+        remote = self._start_server(ClosingRequestHandler)
+        remote.put('cas', 'abcd', b'blob')
+        stale = remote.pool.idle.get_nowait()
+        remote.pool.idle.put_nowait(stale)
+        # The idle connection was closed by the server, the request is
+        # sent again on a new one.
+        self.assertEqual(remote.get('cas', 'abcd'), b'blob')
+        self.assertEqual(remote.exists('cas', ['abcd']), {'abcd'})
+        self.assertIsNot(remote.pool.idle.get_nowait(), stale)
+
+    def test_no_retry_of_file_body(self):
+        remote = self._start_server(ClosingRequestHandler)
+        src = os.path.join(self.root, 'src')
+        with open(src, 'wb') as f:
+            f.write(b'blob')
+        remote.put('cas', 'abcd', b'blob')
+        # A file body can't be sent twice, the error is raised.
+        with self.assertRaises((OSError, pycache.client.HTTPException)):
+            remote.put_file('cas', 'ef01', src)
+
+
+if __name__ == '__main__':
+    unittest.main()
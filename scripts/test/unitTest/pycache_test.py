@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))))
+from scripts.util import pycache  # noqa: E402
+
+
+def _write(path, data, mode=0o644):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(data)
+    os.chmod(path, mode)
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+class EvictingStorage(pycache.Storage):
+    """Storage whose blobs are evicted right after load_entry, like by a
+    concurrent action."""
+
+    def load_entry(self, cache_artifact):
+        entry = super().load_entry(cache_artifact)
+        if entry:
+            self.remove_blobs([digest for _, digest, _ in entry.get('files')][-1:])
+        return entry
+
+
+class StorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.storage = pycache.Storage(os.path.join(self.work_dir, 'cache'))
+        self.artifact = os.path.join(self.work_dir, 'cache', 'ab', 'cdef')
+        return super().setUp()
+
+    def tearDown(self):
+        if self.storage._index is not None:
+            self.storage.index.conn.close()
+        for root, dirs, _ in os.walk(self.work_dir):
+            for name in dirs:
+                os.chmod(os.path.join(root, name), 0o755)
+        shutil.rmtree(self.work_dir)
+        return super().tearDown()
+
+    def test_file_round_trip(self):
+        obj = os.path.join(self.work_dir, 'out', 'lib.so')
+        _write(obj, 'binary', 0o755)
+        self.storage.add_object(self.artifact, obj)
+        os.unlink(obj)
+        self.assertEqual(self.storage.retrieve_object(self.artifact, obj), 1)
+        self.assertEqual(_read(obj), 'binary')
+        self.assertEqual(os.stat(obj).st_mode & 0o777, 0o755)
+
+    def test_retrieved_file_is_a_private_copy(self):
+        obj = os.path.join(self.work_dir, 'out', 'a.txt')
+        _write(obj, 'data')
+        self.storage.add_object(self.artifact, obj)
+        os.unlink(obj)
+        self.storage.retrieve_object(self.artifact, obj)
+        self.assertEqual(os.stat(obj).st_nlink, 1)
+        # Writing the output in place doesn't modify the cache.
+        _write(obj, 'changed')
+        os.unlink(obj)
+        self.storage.retrieve_object(self.artifact, obj)
+        self.assertEqual(_read(obj), 'data')
+
+    def test_hardlink_is_opt_in(self):
+        obj = os.path.join(self.work_dir, 'out', 'a.txt')
+        _write(obj, 'data')
+        self.storage.add_object(self.artifact, obj)
+        os.unlink(obj)
+        storage = pycache.Storage(os.path.join(self.work_dir, 'cache'), hardlink=True)
+        try:
+            self.assertEqual(storage.retrieve_object(self.artifact, obj), 1)
+        finally:
+            if storage._index is not None:
+                storage.index.conn.close()
+        self.assertEqual(os.stat(obj).st_nlink, 2)
+
+    def test_directory_round_trip_deduplicates(self):
+        out_dir = os.path.join(self.work_dir, 'out', 'gen')
+        _write(os.path.join(out_dir, 'a.txt'), 'same')
+        _write(os.path.join(out_dir, 'sub', 'b.txt'), 'same')
+        os.makedirs(os.path.join(out_dir, 'empty'))
+        self.storage.add_object(self.artifact, out_dir)
+        self.assertEqual(self.storage.index.statistics().get('stored_blobs'), 1)
+        self.assertEqual(self.storage.index.statistics().get('deduplicated_bytes'), 4)
+        shutil.rmtree(out_dir)
+        self.assertEqual(self.storage.retrieve_object(self.artifact, out_dir), 1)
+        self.assertEqual(_read(os.path.join(out_dir, 'sub', 'b.txt')), 'same')
+        self.assertTrue(os.path.isdir(os.path.join(out_dir, 'empty')))
+
+    def test_missing_blob_is_a_miss(self):
+        obj = os.path.join(self.work_dir, 'out', 'a.txt')
+        _write(obj, 'data')
+        self.storage.add_object(self.artifact, obj)
+        os.unlink(obj)
+        digest = self.storage.load_entry(self.artifact).get('files')[0][1]
+        self.storage.remove_blobs([digest])
+        self.assertEqual(self.storage.retrieve_object(self.artifact, obj), 0)
+        self.assertFalse(os.path.exists(obj))
+
+    def test_blob_evicted_during_retrieve(self):
+        out_dir = os.path.join(self.work_dir, 'out', 'gen')
+        _write(os.path.join(out_dir, 'a.txt'), 'a')
+        _write(os.path.join(out_dir, 'b.txt'), 'b')
+        self.storage.add_object(self.artifact, out_dir)
+        shutil.rmtree(out_dir)
+        storage = EvictingStorage(os.path.join(self.work_dir, 'cache'))
+        try:
+            self.assertEqual(storage.retrieve_object(self.artifact, out_dir), 0)
+        finally:
+            if storage._index is not None:
+                storage.index.conn.close()
+        # No half-populated output is left behind.
+        self.assertFalse(os.path.exists(out_dir))
+
+    def test_evict_least_recently_used(self):
+        index = self.storage.index
+        index.add_blob('11', 100)
+        index.add_blob('22', 100)
+        index.touch(['11'])
+        self.assertEqual(index.evict(150), ['22'])
+        self.assertEqual(index.total_size(), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
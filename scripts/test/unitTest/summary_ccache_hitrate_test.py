@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))))
+from scripts import summary_ccache_hitrate  # noqa: E402
+
+# Interleaved runs of ccache 4.8: a miss of pid 1001, a preprocessed hit of
+# pid 1002, a direct hit and an uncacheable link of pid 1001.
+CCACHE_4_LOG = '''\
+[2024-05-10T10:00:00.000001 1001] === CCACHE 4.8.3 STARTED =========================================
+[2024-05-10T10:00:00.000002 1001] Command line: /usr/bin/ccache clang -c ../../base/a.cpp -o obj/base/a/a.o
+[2024-05-10T10:00:00.000003 1002] === CCACHE 4.8.3 STARTED =========================================
+[2024-05-10T10:00:00.000004 1001] Object file: obj/base/a/a.o
+[2024-05-10T10:00:00.000005 1002] Object file: obj/base/b/b.o
+[2024-05-10T10:00:00.000006 1001] Result: direct_cache_miss
+[2024-05-10T10:00:00.000007 1002] Result: direct_cache_miss
+[2024-05-10T10:00:00.000008 1001] Result: local_storage_miss
+[2024-05-10T10:00:00.000009 1002] Result: local_storage_hit
+[2024-05-10T10:00:00.000010 1002] Result: local_storage_read_hit
+[2024-05-10T10:00:00.000011 1002] Result: preprocessed_cache_hit
+[2024-05-10T10:00:00.000012 1001] Result: preprocessed_cache_miss
+[2024-05-10T10:00:00.000013 1001] Result: cache_miss
+[2024-05-10T10:00:00.000014 1001] Result: local_storage_write
+[2024-05-10T10:00:01.000001 1001] === CCACHE 4.8.3 STARTED =========================================
+[2024-05-10T10:00:01.000002 1001] Object file: obj/base/c/c.o
+[2024-05-10T10:00:01.000003 1001] Result: direct_cache_hit
+[2024-05-10T10:00:01.000004 1001] Result: local_storage_hit
+[2024-05-10T10:00:01.000005 1001] Result: local_storage_read_hit
+[2024-05-10T10:00:02.000001 1001] === CCACHE 4.8.3 STARTED =========================================
+[2024-05-10T10:00:02.000002 1001] Object file: libfoo.so
+[2024-05-10T10:00:02.000003 1001] Result: called_for_link
+'''
+
+
+class SummaryCcacheHitrateTest(unittest.TestCase):
+
+    def setUp(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.log', delete=False) as log:
+            log.write(CCACHE_4_LOG)
+        self.log = log.name
+        return super().setUp()
+
+    def tearDown(self):
+        os.unlink(self.log)
+        return super().tearDown()
+
+    def test_parse_ccache_4_log(self):
+        objects = summary_ccache_hitrate.parse_ccache_log(self.log)
+        results = {obj: [result for result, count in counter.items() if count]
+                   for obj, counter in objects.items()}
+        self.assertEqual(results, {
+            'obj/base/a/a.o': ['cache_miss'],
+            'obj/base/b/b.o': ['preprocessed_cache_hit'],
+            'obj/base/c/c.o': ['direct_cache_hit'],
+            'libfoo.so': ['uncacheable'],
+        })
+
+    def test_summary_ccache_new(self):
+        hit_rate, miss_rate, hit_dir, hit_pre, miss = \
+            summary_ccache_hitrate.summary_ccache_new(self.log)
+        self.assertEqual((hit_dir, hit_pre, miss), (1, 1, 1))
+        self.assertAlmostEqual(hit_rate, 2 / 3)
+        self.assertAlmostEqual(miss_rate, 1 / 3)
+
+    def test_classify_ccache_run(self):
+        classify = summary_ccache_hitrate.classify_ccache_run
+        self.assertEqual(classify(['direct_cache_miss', 'preprocessed_cache_hit']),
+                         'preprocessed_cache_hit')
+        self.assertEqual(classify(['local_storage_write']), None)
+        self.assertEqual(classify(['unsupported_compiler_option']), 'uncacheable')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,16 +11,25 @@ from distutils import extension
 import filecmp
 import fnmatch
 import json
+import mmap
 import os
 import pipes
 import re
 import shutil
 import stat
+import struct
 import subprocess
 import sys
 import tempfile
 import zipfile
+import zlib
 import optparse
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 # Any new non-system import must be added to:
 
@@ -38,6 +47,10 @@ DIR_SOURCE_ROOT = os.environ.get(
         os.path.join(os.path.dirname(__file__), os.pardir, os.pardir,
                      os.pardir, os.pardir)))
 
+# ioctl which makes a file share the extents of another one (copy on
+# write), supported by btrfs and xfs.
+_FICLONE = 0x40049409
+
 HERMETIC_TIMESTAMP = (2001, 1, 1, 0, 0, 0)
 _HERMETIC_FILE_ATTR = (0o644 << 16)
 
@@ -286,6 +299,12 @@ def is_time_stale(output, inputs):
     return False
 
 
+# Offsets of the name and extra field lengths in a zip local file header.
+_FH_FILENAME_LENGTH = 10
+_FH_EXTRA_FIELD_LENGTH = 11
+_ZIP_FLAG_ENCRYPTED = 0x1
+
+
 def _check_zip_path(name):
     if os.path.normpath(name) != name:
         raise Exception('Non-canonical zip path: %s' % name)
@@ -293,6 +312,14 @@ def _check_zip_path(name):
         raise Exception('Absolute zip path: %s' % name)
 
 
+def _check_extract_path(root, output_path):
+    # Catches '..' members and paths escaping |root| through symlinks,
+    # |root| is a real path.
+    real_path = os.path.realpath(output_path)
+    if real_path != root and not real_path.startswith(root + os.sep):
+        raise Exception('Extracted path outside of %s: %s' % (root, output_path))
+
+
 def _is_symlink(zip_file, name):
     zi = zip_file.getinfo(name)
 
@@ -301,11 +328,79 @@ def _is_symlink(zip_file, name):
     return stat.S_ISLNK(zi.external_attr >> 16)
 
 
+def _zip_entry_data_offset(buf, info):
+    header = struct.unpack_from(zipfile.structFileHeader, buf,
+                                info.header_offset)
+    return info.header_offset + zipfile.sizeFileHeader + \
+        header[_FH_FILENAME_LENGTH] + header[_FH_EXTRA_FIELD_LENGTH]
+
+
+def _iter_zip_entry_mmap(buf, info):
+    """Yields the uncompressed data of |info| read from the mapped zip."""
+    offset = _zip_entry_data_offset(buf, info)
+    data = memoryview(buf)[offset:offset + info.compress_size]
+    crc = 0
+    try:
+        if info.compress_type == zipfile.ZIP_STORED:
+            # Stored entries are written straight from the mapping.
+            crc = zlib.crc32(data)
+            yield data
+        else:
+            decompressor = zlib.decompressobj(-15)
+            for start in range(0, len(data), 1 << 20):
+                chunk = decompressor.decompress(data[start:start + (1 << 20)])
+                crc = zlib.crc32(chunk, crc)
+                yield chunk
+            chunk = decompressor.flush()
+            crc = zlib.crc32(chunk, crc)
+            yield chunk
+    finally:
+        data.release()
+    if crc != info.CRC:
+        raise zipfile.BadZipFile('Bad CRC-32 for file %r' % info.filename)
+
+
+def _extract_zip_entries(z, buf, entries):
+    for info, dest in entries:
+        if _is_symlink(z, info.filename):
+            os.symlink(z.read(info), dest)
+        elif not info.flag_bits & _ZIP_FLAG_ENCRYPTED and \
+                info.compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            with open(dest, 'wb') as f:
+                for chunk in _iter_zip_entry_mmap(buf, info):
+                    f.write(chunk)
+        else:
+            with z.open(info) as src, open(dest, 'wb') as f:
+                shutil.copyfileobj(src, f, 1 << 20)
+
+
+def _partition_zip_entries(entries, jobs):
+    """Splits entries into contiguous batches of similar compressed size,
+    a few per job so that workers stay busy until the end."""
+    total_size = sum(info.compress_size for info, _ in entries)
+    batch_size = max(total_size // (jobs * 4), 1)
+    batches = [[]]
+    size = 0
+    for entry in entries:
+        if batches[-1] and (size >= batch_size or len(batches[-1]) >= 1024):
+            batches.append([])
+            size = 0
+        batches[-1].append(entry)
+        size += entry[0].compress_size
+    return batches
+
+
 def extract_all(zip_path,
                 path=None,
                 no_clobber=True,
                 pattern=None,
-                predicate=None):
+                predicate=None,
+                jobs=None):
+    """Extracts |zip_path| to |path|, returns the extracted paths.
+
+    The archive is memory-mapped and the members are extracted by |jobs|
+    threads (default from $ZIP_JOBS or the number of cpus).
+    """
     if path is None:
         path = os.getcwd()
     elif not os.path.exists(path):
@@ -315,9 +410,14 @@ def extract_all(zip_path,
         raise Exception('Invalid zip file: %s' % zip_path)
 
     extracted = []
+    root = os.path.realpath(path)
+    # Last member of every destination, like extracting them in order.
+    entries = {}
     with zipfile.ZipFile(zip_path) as z:
-        for name in z.namelist():
+        for info in z.infolist():
+            name = info.filename
             if name.endswith('/'):
+                _check_extract_path(root, os.path.join(path, name))
                 make_directory(os.path.join(path, name))
                 continue
             if pattern is not None:
@@ -326,39 +426,51 @@ def extract_all(zip_path,
             if predicate and not predicate(name):
                 continue
             _check_zip_path(name)
+            output_path = os.path.join(path, name)
+            # A symlink member may point anywhere, but neither it nor a
+            # file may be written through a symlink leaving |path|.
+            if _is_symlink(z, name):
+                _check_extract_path(root, os.path.dirname(output_path))
+            else:
+                _check_extract_path(root, output_path)
             if no_clobber:
-                output_path = os.path.join(path, name)
-                if os.path.exists(output_path):
+                if os.path.exists(output_path) or output_path in entries:
                     raise Exception('Path already exists from zip: %s %s %s' %
                                     (zip_path, name, output_path))
-            if _is_symlink(z, name):
-                dest = os.path.join(path, name)
-                make_directory(os.path.dirname(dest))
-                os.symlink(z.read(name), dest)
-                extracted.append(dest)
-            else:
-                z.extract(name, path)
-                extracted.append(os.path.join(path, name))
+            entries.pop(output_path, None)
+            entries[output_path] = info
+            extracted.append(output_path)
+        if not entries:
+            return extracted
+
+        for dest in {os.path.dirname(dest) for dest in entries}:
+            make_directory(dest)
+        entries = [(info, dest) for dest, info in entries.items()]
+        jobs = min(jobs or _zip_jobs(), len(entries))
+        with open(zip_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                if jobs <= 1:
+                    _extract_zip_entries(z, buf, entries)
+                    return extracted
+                with ThreadPoolExecutor(max_workers=jobs) as executor:
+                    futures = [
+                        executor.submit(_extract_zip_entries, z, buf, batch)
+                        for batch in _partition_zip_entries(entries, jobs)
+                    ]
+                    for future in futures:
+                        future.result()
 
     return extracted
 
 
-def add_to_zip_hermetic(zip_file,
+def _hermetic_zip_entry(zip_file,
                         zip_path,
                         src_path=None,
                         data=None,
                         compress=None,
                         compress_level=6):
-    """Adds a file to the given ZipFile with a hard-coded modified time.
-
-    Args:
-      zip_file: ZipFile instance to add the file to.
-      zip_path: Destination path within the zip file.
-      src_path: Path of the source file. Mutually exclusive with |data|.
-      data: File data as a string.
-      compress: Whether to enable compression. Default is taken from ZipFile
-          constructor.
-    """
+    """Returns the ZipInfo, data, compress type and compress level which
+    add_to_zip_hermetic passes to ZipFile.writestr."""
     assert (src_path is None) != (data is None), (
         '|src_path| and |data| are mutually exclusive.')
     _check_zip_path(zip_path)
@@ -368,8 +480,7 @@ def add_to_zip_hermetic(zip_file,
     if src_path and os.path.islink(src_path):
         zipinfo.filename = zip_path
         zipinfo.external_attr |= stat.S_IFLNK << 16  # mark as a symlink
-        zip_file.writestr(zipinfo, os.readlink(src_path))
-        return
+        return zipinfo, os.readlink(src_path), None, None
 
     # we want to use _HERMETIC_FILE_ATTR, so manually set
     # the few attr bits we care about.
@@ -395,14 +506,101 @@ def add_to_zip_hermetic(zip_file,
         compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
     if os.getenv("ZIP_COMPRESS_LEVEL"):
         compress_level = int(os.getenv("ZIP_COMPRESS_LEVEL"))
+    return zipinfo, data, compress_type, compress_level
+
+
+def add_to_zip_hermetic(zip_file,
+                        zip_path,
+                        src_path=None,
+                        data=None,
+                        compress=None,
+                        compress_level=6):
+    """Adds a file to the given ZipFile with a hard-coded modified time.
+
+    Args:
+      zip_file: ZipFile instance to add the file to.
+      zip_path: Destination path within the zip file.
+      src_path: Path of the source file. Mutually exclusive with |data|.
+      data: File data as a string.
+      compress: Whether to enable compression. Default is taken from ZipFile
+          constructor.
+    """
+    zipinfo, data, compress_type, compress_level = _hermetic_zip_entry(
+        zip_file, zip_path, src_path, data, compress, compress_level)
     zip_file.writestr(zipinfo, data, compress_type, compress_level)
 
 
+def _compress_zip_entry(zip_file, zip_path, src_path, compress):
+    """Does what ZipFile.writestr does for add_to_zip_hermetic, except for
+    the writing, returns the ZipInfo and the compressed data."""
+    zipinfo, data, compress_type, compress_level = _hermetic_zip_entry(
+        zip_file, zip_path, src_path=src_path, compress=compress)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    if compress_type is not None:
+        zipinfo.compress_type = compress_type
+    zipinfo.file_size = len(data)
+    zipinfo.CRC = zlib.crc32(data)
+    if zipinfo.compress_type == zipfile.ZIP_DEFLATED:
+        if compress_level is None:
+            compress_level = zlib.Z_DEFAULT_COMPRESSION
+        # Same parameters as zipfile, so the output is identical.
+        compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15)
+        data = compressor.compress(data) + compressor.flush()
+    zipinfo.compress_size = len(data)
+    return zipinfo, data
+
+
+def _zip_jobs():
+    if os.getenv("ZIP_JOBS"):
+        return int(os.getenv("ZIP_JOBS"))
+    return os.cpu_count() or 1
+
+
+def add_files_to_zip_hermetic(zip_file, inputs, jobs=None):
+    """Adds files to the given ZipFile like add_to_zip_hermetic, in order.
+
+    Files are read and compressed in a thread pool (zlib releases the GIL),
+    and the output is identical to adding them one by one.
+
+    Args:
+      zip_file: ZipFile instance to add the files to.
+      inputs: A list of (zip_path, src_path, compress) tuples.
+      jobs: Number of threads. Default is taken from $ZIP_JOBS or the number
+          of cpus.
+    """
+    jobs = jobs or _zip_jobs()
+    parallel = jobs > 1 and len(inputs) > 1 and getattr(
+        zip_file, '_seekable', False) and zip_file.compression in (
+            zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+    if not parallel:
+        for zip_path, src_path, compress in inputs:
+            add_to_zip_hermetic(zip_file,
+                                zip_path,
+                                src_path=src_path,
+                                compress=compress)
+        return
+
+    # Limit the compressed entries waiting to be written.
+    window = jobs * 4
+    pending = collections.deque()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for zip_path, src_path, compress in inputs:
+            if len(pending) >= window:
+                _write_zip_entry(zip_file, *pending.popleft().result())
+            pending.append(
+                executor.submit(_compress_zip_entry, zip_file, zip_path,
+                                src_path, compress))
+        while pending:
+            _write_zip_entry(zip_file, *pending.popleft().result())
+
+
 def do_zip(inputs,
            output,
            base_dir=None,
            compress_fn=None,
-           zip_prefix_path=None):
+           zip_prefix_path=None,
+           jobs=None):
     """Creates a zip file from a list of files.
 
     Args:
@@ -412,6 +610,7 @@ def do_zip(inputs,
       compress_fn: Applied to each input to determine whether or not to compress.
           By default, items will be |zipfile.ZIP_STORED|.
       zip_prefix_path: Path prepended to file path in zip file.
+      jobs: Number of threads compressing files, see add_files_to_zip_hermetic.
     """
     input_tuples = []
     for tup in inputs:
@@ -421,18 +620,21 @@ def do_zip(inputs,
 
     # Sort by zip path to ensure stable zip ordering.
     input_tuples.sort(key=lambda tup: tup[0])
+    zip_inputs = []
+    for zip_path, fs_path in input_tuples:
+        if zip_prefix_path:
+            zip_path = os.path.join(zip_prefix_path, zip_path)
+        compress = compress_fn(zip_path) if compress_fn else None
+        zip_inputs.append((zip_path, fs_path, compress))
     with zipfile.ZipFile(output, 'w') as outfile:
-        for zip_path, fs_path in input_tuples:
-            if zip_prefix_path:
-                zip_path = os.path.join(zip_prefix_path, zip_path)
-            compress = compress_fn(zip_path) if compress_fn else None
-            add_to_zip_hermetic(outfile,
-                                zip_path,
-                                src_path=fs_path,
-                                compress=compress)
+        add_files_to_zip_hermetic(outfile, zip_inputs, jobs=jobs)
 
 
-def zip_dir(output, base_dir, compress_fn=None, zip_prefix_path=None):
+def zip_dir(output,
+            base_dir,
+            compress_fn=None,
+            zip_prefix_path=None,
+            jobs=None):
     """Creates a zip file from a directory."""
     inputs = []
     for root, _, files in os.walk(base_dir):
@@ -444,7 +646,76 @@ def zip_dir(output, base_dir, compress_fn=None, zip_prefix_path=None):
                f,
                base_dir,
                compress_fn=compress_fn,
-               zip_prefix_path=zip_prefix_path)
+               zip_prefix_path=zip_prefix_path,
+               jobs=jobs)
+
+
+def _gzip_member(data, compresslevel):
+    # wbits 31: a complete gzip member, with a zero mtime in its header.
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+class ParallelGzipWriter(object):
+    """Write-only file object producing a multi-member gzip stream.
+
+    Written data is cut into |block_size| blocks, each compressed into an
+    independent gzip member by |jobs| threads (zlib releases the GIL), like
+    pigz --independent. Members are written in order, so gzip -d and the
+    gzip module decompress the output to the written data.
+    """
+
+    def __init__(self, fileobj, compresslevel=6, block_size=4 * 2**20,
+                 jobs=None):
+        self._fileobj = fileobj
+        self._compresslevel = compresslevel
+        self._block_size = block_size
+        self._jobs = jobs or _zip_jobs()
+        self._executor = ThreadPoolExecutor(max_workers=self._jobs)
+        # Limit the compressed blocks waiting to be written.
+        self._window = self._jobs * 2
+        self._pending = collections.deque()
+        self._buffer = bytearray()
+        self._offset = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _submit(self, data):
+        if len(self._pending) >= self._window:
+            self._fileobj.write(self._pending.popleft().result())
+        self._pending.append(
+            self._executor.submit(_gzip_member, data, self._compresslevel))
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError('write to closed ParallelGzipWriter')
+        self._buffer += data
+        self._offset += len(data)
+        while len(self._buffer) >= self._block_size:
+            self._submit(bytes(self._buffer[:self._block_size]))
+            del self._buffer[:self._block_size]
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if self._buffer or not self._offset:
+                self._submit(bytes(self._buffer))
+            self._buffer = bytearray()
+            while self._pending:
+                self._fileobj.write(self._pending.popleft().result())
+        finally:
+            self._executor.shutdown()
 
 
 def matches_glob(path, filters):
@@ -465,7 +736,76 @@ def _strip_dst_name(dst_name, options):
     return False
 
 
-def merge_zips(output, input_zips, path_transform=None, merge_args=None):
+def _can_copy_zip_entry_raw(info, out_zip):
+    """Returns whether the compressed bytes of |info| can be copied as is,
+    giving the same entry add_to_zip_hermetic would write for its data."""
+    if not getattr(out_zip, '_seekable', False):
+        return False
+    if info.flag_bits & _ZIP_FLAG_ENCRYPTED:
+        return False
+    # ijar creates zips with null CRCs, which need to be computed.
+    if info.CRC == 0 and info.file_size != 0:
+        return False
+    if info.compress_type == zipfile.ZIP_DEFLATED:
+        # add_to_zip_hermetic stores tiny files uncompressed.
+        return info.file_size >= 16
+    return info.compress_type == zipfile.ZIP_STORED
+
+
+def _write_zip_entry(zip_file, zipinfo, data):
+    """Writes an entry whose CRC, sizes and compressed |data| (bytes or an
+    iterable of bytes) are known, as ZipFile.writestr would write it."""
+    if isinstance(data, bytes):
+        data = [data]
+    # zipfile has no API to write compressed data.
+    with zip_file._lock:  # pylint: disable=protected-access
+        zip_file.fp.seek(zip_file.start_dir)
+        zipinfo.header_offset = zip_file.fp.tell()
+        zip_file._writecheck(zipinfo)  # pylint: disable=protected-access
+        zip_file._didModify = True  # pylint: disable=protected-access
+        zip64 = zipinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+        zip_file.fp.write(zipinfo.FileHeader(zip64))
+        for chunk in data:
+            zip_file.fp.write(chunk)
+        zip_file.start_dir = zip_file.fp.tell()
+        zip_file.filelist.append(zipinfo)
+        zip_file.NameToInfo[zipinfo.filename] = zipinfo
+
+
+def _read_zip_entry_raw(in_zip, info):
+    in_zip.fp.seek(info.header_offset)
+    header = struct.unpack(zipfile.structFileHeader,
+                           in_zip.fp.read(zipfile.sizeFileHeader))
+    in_zip.fp.seek(header[_FH_FILENAME_LENGTH] +
+                   header[_FH_EXTRA_FIELD_LENGTH], os.SEEK_CUR)
+    remaining = info.compress_size
+    while remaining > 0:
+        data = in_zip.fp.read(min(remaining, 1 << 20))
+        if not data:
+            raise Exception('Truncated zip entry: %s' % info.filename)
+        remaining -= len(data)
+        yield data
+
+
+def _copy_zip_entry_raw(in_zip, info, out_zip, zip_path):
+    """Copies entry |info| of |in_zip| to |out_zip| as |zip_path| without
+    decompressing it, with a hard-coded modified time like
+    add_to_zip_hermetic."""
+    _check_zip_path(zip_path)
+    zipinfo = zipfile.ZipInfo(filename=zip_path, date_time=HERMETIC_TIMESTAMP)
+    zipinfo.external_attr = _HERMETIC_FILE_ATTR
+    zipinfo.compress_type = info.compress_type
+    zipinfo.CRC = info.CRC
+    zipinfo.compress_size = info.compress_size
+    zipinfo.file_size = info.file_size
+    _write_zip_entry(out_zip, zipinfo, _read_zip_entry_raw(in_zip, info))
+
+
+def merge_zips(output,
+               input_zips,
+               path_transform=None,
+               merge_args=None,
+               raw_copy=True):
     """Combines all files from |input_zips| into |output|.
 
     Args:
@@ -473,6 +813,8 @@ def merge_zips(output, input_zips, path_transform=None, merge_args=None):
       input_zips: Iterable of paths to zip files to merge.
       path_transform: Called for each entry path. Returns a new path, or None to
           skip the file.
+      raw_copy: Copy the compressed data of entries rather than decompressing
+          and compressing them again, when the output entry is the same.
     """
     options = None
     if merge_args:
@@ -511,14 +853,17 @@ def merge_zips(output, input_zips, path_transform=None, merge_args=None):
                         continue
                     if _strip_dst_name(dst_name, options):
                         continue
-                    already_added = dst_name in added_names
-                    if not already_added:
+                    if dst_name in added_names:
+                        continue
+                    if raw_copy and _can_copy_zip_entry_raw(info, out_zip):
+                        _copy_zip_entry_raw(in_zip, info, out_zip, dst_name)
+                    else:
                         add_to_zip_hermetic(
                             out_zip,
                             dst_name,
                             data=in_zip.read(info),
                             compress=info.compress_type != zipfile.ZIP_STORED)
-                        added_names.add(dst_name)
+                    added_names.add(dst_name)
     finally:
         if not output_is_already_open:
             out_zip.close()
@@ -735,6 +1080,64 @@ def call_and_write_depfile_if_stale(function,
                                        pass_changes=True)
 
 
+def _reflink(src, dest):
+    if fcntl is None:
+        raise OSError('reflink is not supported')
+    with open(src, 'rb') as src_file, open(dest, 'wb') as dest_file:
+        fcntl.ioctl(dest_file.fileno(), _FICLONE, src_file.fileno())
+
+
+def copy_file_data(src, dest, hardlink=False):
+    """Copies |src| to |dest| like shutil.copy, except that the data is
+    shared with a reflink (copy on write) when the filesystem supports it,
+    or with a hardlink if |hardlink| is set. A hardlinked |dest| must never
+    be modified in place, and keeps the mtime of |src|.
+
+    Returns 'reflink', 'hardlink' or 'copy'.
+    """
+    if os.path.isdir(dest):
+        dest = os.path.join(dest, os.path.basename(src))
+    if hardlink:
+        try:
+            # link() doesn't follow symlinks on linux.
+            os.link(os.path.realpath(src), dest)
+            return 'hardlink'
+        except OSError:
+            pass
+    try:
+        _reflink(src, dest)
+        shutil.copymode(src, dest)
+        return 'reflink'
+    except OSError:
+        pass
+    shutil.copyfile(src, dest)
+    shutil.copymode(src, dest)
+    return 'copy'
+
+
+def is_copy_up_to_date(src_stat, dest):
+    """Returns whether |dest| is a copy, made by copy_file_data, of the file
+    |src_stat| is the os.stat() of, without reading the files.
+
+    The copy is up to date when it is the same inode, or when it has the
+    same size and was written after the last change of the source. The
+    ctime catches sources replaced by files with an older mtime.
+    """
+    try:
+        dest_stat = os.lstat(dest)
+    except OSError:
+        return False
+    if not stat.S_ISREG(dest_stat.st_mode):
+        return False
+    if (dest_stat.st_ino, dest_stat.st_dev) == (src_stat.st_ino,
+                                                 src_stat.st_dev):
+        return True
+    return dest_stat.st_size == src_stat.st_size and \
+        stat.S_IMODE(dest_stat.st_mode) == stat.S_IMODE(src_stat.st_mode) and \
+        dest_stat.st_mtime_ns >= max(src_stat.st_mtime_ns,
+                                     src_stat.st_ctime_ns)
+
+
 def get_all_files(base, follow_symlinks=False):
     """Returns a list of all the files in |base|. Each entry is relative to the
     last path entry of |base|.
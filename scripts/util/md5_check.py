@@ -5,11 +5,14 @@
 # found in the LICENSE file.
 
 import difflib
+import functools
 import hashlib
 import itertools
 import json
 import os
+import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from .pycache import pycache_enabled
 from .pycache import pycache
 
@@ -19,17 +22,64 @@ PRINT_EXPLANATIONS = int(os.environ.get('PRINT_BUILD_EXPLANATIONS', 0))
 # An escape hatch that causes all targets to be rebuilt.
 _FORCE_REBUILD = int(os.environ.get('FORCE_REBUILD', 0))
 
-
-def get_new_metadata(input_strings, input_paths):
-    new_metadata = _Metadata()
+# Digest of input file contents. Records remember the digest they were
+# written with, records without one use md5.
+_DIGESTS = {
+    'md5': hashlib.md5,
+    'blake2b': hashlib.blake2b,
+}
+_DIGEST = os.environ.get('MD5_CHECK_DIGEST', 'md5')
+if _DIGEST not in _DIGESTS:
+    _DIGEST = 'md5'
+
+# Threads used to hash inputs, 0 picks a count from the size of the inputs.
+_HASH_JOBS = int(os.environ.get('MD5_CHECK_JOBS', 0))
+_MAX_HASH_JOBS = 16
+# Input sets with fewer files and bytes than this are hashed serially.
+_PARALLEL_MIN_INPUTS = 64
+_PARALLEL_MIN_BYTES = 16 * 2**20
+
+# Inputs modified this close to the time they are stat'ed may change again
+# within the same mtime granularity, so they are always hashed.
+_RACY_WINDOW_NS = 2 * 10**9
+
+
+def get_new_metadata(input_strings, input_paths, stat_cache=None, digest=None):
+    digest = digest or _DIGEST
+    new_metadata = _Metadata(digest)
     new_metadata.add_strings(input_strings)
 
+    values = []
+    pending = []
     for path in input_paths:
         if _is_zip_file(path):
-            entries = _extract_zip_entries(path)
-            new_metadata.add_zip_file(path, entries)
+            stat_key = _stat_key(path)
+            compute = functools.partial(_extract_zip_entries, path)
+        elif os.path.isdir(path):
+            stat_key = _directory_stat_key(path)
+            compute = functools.partial(_md5_for_path, path, digest)
+        else:
+            stat_key = _stat_key(path)
+            compute = functools.partial(_md5_for_path, path, digest)
+        value = None
+        if stat_cache is not None and stat_key is not None:
+            value = stat_cache.get(path, stat_key)
+        if value is None:
+            pending.append((len(values), path, stat_key, compute))
+        values.append(value)
+
+    computed = _compute_all([item[3] for item in pending],
+                            [item[1] for item in pending])
+    for (index, path, stat_key, _), value in zip(pending, computed):
+        values[index] = value
+        if stat_cache is not None and stat_key is not None:
+            stat_cache.put(path, stat_key, value)
+
+    for path, value in zip(input_paths, values):
+        if _is_zip_file(path):
+            new_metadata.add_zip_file(path, value)
         else:
-            new_metadata.add_file(path, _md5_for_path(path))
+            new_metadata.add_file(path, value)
     return new_metadata
 
 
@@ -86,7 +136,10 @@ def call_and_record_if_stale(
     input_strings = input_strings or []
     output_paths = output_paths or []
 
-    new_metadata = get_new_metadata(input_strings, input_paths)
+    stat_cache = _StatCache(
+        (record_path or output_paths[0] + '.md5.stamp') + '.stat', _DIGEST)
+    new_metadata = get_new_metadata(input_strings, input_paths, stat_cache)
+    stat_cache.save()
     force = force or _FORCE_REBUILD
     missing_outputs = [
         x for x in output_paths if force or not os.path.exists(x)
@@ -107,6 +160,16 @@ def call_and_record_if_stale(
             old_metadata = get_old_metadata(record_path)
         else:
             old_metadata = None
+        if old_metadata and old_metadata.digest() != new_metadata.digest():
+            # Compare records of another digest in that digest, and only
+            # rewrite them when nothing changed.
+            old_digest_metadata = get_new_metadata(
+                input_strings, input_paths, digest=old_metadata.digest())
+            if not Changes(old_metadata, old_digest_metadata, force,
+                           missing_outputs).has_changes():
+                with open(record_path, 'w') as record:
+                    new_metadata.to_file(record)
+                return
 
     changes = Changes(old_metadata, new_metadata, force, missing_outputs)
     if not changes.has_changes():
@@ -118,6 +181,8 @@ def call_and_record_if_stale(
     print_explanations(record_path, changes)
 
     args = (changes, ) if pass_changes else ()
+    if pycache_enabled:
+        pycache.prepare_outputs(output_paths)
     function(*args)
     if pycache_enabled:
         try:
@@ -128,6 +193,9 @@ def call_and_record_if_stale(
 
     with open(record_path, 'w') as record:
         new_metadata.to_file(record)
+    if pycache_enabled:
+        pycache.upload_manifest(record_path)
+    stat_cache.save()
 
 
 class Changes(object):
@@ -266,7 +334,8 @@ class Changes(object):
 
 class _Metadata(object):
     """Data model for tracking change metadata."""
-    def __init__(self):
+    def __init__(self, digest='md5'):
+        self._digest = digest
         self._files_md5 = None
         self._strings_md5 = None
         self._files = []
@@ -277,8 +346,8 @@ class _Metadata(object):
     @classmethod
     def from_file(cls, fileobj):
         """Returns a _Metadata initialized from a file object."""
-        ret = cls()
         obj = json.load(fileobj)
+        ret = cls(obj.get('digest', 'md5'))
         ret._files_md5 = obj['files-md5']
         ret._strings_md5 = obj['strings-md5']
         ret._files = obj['input-files']
@@ -293,8 +362,14 @@ class _Metadata(object):
             "input-files": self._files,
             "input-strings": self._strings,
         }
+        if self._digest != 'md5':
+            obj['digest'] = self._digest
         json.dump(obj, fileobj, indent=2, sort_keys=True)
 
+    def digest(self):
+        """Returns the digest used for the contents of input files."""
+        return self._digest
+
     def add_strings(self, values):
         self._assert_not_queried()
         self._strings.extend(str(v) for v in values)
@@ -411,8 +486,8 @@ def _update_md5_for_directory(md5, dir_path):
             _update_md5_for_file(md5, os.path.join(root, f))
 
 
-def _md5_for_path(path):
-    md5 = hashlib.md5()
+def _md5_for_path(path, digest='md5'):
+    md5 = _DIGESTS[digest]()
     if os.path.isdir(path):
         _update_md5_for_directory(md5, path)
     else:
@@ -420,6 +495,103 @@ def _md5_for_path(path):
     return md5.hexdigest()
 
 
+def _stat_key(path):
+    """Returns [inode, size, mtime_ns] of |path|, or None if it can't be
+    cached."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if time.time_ns() - stat.st_mtime_ns < _RACY_WINDOW_NS:
+        return None
+    return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+def _directory_stat_key(dir_path):
+    """Returns the stat keys of all files under |dir_path| in the order
+    _update_md5_for_directory() hashes them."""
+    key = []
+    for root, _, files in os.walk(dir_path):
+        for f in files:
+            file_key = _stat_key(os.path.join(root, f))
+            if file_key is None:
+                return None
+            key.append([os.path.join(root, f)] + file_key)
+    return key
+
+
+def _hash_jobs(paths):
+    """Returns the number of threads used to hash |paths|.
+
+    hashlib releases the GIL while hashing large buffers, so big input sets
+    are hashed on a thread pool. Small ones stay serial, where starting the
+    threads costs more than it saves.
+    """
+    if _HASH_JOBS:
+        return min(_HASH_JOBS, len(paths))
+    if len(paths) < 2:
+        return 1
+    if len(paths) < _PARALLEL_MIN_INPUTS:
+        total_size = 0
+        for path in paths:
+            try:
+                total_size += os.path.getsize(path)
+            except OSError:
+                pass
+        if total_size < _PARALLEL_MIN_BYTES:
+            return 1
+    return min(len(paths), os.cpu_count() or 1, _MAX_HASH_JOBS)
+
+
+def _compute_all(computes, paths):
+    """Calls |computes| and returns their results in the same order."""
+    jobs = _hash_jobs(paths)
+    if jobs <= 1:
+        return [compute() for compute in computes]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(lambda compute: compute(), computes))
+
+
+class _StatCache(object):
+    """Sidecar of a record which keeps the stat key and tag of every input,
+    so that inputs whose inode, size and mtime did not change are not
+    hashed again."""
+    def __init__(self, path, digest):
+        self._path = path
+        self._digest = digest
+        self._old_entries = {}
+        self._entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as jsonfile:
+                    obj = json.load(jsonfile)
+                if obj.get('digest') == digest:
+                    self._old_entries = obj.get('entries', {})
+            except:  # noqa: E722 pylint: disable=bare-except
+                pass
+
+    def get(self, path, stat_key):
+        entry = self._old_entries.get(path)
+        if entry is None or entry[0] != stat_key:
+            return None
+        self._entries[path] = entry
+        return entry[1]
+
+    def put(self, path, stat_key, value):
+        self._entries[path] = [stat_key, value]
+
+    def save(self):
+        if self._entries == self._old_entries:
+            return
+        dirname = os.path.dirname(self._path)
+        if dirname and not os.path.exists(dirname):
+            return
+        with open(self._path, 'w') as jsonfile:
+            json.dump({'digest': self._digest, 'entries': self._entries},
+                      jsonfile)
+        self._old_entries = self._entries
+
+
 def _compute_inline_md5(iterable):
     """Computes the md5 of the concatenated parameters."""
     md5 = hashlib.md5()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+from scripts.util.file_utils import read_json_file
+
+
+class PartsIndex(object):
+    """Map build outputs to the part and subsystem owning their sources."""
+
+    def __init__(self, parts_info_dir: str):
+        self.path_to_part = {}
+        self.part_to_subsystem = {}
+        if not parts_info_dir:
+            return
+        path_to_parts = read_json_file(
+            os.path.join(parts_info_dir, 'path_to_parts.json')) or {}
+        for path, parts in path_to_parts.items():
+            self.path_to_part[path.strip('/')] = parts[0]
+        subsystem_parts = read_json_file(
+            os.path.join(parts_info_dir, 'subsystem_parts.json')) or {}
+        for subsystem, parts in subsystem_parts.items():
+            for part in parts:
+                self.part_to_subsystem[part] = subsystem
+
+    def lookup(self, output: str):
+        items = output.split('/')
+        for marker in ('obj', 'gen'):
+            if marker in items:
+                items = items[items.index(marker) + 1:]
+                break
+        while items:
+            part = self.path_to_part.get('/'.join(items))
+            if part:
+                return part, self.part_to_subsystem.get(part, '')
+            items.pop()
+        return '', ''
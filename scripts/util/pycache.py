@@ -15,58 +15,495 @@
 
 import shutil
 import os
+import stat
+import time
+import atexit
 import hashlib
 import json
+import queue
+import sqlite3
+import tempfile
+import urllib.parse
 import http.client as client
-from . import build_utils
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ioctl which makes the destination file share the extents of the source
+# file (copy on write), supported by btrfs and xfs.
+FICLONE = 0x40049409
+
+# Cache objects are evicted, least recently used first, when the blobs of
+# the cache take more than PYCACHE_MAX_SIZE bytes (K, M and G suffixes are
+# allowed), down to PYCACHE_EVICT_RATIO of it.
+DEFAULT_MAX_SIZE = 40 * 1024 * 1024 * 1024
+PYCACHE_EVICT_RATIO = 0.9
+
+STAT_NAMES = [
+    'cache_hit',
+    'cache_miss',
+    'stored_blobs',
+    'stored_bytes',
+    'deduplicated_bytes',
+    'linked_files',
+    'copied_files',
+    'evicted_blobs',
+    'evicted_bytes',
+    'remote_hit',
+    'remote_uploads',
+]
+
+
+def parse_size(value):
+    units = {'K': 1024, 'M': 1024**2, 'G': 1024**3, 'T': 1024**4}
+    value = str(value).strip().upper().rstrip('B')
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def file_digest(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as infile:
+        while True:
+            data = infile.read(2**20)
+            if not data:
+                break
+            sha256.update(data)
+    return sha256.hexdigest()
+
+
+class CasIndex():
+    """Access time index of the blobs in the cache, shared by all build
+    actions through sqlite, which also keeps the cache statistics."""
+    def __init__(self, index_file):
+        self.conn = sqlite3.connect(index_file, timeout=120)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS blobs ('
+                          'digest TEXT PRIMARY KEY, size INTEGER, atime REAL)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS blobs_atime_idx '
+                          'ON blobs (atime)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS stats ('
+                          'name TEXT PRIMARY KEY, value INTEGER)')
+
+    def _count(self, name, value):
+        self.conn.execute(
+            'INSERT INTO stats (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            (name, value))
+
+    def count(self, name, value=1):
+        with self.conn:
+            self._count(name, value)
+
+    def add_blob(self, digest, size):
+        with self.conn:
+            cursor = self.conn.execute(
+                'INSERT OR IGNORE INTO blobs (digest, size, atime) '
+                'VALUES (?, ?, ?)', (digest, size, time.time()))
+            if cursor.rowcount:
+                self._count('total_size', size)
+                self._count('stored_blobs', 1)
+                self._count('stored_bytes', size)
+
+    def touch(self, digests):
+        with self.conn:
+            self.conn.executemany(
+                'UPDATE blobs SET atime = ? WHERE digest = ?',
+                [(time.time(), digest) for digest in digests])
+
+    def total_size(self):
+        row = self.conn.execute('SELECT value FROM stats WHERE name = ?',
+                                ('total_size', )).fetchone()
+        return row[0] if row else 0
+
+    def evict(self, max_size):
+        """Drops the least recently used blobs from the index until they
+        take at most max_size bytes, returns the dropped digests."""
+        evicted = []
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            total_size = self.total_size()
+            if total_size > max_size:
+                evicted_size = 0
+                cursor = self.conn.execute(
+                    'SELECT digest, size FROM blobs ORDER BY atime')
+                for digest, size in cursor:
+                    if total_size - evicted_size <= max_size * PYCACHE_EVICT_RATIO:
+                        break
+                    evicted.append(digest)
+                    evicted_size += size
+                self.conn.executemany('DELETE FROM blobs WHERE digest = ?',
+                                      [(digest, ) for digest in evicted])
+                self._count('total_size', -evicted_size)
+                self._count('evicted_blobs', len(evicted))
+                self._count('evicted_bytes', evicted_size)
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return evicted
+
+    def statistics(self):
+        stats = dict.fromkeys(STAT_NAMES, 0)
+        stats.update(self.conn.execute('SELECT name, value FROM stats'))
+        return stats
 
 
 class Storage():
-    def __init__(self):
-        pass
+    """Content addressed storage of action outputs.
 
-    @classmethod
-    def retrieve_object(cls, cache_artifact, obj):
-        possible_dir_cache_artifact = '{}.directory'.format(cache_artifact)
+    Every output file is stored once as a blob named by its sha256, and an
+    output path maps to an entry which lists the blobs of the file or of
+    all files under the directory. Blobs are read-only and retrieved by
+    reflink when possible, falling back to a copy.
 
-        if os.path.exists(cache_artifact):
-            os.makedirs(os.path.dirname(obj), exist_ok=True)
-            shutil.copyfile(cache_artifact, obj)
-            os.utime(cache_artifact)
-            if pycache_debug_enable:
-                print('Retrieve {} from cache'.format(obj))
-        elif os.path.exists(possible_dir_cache_artifact):
-            # Extract zip archive if it's cache artifact for directory.
-            os.makedirs(obj, exist_ok=True)
-            build_utils.extract_all(possible_dir_cache_artifact,
-                                   obj,
-                                   no_clobber=False)
-            os.utime(possible_dir_cache_artifact)
-            if pycache_debug_enable:
-                print('Extract {} from cache'.format(obj))
+    PYCACHE_DIR must only be written by pycache. With |hardlink|
+    (PYCACHE_HARDLINK=1), non-executable outputs are hardlinked to their
+    blob instead of copied: such an output is read-only and must never be
+    modified in place by a later build step, as it would modify the cache.
+    break_hardlinks only copies the outputs of the action about to run.
+    """
+    def __init__(self, pycache_dir, hardlink=False):
+        self.hardlink = hardlink
+        self.cas_dir = os.path.join(pycache_dir, 'cas')
+        self._index = None
+        self._index_file = os.path.join(pycache_dir, 'index.db')
+
+    @property
+    def index(self):
+        if self._index is None:
+            os.makedirs(os.path.dirname(self._index_file), exist_ok=True)
+            self._index = CasIndex(self._index_file)
+        return self._index
+
+    def blob_path(self, digest):
+        return os.path.join(self.cas_dir, digest[:2], digest[2:])
+
+    def put_blob(self, path):
+        digest = file_digest(path)
+        blob = self.blob_path(digest)
+        size = os.path.getsize(path)
+        if os.path.exists(blob):
+            self.index.count('deduplicated_bytes', size)
         else:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            fd, tmp_blob = tempfile.mkstemp(dir=os.path.dirname(blob))
+            os.close(fd)
+            try:
+                shutil.copyfile(path, tmp_blob)
+                os.chmod(tmp_blob, 0o444)
+                os.replace(tmp_blob, blob)
+            finally:
+                if os.path.exists(tmp_blob):
+                    os.unlink(tmp_blob)
+        self.index.add_blob(digest, size)
+        return digest
+
+    def get_blob(self, digest, obj, mode):
+        """Places blob |digest| at |obj|, returns whether it was linked.
+
+        Raises OSError when the blob is missing, e.g. evicted by a
+        concurrent action."""
+        blob = self.blob_path(digest)
+        tmp_obj = '{}.pycache_tmp'.format(obj)
+        if os.path.lexists(tmp_obj):
+            os.unlink(tmp_obj)
+        linked = False
+        try:
+            try:
+                _reflink(blob, tmp_obj)
+                os.chmod(tmp_obj, mode)
+            except OSError:
+                if os.path.exists(tmp_obj):
+                    os.unlink(tmp_obj)
+                if self.hardlink and mode & 0o111 == 0:
+                    # A hardlinked output shares the blob's read-only mode.
+                    try:
+                        os.link(blob, tmp_obj)
+                        linked = True
+                    except OSError:
+                        pass
+                if not linked:
+                    shutil.copyfile(blob, tmp_obj)
+                    os.chmod(tmp_obj, mode)
+            os.replace(tmp_obj, obj)
+        finally:
+            if os.path.lexists(tmp_obj):
+                os.unlink(tmp_obj)
+        # ninja compares the mtime of outputs with their inputs.
+        os.utime(obj)
+        return linked
+
+    def import_blob(self, digest, path):
+        """Moves the downloaded file |path| into the storage as blob
+        |digest|, after checking its content."""
+        if file_digest(path) != digest:
+            raise ValueError('corrupted blob {}'.format(digest))
+        blob = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        os.chmod(path, 0o444)
+        os.replace(path, blob)
+        self.index.add_blob(digest, os.path.getsize(blob))
+
+    def load_entry(self, cache_artifact):
+        """Returns the entry of |cache_artifact| if all its blobs exist."""
+        entry = _read_entry('{}.entry'.format(cache_artifact))
+        if not entry or not all(
+                os.path.exists(self.blob_path(digest))
+                for _, digest, _ in entry.get('files', [])):
+            return None
+        return entry
+
+    def retrieve_object(self, cache_artifact, obj):
+        entry = self.load_entry(cache_artifact)
+        files = entry.get('files', []) if entry else []
+        if not entry:
             if pycache_debug_enable:
                 print('Failed to retrieve {} from cache'.format(obj))
             return 0
-        return 1
 
-    @classmethod
-    def add_object(cls, cache_artifact, obj):
-        cache_dir = os.path.dirname(cache_artifact)
-        os.makedirs(cache_dir, exist_ok=True)
+        linked = 0
+        try:
+            if entry.get('type') == 'directory':
+                os.makedirs(obj, exist_ok=True)
+                for subdir in entry.get('dirs', []):
+                    os.makedirs(os.path.join(obj, subdir), exist_ok=True)
+                for relpath, digest, mode in files:
+                    path = os.path.join(obj, relpath)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    linked += self.get_blob(digest, path, mode)
+            else:
+                os.makedirs(os.path.dirname(os.path.abspath(obj)), exist_ok=True)
+                _, digest, mode = files[0]
+                linked += self.get_blob(digest, obj, mode)
+        except OSError as error:
+            # A blob was evicted by a concurrent action since load_entry:
+            # drop the partial output, the action reruns instead.
+            if pycache_debug_enable:
+                print('Failed to retrieve {} from cache: {}'.format(obj, error))
+            _remove_output(obj)
+            return 0
+        self.index.touch([digest for _, digest, _ in files])
+        self.index.count('linked_files', linked)
+        self.index.count('copied_files', len(files) - linked)
+        if pycache_debug_enable:
+            print('Retrieve {} from cache'.format(obj))
+        return 1
 
+    def add_object(self, cache_artifact, obj):
         if not os.path.exists(obj):
             return
-        # If path is directory, store an zip archive.
         if os.path.isdir(obj):
-            dir_cache_artifact = '{}.directory'.format(cache_artifact)
-            build_utils.zip_dir(dir_cache_artifact, obj)
-            if pycache_debug_enable:
-                print("archive {} to {}".format(obj, dir_cache_artifact))
+            entry = {'type': 'directory', 'files': [], 'dirs': []}
+            for root, dirs, files in os.walk(obj):
+                for name in sorted(dirs):
+                    entry['dirs'].append(
+                        os.path.relpath(os.path.join(root, name), obj))
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    entry['files'].append(
+                        [os.path.relpath(path, obj), self.put_blob(path),
+                         _file_mode(path)])
         else:
-            shutil.copyfile(obj, cache_artifact)
-            if pycache_debug_enable:
-                print("copying {} to {}".format(obj, cache_artifact))
+            entry = {
+                'type': 'file',
+                'files': [['', self.put_blob(obj), _file_mode(obj)]]
+            }
+        _write_entry('{}.entry'.format(cache_artifact), entry)
+        if pycache_debug_enable:
+            print("storing {} to {}".format(obj, cache_artifact))
+
+    def remove_blobs(self, digests):
+        for digest in digests:
+            try:
+                os.unlink(self.blob_path(digest))
+            except OSError:
+                pass
+
+
+def _remove_output(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.lexists(path):
+        os.unlink(path)
+
+
+def _reflink(src, dst):
+    if fcntl is None:
+        raise OSError('reflink is not supported')
+    with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+        fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+
+
+def _file_mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode) | 0o200
+
+
+def _read_entry(entry_file):
+    if not os.path.exists(entry_file):
+        return None
+    try:
+        with open(entry_file, 'r') as jsonfile:
+            return json.load(jsonfile)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_entry(entry_file, entry):
+    os.makedirs(os.path.dirname(entry_file), exist_ok=True)
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(entry_file))
+    with os.fdopen(fd, 'w') as jsonfile:
+        json.dump(entry, jsonfile)
+    os.replace(tmp_file, entry_file)
+
+
+def break_hardlinks(path):
+    """Replaces hardlinked cache blobs under |path| by private copies, so
+    that an action writing to its old outputs can't modify the cache."""
+    if os.path.isdir(path):
+        paths = [os.path.join(root, name)
+                 for root, _, files in os.walk(path) for name in files]
+    else:
+        paths = [path]
+    for file_path in paths:
+        try:
+            file_stat = os.lstat(file_path)
+        except OSError:
+            continue
+        if not stat.S_ISREG(file_stat.st_mode) or file_stat.st_nlink < 2:
+            continue
+        tmp_path = '{}.pycache_tmp'.format(file_path)
+        shutil.copyfile(file_path, tmp_path)
+        os.chmod(tmp_path, stat.S_IMODE(file_stat.st_mode) | 0o200)
+        os.replace(tmp_path, file_path)
+
+
+class HttpConnectionPool():
+    """Keeps idle HTTP/1.1 connections to one server for reuse."""
+    def __init__(self, host, port, size=8, timeout=60):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(maxsize=size)
+
+    def _connection(self):
+        try:
+            return self.idle.get_nowait(), True
+        except queue.Empty:
+            return client.HTTPConnection(self.host, self.port,
+                                         timeout=self.timeout), False
+
+    def _release(self, conn):
+        try:
+            self.idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def request(self, method, url, body=None, headers=None, output=None):
+        """Returns the status and body of the response, the body is written
+        to the file object |output| instead when the status is 200."""
+        while True:
+            conn, reused = self._connection()
+            try:
+                conn.request(method, url, body=body, headers=headers or {})
+                response = conn.getresponse()
+            except (OSError, client.HTTPException):
+                conn.close()
+                # The server may have closed an idle connection, retry once
+                # on a new one unless the body can't be sent again.
+                if reused and (body is None or isinstance(body, bytes)):
+                    continue
+                raise
+            try:
+                if output is not None and response.status == 200:
+                    shutil.copyfileobj(response, output, 2**20)
+                    data = b''
+                else:
+                    data = response.read()
+            except BaseException:
+                conn.close()
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            return response.status, data
+
+
+class HttpRemoteStorage():
+    """Remote cache server speaking plain HTTP:
+
+        GET  /<kind>/<key>     fetch an object, 404 when missing
+        PUT  /<kind>/<key>     store an object
+        POST /<kind>/exists    json list of keys in, json list of the
+                               existing ones out
+
+    where kind is 'cas' for blobs, 'entry' for output entries and
+    'manifest' for action records.
+    """
+    def __init__(self, url):
+        parsed = urllib.parse.urlsplit(url)
+        self.prefix = parsed.path.rstrip('/')
+        self.pool = HttpConnectionPool(parsed.hostname, parsed.port or 80)
+
+    def _url(self, kind, key):
+        return '{}/{}/{}'.format(self.prefix, kind, key)
+
+    def exists(self, kind, keys):
+        if not keys:
+            return set()
+        status, data = self.pool.request(
+            'POST', self._url(kind, 'exists'), json.dumps(keys).encode(),
+            {'Content-Type': 'application/json'})
+        if status != 200:
+            raise client.HTTPException('exists {}: {}'.format(kind, status))
+        return set(json.loads(data))
+
+    def get(self, kind, key):
+        status, data = self.pool.request('GET', self._url(kind, key))
+        if status == 404:
+            return None
+        if status != 200:
+            raise client.HTTPException('get {}/{}: {}'.format(kind, key, status))
+        return data
+
+    def get_file(self, kind, key, path):
+        with open(path, 'wb') as outfile:
+            status, _ = self.pool.request('GET', self._url(kind, key),
+                                          output=outfile)
+        if status != 200:
+            raise client.HTTPException('get {}/{}: {}'.format(kind, key, status))
+
+    def put(self, kind, key, data):
+        status, _ = self.pool.request('PUT', self._url(kind, key), data)
+        if status not in (200, 201, 204):
+            raise client.HTTPException('put {}/{}: {}'.format(kind, key, status))
+
+    def put_file(self, kind, key, path):
+        with open(path, 'rb') as infile:
+            status, _ = self.pool.request(
+                'PUT', self._url(kind, key), infile,
+                {'Content-Length': str(os.fstat(infile.fileno()).st_size)})
+        if status not in (200, 201, 204):
+            raise client.HTTPException('put {}/{}: {}'.format(kind, key, status))
+
+
+REMOTE_STORAGES = {
+    'http': HttpRemoteStorage,
+}
+
+
+def create_remote_storage(url):
+    if not url:
+        return None
+    scheme = urllib.parse.urlsplit(url).scheme
+    if scheme not in REMOTE_STORAGES:
+        raise Exception('Error: unsupported PYCACHE_REMOTE_URL {}'.format(url))
+    return REMOTE_STORAGES[scheme](url)
 
 
 class PyCache():
@@ -76,18 +513,31 @@ class PyCache():
             self.pycache_dir = cache_dir
         else:
             raise Exception('Error: failed to get PYCACHE_DIR')
-        self.storage = Storage()
+        self.storage = Storage(
+            self.pycache_dir,
+            hardlink=bool(int(os.environ.get('PYCACHE_HARDLINK', 0))))
+        self.max_size = parse_size(
+            os.environ.get('PYCACHE_MAX_SIZE', DEFAULT_MAX_SIZE))
+        # Objects missing locally are looked up in the remote cache, and
+        # new objects are uploaded in the background.
+        self.remote = create_remote_storage(
+            os.environ.get('PYCACHE_REMOTE_URL'))
+        self.uploader = None
 
     @classmethod
     def cache_key(cls, path):
         sha256 = hashlib.sha256()
         sha256.update(path.encode())
         return sha256.hexdigest()
-    
+
     def retrieve(self, output_paths, prefix=''):
-        for path in output_paths:
-            _, cache_artifact = self.descend_directory('{}{}'.format(
-                prefix, path))
+        cache_artifacts = [
+            self.descend_directory('{}{}'.format(prefix, path))[1]
+            for path in output_paths
+        ]
+        if self.remote:
+            self._run_remote(self.fetch_remote, cache_artifacts)
+        for path, cache_artifact in zip(output_paths, cache_artifacts):
             result = self.storage.retrieve_object(cache_artifact, path)
             if not result:
                 return result
@@ -99,12 +549,113 @@ class PyCache():
         return 1
 
     def save(self, output_paths, prefix=''):
+        cache_artifacts = []
         for path in output_paths:
             _, cache_artifact = self.descend_directory('{}{}'.format(
                 prefix, path))
             self.storage.add_object(cache_artifact, path)
+            cache_artifacts.append(cache_artifact)
+        if self.remote:
+            # The index is only used from this thread.
+            self.storage.index.count('remote_uploads', len(cache_artifacts))
+            self.upload(self.upload_objects, cache_artifacts)
+        self.evict()
+
+    @staticmethod
+    def artifact_key(cache_artifact):
+        return os.path.basename(os.path.dirname(cache_artifact)) + \
+            os.path.basename(cache_artifact)
+
+    def fetch_remote(self, cache_artifacts):
+        """Downloads the outputs of an action which are missing locally,
+        only when the remote cache has all of them."""
+        missing = [
+            cache_artifact for cache_artifact in cache_artifacts
+            if self.storage.load_entry(cache_artifact) is None
+        ]
+        keys = [self.artifact_key(cache_artifact) for cache_artifact in missing]
+        if not missing or len(self.remote.exists('entry', keys)) != len(keys):
+            return
+        for key, cache_artifact in zip(keys, missing):
+            data = self.remote.get('entry', key)
+            if data is None:
+                return
+            entry = json.loads(data)
+            digests = dict.fromkeys(digest for _, digest, _ in entry['files'])
+            for digest in digests:
+                if os.path.exists(self.storage.blob_path(digest)):
+                    continue
+                os.makedirs(self.storage.cas_dir, exist_ok=True)
+                fd, tmp_blob = tempfile.mkstemp(dir=self.storage.cas_dir)
+                os.close(fd)
+                try:
+                    self.remote.get_file('cas', digest, tmp_blob)
+                    self.storage.import_blob(digest, tmp_blob)
+                finally:
+                    if os.path.exists(tmp_blob):
+                        os.unlink(tmp_blob)
+            _write_entry('{}.entry'.format(cache_artifact), entry)
+        self.storage.index.count('remote_hit')
+
+    def upload_objects(self, cache_artifacts):
+        entries = []
+        for cache_artifact in cache_artifacts:
+            entry_file = '{}.entry'.format(cache_artifact)
+            entry = _read_entry(entry_file)
+            if entry is not None:
+                entries.append((self.artifact_key(cache_artifact), entry_file,
+                                entry))
+        digests = list(
+            dict.fromkeys(digest for _, _, entry in entries
+                          for _, digest, _ in entry.get('files', [])))
+        present = self.remote.exists('cas', digests)
+        for digest in digests:
+            if digest not in present:
+                self.remote.put_file('cas', digest,
+                                     self.storage.blob_path(digest))
+        # Entries go last, so that a remote entry always has its blobs.
+        for key, entry_file, _ in entries:
+            self.remote.put_file('entry', key, entry_file)
+
+    def upload_manifest(self, record_path):
+        if self.remote:
+            self.upload(self.remote.put_file, 'manifest',
+                        self.artifact_key(record_path), record_path)
+
+    def upload(self, func, *args):
+        """Runs |func| in the background, uploads are done in order and
+        waited for at exit."""
+        if self.uploader is None:
+            self.uploader = ThreadPoolExecutor(max_workers=1)
+            atexit.register(self.uploader.shutdown, wait=True)
+        self.uploader.submit(self._run_remote, func, *args)
+
+    def _run_remote(self, func, *args):
+        # The remote cache is best effort and never fails the build.
+        try:
+            func(*args)
+        except Exception as error:  # pylint: disable=broad-except
+            if pycache_debug_enable:
+                print('Remote cache error: {}'.format(error))
+
+    def prepare_outputs(self, output_paths):
+        """Called before an action rewrites outputs retrieved from cache."""
+        for path in output_paths:
+            break_hardlinks(path)
+
+    def evict(self):
+        if self.storage.index.total_size() <= self.max_size:
+            return
+        evicted = self.storage.index.evict(self.max_size)
+        self.storage.remove_blobs(evicted)
+        if pycache_debug_enable:
+            print('Evicted {} blobs from cache'.format(len(evicted)))
+
+    def statistics(self):
+        return self.storage.index.statistics()
 
     def report_cache_stat(self, hit_or_miss):
+        self.storage.index.count(hit_or_miss)
         pyd_server, pyd_port = self.get_pyd()
         conn = client.HTTPConnection(pyd_server, pyd_port)
         conn.request(hit_or_miss, '/')
@@ -127,8 +678,18 @@ class PyCache():
     def get_manifest_path(self, path):
         manifest_dir, manifest_file = self.descend_directory(path)
         os.makedirs(manifest_dir, exist_ok=True)
+        if self.remote and not os.path.exists(manifest_file):
+            self._run_remote(self.fetch_manifest, manifest_file)
         return manifest_file
 
+    def fetch_manifest(self, manifest_file):
+        data = self.remote.get('manifest', self.artifact_key(manifest_file))
+        if data is not None:
+            fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(manifest_file))
+            with os.fdopen(fd, 'wb') as outfile:
+                outfile.write(data)
+            os.replace(tmp_file, manifest_file)
+
 
 pycache_enabled = (os.environ.get('PYCACHE_DIR') is not None)
 pycache_debug_enable = int(os.environ.get('PRINT_BUILD_EXPLANATIONS', 0))
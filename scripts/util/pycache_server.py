@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Minimal remote cache server for pycache, see HttpRemoteStorage in
+pycache.py for the protocol. Builds use it through
+PYCACHE_REMOTE_URL=http://<host>:<port>."""
+
+import os
+import sys
+import json
+import shutil
+import string
+import argparse
+import tempfile
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+KINDS = ('cas', 'entry', 'manifest')
+DEBUG = int(os.environ.get('PRINT_BUILD_EXPLANATIONS', 0))
+
+
+def _valid_key(key):
+    return len(key) > 2 and all(char in string.hexdigits for char in key)
+
+
+class PycacheServerRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        if DEBUG:
+            super().log_message(format, *args)
+
+    def _parse_path(self):
+        items = self.path.strip('/').split('/')
+        if len(items) != 2 or items[0] not in KINDS:
+            return None, None
+        return items
+
+    def _object_path(self, kind, key):
+        return os.path.join(self.server.root, kind, key[:2], key)
+
+    def _reply(self, status, data=b''):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        kind, key = self._parse_path()
+        if kind is None or not _valid_key(key):
+            self._reply(400)
+            return
+        path = self._object_path(kind, key)
+        try:
+            infile = open(path, 'rb')
+        except OSError:
+            self._reply(404)
+            return
+        with infile:
+            self.send_response(200)
+            self.send_header('Content-Length',
+                             str(os.fstat(infile.fileno()).st_size))
+            self.end_headers()
+            shutil.copyfileobj(infile, self.wfile, 2**20)
+
+    def do_PUT(self):  # pylint: disable=invalid-name
+        kind, key = self._parse_path()
+        length = int(self.headers.get('Content-Length', 0))
+        if kind is None or not _valid_key(key):
+            self.rfile.read(length)
+            self._reply(400)
+            return
+        path = self._object_path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as outfile:
+                while length > 0:
+                    data = self.rfile.read(min(length, 2**20))
+                    if not data:
+                        break
+                    outfile.write(data)
+                    length -= len(data)
+            if length:
+                self._reply(400)
+                return
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        self._reply(201)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        kind, action = self._parse_path()
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        if kind is None or action != 'exists':
+            self._reply(400)
+            return
+        try:
+            keys = json.loads(body)
+        except ValueError:
+            self._reply(400)
+            return
+        present = [
+            key for key in keys
+            if _valid_key(key) and os.path.exists(self._object_path(kind, key))
+        ]
+        self._reply(200, json.dumps(present).encode())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--root', required=True,
+                        help='directory to store cache objects')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=7971)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port),
+                                 PycacheServerRequestHandler)
+    server.root = os.path.abspath(args.root)
+    print('pycache server listening on {}:{}, storing to {}'.format(
+        args.host, args.port, server.root))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
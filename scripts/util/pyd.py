@@ -24,6 +24,10 @@ import http.client as client
 from http.server import BaseHTTPRequestHandler
 from http.server import HTTPServer
 
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from scripts.util.pycache import Storage, DEFAULT_MAX_SIZE, parse_size  # noqa: E402
+
 PYCACHE_PORT = 7970  # Ascii code for 'yp'
 LOCALHOST = '127.0.0.1'
 DEBUG = int(os.environ.get('PRINT_BUILD_EXPLANATIONS', 0))
@@ -92,23 +96,21 @@ class PycacheDaemon(HTTPServer):
         now = datetime.datetime.now()
         days = 15
         earlier_time = (now - datetime.timedelta(days)).timestamp()
-        # Pycache pool holds as much as 40GB  or as long as 15 days
-        # cache objects
-        while days > 0:
-            disk_usage = 0
-            for root, _, files in os.walk(self.pycache_dir):
-                for file in files:
-                    path = os.path.join(root, file)
-                    stat = os.stat(path)
-                    if stat.st_atime < int(earlier_time):
-                        os.unlink(path)
-                    else:
-                        disk_usage += stat.st_size
-            if disk_usage >= 40 * 1024 * 1024 * 1024:
-                days -= 1
-                earlier_time = (now - datetime.timedelta(days)).timestamp()
-            else:
-                break
+        # Blobs are evicted by the access time index once they take more
+        # than PYCACHE_MAX_SIZE, entries and manifests are kept 15 days.
+        storage = Storage(self.pycache_dir)
+        max_size = parse_size(
+            os.environ.get('PYCACHE_MAX_SIZE', DEFAULT_MAX_SIZE))
+        storage.remove_blobs(storage.index.evict(max_size))
+        for root, dirs, files in os.walk(self.pycache_dir):
+            if root == self.pycache_dir:
+                dirs[:] = [d for d in dirs if d != 'cas']
+                continue
+            for file in files:
+                path = os.path.join(root, file)
+                stat = os.stat(path)
+                if stat.st_atime < int(earlier_time):
+                    os.unlink(path)
 
     def show_statistics(self):
         actions = self.hit_times + self.miss_times
@@ -121,6 +123,16 @@ class PycacheDaemon(HTTPServer):
             miss_rate = float(self.miss_times) / actions * 100
             print('pycache hit rate: {:.2f}%'.format(hit_rate))
             print('pycache miss rate: {:.2f}%'.format(miss_rate))
+            stats = Storage(self.pycache_dir).index.statistics()
+            print('pycache linked files: {}, copied files: {}'.format(
+                stats.get('linked_files'), stats.get('copied_files')))
+            print('pycache stored bytes: {}, deduplicated bytes: {}'.format(
+                stats.get('stored_bytes'), stats.get('deduplicated_bytes')))
+            print('pycache evicted blobs: {}, evicted bytes: {}'.format(
+                stats.get('evicted_blobs'), stats.get('evicted_bytes')))
+            if os.environ.get('PYCACHE_REMOTE_URL'):
+                print('pycache remote hits: {}, uploaded outputs: {}'.format(
+                    stats.get('remote_hit'), stats.get('remote_uploads')))
             print('-' * 80)
         else:
             print('-' * 80)
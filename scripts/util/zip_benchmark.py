@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2024 Huawei Device Co., Ltd.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark of the zip helpers of build_utils.
+
+Generates input zips (or uses the given ones), runs the legacy (serial)
+and the current implementation of each helper and checks that both give
+the same zip content.
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import zipfile
+import argparse
+import tempfile
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from scripts.util import build_utils  # noqa: E402
+
+
+def _random_data(rand, size):
+    # Half random, half repeated bytes, roughly like resources and classes.
+    random_part = bytes(rand.getrandbits(8) for _ in range(size // 2))
+    return random_part + b'ohos' * ((size - len(random_part)) // 4)
+
+
+def generate_zips(work_dir, zip_count, file_count, file_size):
+    rand = random.Random(0)
+    block = _random_data(rand, file_size)
+    input_zips = []
+    for index in range(zip_count):
+        zip_path = os.path.join(work_dir, 'input{}.zip'.format(index))
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as out_zip:
+            for number in range(file_count):
+                name = 'pkg{}/res/file{}.bin'.format(index, number)
+                offset = rand.randrange(len(block))
+                out_zip.writestr(name, block[offset:] + block[:offset])
+        input_zips.append(zip_path)
+    return input_zips
+
+
+def _zip_content(zip_path):
+    with zipfile.ZipFile(zip_path) as in_zip:
+        return [(info.filename, info.date_time, info.external_attr,
+                 in_zip.read(info)) for info in in_zip.infolist()]
+
+
+def _timed(repeat, func, *args, **kwargs):
+    durations = []
+    for _ in range(repeat):
+        start = time.monotonic()
+        func(*args, **kwargs)
+        durations.append(time.monotonic() - start)
+    return min(durations)
+
+
+def bench_merge_zips(work_dir, input_zips, repeat):
+    legacy_output = os.path.join(work_dir, 'legacy.zip')
+    output = os.path.join(work_dir, 'merged.zip')
+    legacy = _timed(repeat, build_utils.merge_zips, legacy_output, input_zips,
+                    raw_copy=False)
+    current = _timed(repeat, build_utils.merge_zips, output, input_zips)
+    if _zip_content(legacy_output) != _zip_content(output):
+        raise Exception('merge_zips outputs differ')
+    return legacy, current
+
+
+def bench_zip_dir(work_dir, input_zips, repeat):
+    input_dir = os.path.join(work_dir, 'zip_dir_input')
+    if not os.path.exists(input_dir):
+        for input_zip in input_zips:
+            with zipfile.ZipFile(input_zip) as in_zip:
+                in_zip.extractall(input_dir)
+    serial_output = os.path.join(work_dir, 'serial.zip')
+    output = os.path.join(work_dir, 'parallel.zip')
+
+    def _compress_fn(_):
+        return zipfile.ZIP_DEFLATED
+
+    serial = _timed(repeat, build_utils.zip_dir, serial_output, input_dir,
+                    compress_fn=_compress_fn, jobs=1)
+    parallel = _timed(repeat, build_utils.zip_dir, output, input_dir,
+                      compress_fn=_compress_fn)
+    with open(serial_output, 'rb') as serial_file, open(output, 'rb') as f:
+        if serial_file.read() != f.read():
+            raise Exception('zip_dir outputs differ')
+    return serial, parallel
+
+
+def bench_extract_all(work_dir, input_zips, repeat):
+    def _extract(extract_func):
+        output_dir = os.path.join(work_dir, 'extract_all')
+        for input_zip in input_zips:
+            extract_func(input_zip, output_dir)
+        contents = {}
+        for root, _, files in os.walk(output_dir):
+            for name in files:
+                with open(os.path.join(root, name), 'rb') as f:
+                    contents[os.path.relpath(os.path.join(root, name),
+                                             output_dir)] = f.read()
+        shutil.rmtree(output_dir)
+        return contents
+
+    def _legacy_extract(input_zip, output_dir):
+        with zipfile.ZipFile(input_zip) as in_zip:
+            in_zip.extractall(output_dir)
+
+    results = []
+    legacy = _timed(repeat, lambda: results.append(_extract(_legacy_extract)))
+    current = _timed(repeat, lambda: results.append(
+        _extract(build_utils.extract_all)))
+    if results[0] != results[-1]:
+        raise Exception('extract_all outputs differ')
+    return legacy, current
+
+
+BENCHMARKS = {
+    'extract_all': bench_extract_all,
+    'merge_zips': bench_merge_zips,
+    'zip_dir': bench_zip_dir,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input-zip', action='append', default=[],
+                        help='zip to use instead of generated ones')
+    parser.add_argument('--zip-count', type=int, default=8)
+    parser.add_argument('--file-count', type=int, default=200)
+    parser.add_argument('--file-size', type=int, default=64 * 1024)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--benchmark', action='append',
+                        choices=sorted(BENCHMARKS), help='default: all')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='zip_benchmark')
+    try:
+        input_zips = args.input_zip or generate_zips(
+            work_dir, args.zip_count, args.file_count, args.file_size)
+        input_size = sum(os.path.getsize(path) for path in input_zips)
+        print('inputs: {} zips, {:.1f} MiB'.format(len(input_zips),
+                                                   input_size / 2**20))
+        for name in args.benchmark or sorted(BENCHMARKS):
+            legacy, current = BENCHMARKS[name](work_dir, input_zips,
+                                               args.repeat)
+            print('{}: legacy {:.3f}s, current {:.3f}s, {:.1f}x'.format(
+                name, legacy, current, legacy / max(current, 1e-6)))
+    finally:
+        shutil.rmtree(work_dir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())